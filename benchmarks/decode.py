@@ -0,0 +1,63 @@
+"""
+Compare the JSON backends that `tradingview_screener.decode` can use, on a synthetic response of the
+scanner API.
+
+Usage:
+
+    python benchmarks/decode.py [--rows 10000] [--columns 25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+
+from tradingview_screener import decode
+
+
+def make_payload(n_rows: int, n_columns: int) -> bytes:
+    rng = random.Random(0)
+    sectors = ['Finance', 'Technology Services', 'Energy Minerals', 'Health Technology', None]
+    data = []
+    for i in range(n_rows):
+        values = [rng.uniform(1, 5000) for _ in range(n_columns - 3)]
+        values += [rng.randrange(10**9), rng.choice(sectors), ['common']]
+        data.append({'s': f'NSE:SYM{i}', 'd': values})
+    return json.dumps({'totalCount': n_rows, 'data': data}).encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--columns', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    content = make_payload(args.rows, args.columns)
+    backends = {'json': json.loads}
+    try:
+        import orjson
+
+        backends['orjson'] = orjson.loads
+    except ImportError:
+        pass
+    try:
+        import msgspec
+
+        backends['msgspec'] = msgspec.json.Decoder().decode
+        backends['msgspec (typed)'] = msgspec.json.Decoder(decode.ScreenerStruct).decode
+    except ImportError:
+        pass
+
+    print(f'payload: {len(content) / 1e6:.1f} MB, {args.rows:,} rows x {args.columns} columns')
+    print(f'selected backend: {decode.BACKEND}\n')
+    print(f'{"backend":<18}{"ms / 10k rows":>15}')
+    for name, func in backends.items():
+        best = min(timeit.repeat(lambda: func(content), number=1, repeat=args.repeat))
+        print(f'{name:<18}{best * 1000 * 10_000 / args.rows:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Compare the strategies of the local scan engine (`tradingview_screener.local_engine`) on a synthetic
+market, to see where each one wins:
+
+- `threads`: the previous implementation, pandas boolean masking on 1000-row slices in a thread
+  pool, followed by a `pd.concat()` of the slices
+- `numpy`: one fused mask in this process, with NumPy
+- `numexpr`: one fused mask in this process, with a single `numexpr` expression (if installed)
+- `processes`: the mask split across a process pool, on columns in shared memory
+
+The last line prints the smallest number of rows for which the process pool beats the best
+single-process strategy (set `SCREENER_PROCESS_POOL_MIN_ROWS` to it on that machine).
+
+Usage:
+
+    python benchmarks/local_engine.py [--rows 10000 100000 1000000 4000000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import os
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from tradingview_screener import local_engine as engine
+
+FILTERS = [
+    engine.col('close') > 100,
+    engine.col('volume') >= 1_000_000,
+    engine.col('change') > 0,
+    engine.col('market_cap_basic') < 5e11,
+    engine.col('exchange') == 'NSE',
+]
+
+
+def make_market(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            'close': rng.uniform(1, 5000, n_rows),
+            'volume': rng.integers(0, 10**8, n_rows),
+            'change': rng.normal(0, 3, n_rows),
+            'market_cap_basic': rng.uniform(1e8, 1e12, n_rows),
+            'exchange': rng.choice(np.array(['NSE', 'BSE'], dtype=object), n_rows),
+        }
+    )
+    df.loc[::13, 'close'] = np.nan
+    return df
+
+
+def threads(data: pd.DataFrame) -> pd.DataFrame:
+    def process_batch(start: int, end: int) -> pd.DataFrame:
+        batch = data.iloc[start:end].copy()
+        mask = np.ones(len(batch), dtype=bool)
+        for condition in FILTERS:
+            mask &= engine.OPERATORS[condition.operator](batch[condition.column], condition.value)
+        return batch[mask]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(process_batch, i, min(i + 1000, len(data)))
+            for i in range(0, len(data), 1000)
+        ]
+        results = [f.result() for f in concurrent.futures.as_completed(futures)]
+    return pd.concat(results, ignore_index=True)
+
+
+def fused(data: pd.DataFrame, use_numexpr: bool) -> pd.DataFrame:
+    columns = engine._numpy_columns(data, FILTERS)
+    return data[engine.fused_mask(columns, FILTERS, use_numexpr=use_numexpr)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 4_000_000]
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    has_numexpr = engine._import_numexpr() is not None
+    print(f'{os.cpu_count()} CPUs, numexpr {"installed" if has_numexpr else "not installed"}')
+    print(f'{"rows":>10} {"threads":>10} {"numpy":>10} {"numexpr":>10} {"processes":>10}  (ms)')
+
+    crossover = None
+    for n_rows in args.rows:
+        data = make_market(n_rows)
+        shared = engine.SharedColumns(data)  # copied once, when the data is loaded
+        strategies = {
+            'threads': lambda: threads(data),
+            'numpy': lambda: fused(data, use_numexpr=False),
+            'numexpr': (lambda: fused(data, use_numexpr=True)) if has_numexpr else None,
+            'processes': lambda: data[engine.parallel_mask(data, shared, FILTERS, args.workers)],
+        }
+        expected = len(fused(data, use_numexpr=False))
+        timings = {}
+        for name, func in strategies.items():
+            if func is None:
+                continue
+            assert len(func()) == expected, name  # and warm up the process pool
+            timings[name] = min(timeit.repeat(func, number=1, repeat=args.repeat)) * 1000
+        shared.close()
+
+        cells = ' '.join(
+            f'{timings[n]:>10.2f}' if n in timings else f'{"-":>10}' for n in strategies
+        )
+        print(f'{n_rows:>10} {cells}')
+        best_local = min(timings['numpy'], timings.get('numexpr', float('inf')))
+        if crossover is None and timings['processes'] < best_local:
+            crossover = n_rows
+
+    if crossover is None:
+        print('the process pool never wins on this machine, leave PROCESS_POOL_MIN_ROWS high')
+    else:
+        print(
+            f'the process pool wins from {crossover} rows: SCREENER_PROCESS_POOL_MIN_ROWS={crossover}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Load-test the query path end to end (request, transport, decode, DataFrame build) against the
+local stand-in of the scanner API (`tradingview_screener.server`), without touching the real one.
+
+Each worker thread runs the same mix of queries in a loop; the timings of every scan are
+collected with `tradingview_screener.instrument` and summarized per phase.
+
+Usage:
+
+    python benchmarks/scanner_load.py [--rows 20000] [--workers 8] [--seconds 10]
+        [--latency 0.05] [--error-rate 0.0] [--url http://127.0.0.1:8787]
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import requests
+
+from tradingview_screener import Query, col, instrument
+from tradingview_screener.server import ScannerServer
+from tradingview_screener.transport import RedirectTransport, RequestsTransport
+
+QUERIES = [
+    Query().select('name', 'close', 'volume', 'market_cap_basic'),
+    Query()
+    .select('name', 'close', 'change', 'sector')
+    .where(col('close').between(10, 500), col('volume') > 100_000)
+    .order_by('change', ascending=False)
+    .limit(500),
+    # like the Custom EMA scanner: every row of the market, with the moving averages
+    Query()
+    .select('name', 'close', 'EMA5', 'EMA20', 'EMA50', 'EMA200', 'volume', 'RSI')
+    .where(col('close') > col('EMA20'))
+    .limit(20_000),
+]
+
+
+def run(base_url: str, workers: int, seconds: float) -> list[instrument.ScanTimings]:
+    timings: list[instrument.ScanTimings] = []
+    instrument.add_hook(timings.append)
+    transport = RedirectTransport(base_url, RequestsTransport(pool_maxsize=workers))
+    queries = [q.set_transport(transport) for q in QUERIES]
+    deadline = time.monotonic() + seconds
+
+    def worker() -> None:
+        i = 0
+        while time.monotonic() < deadline:
+            try:
+                queries[i % len(queries)].get_scanner_data()
+            except requests.HTTPError:
+                pass  # counted by the hook
+            i += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        instrument.remove_hook(timings.append)
+        transport.close()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--url', help='an already running stand-in (or another server)')
+    args = parser.parse_args()
+
+    if args.url:
+        timings = run(args.url, args.workers, args.seconds)
+    else:
+        server = ScannerServer(rows=args.rows, latency=args.latency, error_rate=args.error_rate)
+        with server:
+            timings = run(server.url, args.workers, args.seconds)
+
+    ok = [t for t in timings if t.error is None]
+    print(
+        f'{len(timings)} scans in {args.seconds:g}s ({len(timings) / args.seconds:.1f}/s), '
+        f'{len(timings) - len(ok)} failed, {sum(t.rows or 0 for t in ok)} rows'
+    )
+    print(f'{"phase":<10} {"p50":>9} {"p90":>9} {"p99":>9}  (ms)')
+    for phase in ('request', 'decode', 'frame', 'total'):
+        values = [getattr(t, phase) for t in ok if getattr(t, phase) is not None]
+        if values:
+            p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+            print(f'{phase:<10} {p50:>9.2f} {p90:>9.2f} {p99:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
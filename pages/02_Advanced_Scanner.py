@@ -182,62 +182,32 @@ if is_wide:
                                 col('close') > col('EMA150'),
                                 col('close') > col('EMA200')
                             )
+                            # Derived columns, computed in one vectorized pass on the fetched rows
+                            .with_columns(**{
+                                # Percentage above each EMA
+                                'Above_EMA50%': ((col('close') - col('EMA50')) / col('EMA50') * 100).round(2),
+                                'Above_EMA150%': ((col('close') - col('EMA150')) / col('EMA150') * 100).round(2),
+                                'Above_EMA200%': ((col('close') - col('EMA200')) / col('EMA200') * 100).round(2),
+                                # Percentage from 52-week high
+                                'From_52WH%': ((col('price_52_week_high') - col('close')) / col('price_52_week_high') * 100).round(2),
+                                'Rel_Volume': col('relative_volume_10d_calc').round(2),
+                                # Market cap in Crores
+                                'Market_Cap_Cr': (col('market_cap_basic') / 10000000).round(2),
+                                '1M_Perf': col('Perf.1M').round(2),
+                                '3M_Perf': col('Perf.3M').round(2),
+                                # Float shares as percentage of total shares
+                                'Float_Shares%': (col('float_shares_outstanding') / col('total_shares_outstanding') * 100).round(2),
+                            })
                             .order_by('relative_volume_10d_calc', ascending=False)
                         )
                         
-                        # Batch fetching to get all results
-                        batch_size = 1000
-                        max_rows = 5000  # Set a high limit
-                        dfs = []
-                        total_count = None
-                        
-                        for offset in range(0, max_rows, batch_size):
-                            q_batch = q.offset(offset).limit(batch_size)
-                            count, df_batch = q_batch.get_scanner_data()
-                            
-                            if total_count is None:
-                                total_count = count
-                            
-                            if df_batch is not None and not df_batch.empty:
-                                dfs.append(df_batch)
-                                if len(df_batch) < batch_size:  # Got all results
-                                    break
-                            else:
-                                break
-                        
-                        # Combine all batches
-                        if dfs:
-                            df = pd.concat(dfs, ignore_index=True)
-                            count = total_count  # Use the total count from first batch
-                        else:
-                            df = pd.DataFrame()
-                            count = 0
+                        # Fetch all the pages concurrently (up to 5000 rows)
+                        count, df = q.fetch_all(page_size=1000, max_rows=5000)
                         
                         if not df.empty:
                             # Process and display results
                             st.success(f"Found {count} stocks matching criteria")
                             
-                            # Calculate percentage above each EMA
-                            df['Above_EMA50%'] = ((df['close'] - df['EMA50']) / df['EMA50'] * 100).round(2)
-                            df['Above_EMA150%'] = ((df['close'] - df['EMA150']) / df['EMA150'] * 100).round(2)
-                            df['Above_EMA200%'] = ((df['close'] - df['EMA200']) / df['EMA200'] * 100).round(2)
-                            
-                            # Calculate percentage from 52-week high
-                            df['From_52WH%'] = ((df['price_52_week_high'] - df['close']) / df['price_52_week_high'] * 100).round(2)
-                            
-                            # Format relative volume
-                            df['Rel_Volume'] = df['relative_volume_10d_calc'].round(2)
-                            
-                            # Format market cap to display in Crores
-                            df['Market_Cap_Cr'] = (df['market_cap_basic'] / 10000000).round(2)
-                            
-                            # Format performance columns
-                            df['1M_Perf'] = df['Perf.1M'].round(2)
-                            df['3M_Perf'] = df['Perf.3M'].round(2)
-                            
-                            # Calculate float shares as percentage of total shares
-                            df['Float_Shares%'] = (df['float_shares_outstanding'] / df['total_shares_outstanding'] * 100).round(2)
-                            
                             # Select and rename columns for display
                             display_cols = [
                                 'name', 'close', 'is_primary',
@@ -11,6 +11,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from utils.news_modal import show_news_for_symbol
 import pandas as pd
 from tradingview_screener import Query, Column, col
+from tradingview_screener.query import get_scanner_data_many
+from tradingview_screener import fanout
+from tradingview_screener.evaluate import filter_data
+from utils.universe import get_universe_service, store_result
 from utils.listing_dates import get_listing_date_map_cached
 import plotly.express as px
 import plotly.graph_objects as go
@@ -1310,11 +1314,12 @@ with st.container():
                 ):
                     # Only fetch required columns (use 'name' instead of 'ticker' for TradingView India)
                     exchange_choices = ["NSE", "BSE"]
-                    dfs = []
-                    for exch in exchange_choices:
-                        q = Query().set_markets('india').where(col('type') == 'fund').where(col('exchange') == exch).select('name', 'exchange', 'type').offset(0).limit(20000)
-                        count, df_exch = q.get_scanner_data()
-                        dfs.append(df_exch)
+                    # Fetch all the exchanges concurrently, instead of one after another
+                    queries = [
+                        Query().set_markets('india').where(col('type') == 'fund', col('exchange') == exch).select('name', 'exchange', 'type').offset(0).limit(20000)
+                        for exch in exchange_choices
+                    ]
+                    dfs = [df_exch for _, df_exch in get_scanner_data_many(*queries)]
                     df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
 
                     # Rename 'name' to 'ticker' for display
@@ -1362,18 +1367,23 @@ with st.container():
                             if col not in select_cols:
                                 select_cols.append(col)
                     q = Query().select(*select_cols)
-                    # Correct market logic as in Query.set_markets
                     if selected_regions:
-                        if len(selected_regions) == 1:
-                            q.url = f"https://scanner.tradingview.com/{selected_regions[0]}/scan"
-                            q.query['markets'] = [selected_regions[0]]
-                        else:
-                            q.url = "https://scanner.tradingview.com/global/scan"
-                            q.query['markets'] = list(selected_regions)
-                    q = q.where(*query_filters)
+                        q = q.set_markets(*selected_regions)
+                    # drop the EMA comparisons implied by the stacking ones, merge the ranges, etc.
+                    q = q.where(*query_filters).optimize()
                     # Set row limit to 20000
                     q = q.limit(20000)
-                    count, df = q.get_scanner_data()
+                    if len(selected_regions) > 1:
+                        # one concurrent request per region, merged and re-sorted locally
+                        result = fanout.scan(q)
+                        count, df = result
+                        if result.failed:
+                            st.warning(
+                                "⚠️ Partial results, these regions failed: "
+                                + ", ".join(sorted(result.failed))
+                            )
+                    else:
+                        count, df = get_universe_service().scan(q)
                 
                 # Update loading indicator with success message
                 loading_container.markdown(f"""
@@ -1387,42 +1397,41 @@ with st.container():
                 # --- ADVANCED FUNDAMENTAL FILTERS (POST-FETCH) ---
                 # Apply advanced filters to df based on user inputs
                 if not df.empty:
+                    fundamental_filters = []
                     # P/E Range
                     if 'pe_range' in locals() and pe_range:
                         if 'pe_min' in locals() and 'pe_max' in locals():
-                            if 'price_earnings_ttm' in df.columns:
-                                df = df[(df['price_earnings_ttm'] >= pe_min) & (df['price_earnings_ttm'] <= pe_max)]
+                            fundamental_filters.append(Column('price_earnings_ttm').between(pe_min, pe_max))
                     # ROE (%) >
                     if 'roe' in locals() and roe:
                         if 'roe_val' in locals():
-                            if 'return_on_equity' in df.columns:
-                                df = df[df['return_on_equity'] >= roe_val]
+                            fundamental_filters.append(Column('return_on_equity') >= roe_val)
                     # D/E
                     if 'de' in locals() and de:
                         if 'de_max' in locals():
-                            if 'debt_to_equity' in df.columns:
-                                df = df[df['debt_to_equity'] <= de_max]
+                            fundamental_filters.append(Column('debt_to_equity') <= de_max)
                     # ROE between
                     if 'roe_between' in locals() and roe_between:
                         if 'roe_between_min' in locals() and 'roe_between_max' in locals():
-                            if 'return_on_equity' in df.columns:
-                                df = df[(df['return_on_equity'] >= roe_between_min) & (df['return_on_equity'] <= roe_between_max)]
+                            fundamental_filters.append(Column('return_on_equity').between(roe_between_min, roe_between_max))
                     # ROCE (%) >
                     if 'roce' in locals() and roce:
                         if 'roce_val' in locals():
-                            if 'return_on_invested_capital' in df.columns:
-                                df = df[df['return_on_invested_capital'] >= roce_val]
+                            fundamental_filters.append(Column('return_on_invested_capital') >= roce_val)
                     # PEG (0 < PEG < 1)
                     if 'peg' in locals() and peg:
                         if 'peg_min' in locals() and 'peg_max' in locals():
-                            if 'peg_ratio' in df.columns:
-                                df = df[(df['peg_ratio'] > peg_min) & (df['peg_ratio'] < peg_max)]
+                            fundamental_filters.append(Column('peg_ratio') > peg_min)
+                            fundamental_filters.append(Column('peg_ratio') < peg_max)
                     # OPM TTM(%) >
                     if 'opm_ttm' in locals() and opm_ttm:
                         if 'opm_ttm_val' in locals():
-                            if 'operating_margin_ttm' in df.columns:
-                                df = df[df['operating_margin_ttm'] >= opm_ttm_val]
-                st.session_state['scan_df'] = df.copy()
+                            fundamental_filters.append(Column('operating_margin_ttm') >= opm_ttm_val)
+                    # evaluated locally on the fetched rows, a filter whose column wasn't fetched is skipped
+                    fundamental_filters = [f for f in fundamental_filters if f['left'] in df.columns]
+                    if fundamental_filters:
+                        df = filter_data(df, Query().where(*fundamental_filters))
+                store_result('scan_df', df)
             except Exception as e:
                 st.error(f"Error: {e}\nTry selecting a different region or adjusting your filters/columns.")
 
@@ -1442,7 +1451,7 @@ with st.container():
         selected_vol_col = period_map[turnover_period]
         df['Turnover_Cr'] = (df[selected_vol_col] * df['close'] / 10000000).round(2)
         df = df[df['Turnover_Cr'].between(turnover_min, turnover_max)]
-        st.session_state['scan_df'] = df.copy()
+        store_result('scan_df', df)
 
 # --- Use cached scan results for summary/chart/table (always outside Run Scan block) ---
 if 'scan_df' in st.session_state and not st.session_state['scan_df'].empty:
@@ -1491,7 +1500,7 @@ if 'scan_df' in st.session_state and not st.session_state['scan_df'].empty:
             # Industry-wise categorized format
             if not df.empty and 'industry' in df.columns:
                 # Group by industry and sort by count descending
-                industry_groups = df.groupby('industry')['name'].agg(list).reset_index()
+                industry_groups = df.groupby('industry', observed=True)['name'].agg(list).reset_index()
                 industry_groups['count'] = industry_groups['name'].apply(len)
                 industry_groups = industry_groups.sort_values('count', ascending=False)
                 
@@ -1517,7 +1526,7 @@ if 'scan_df' in st.session_state and not st.session_state['scan_df'].empty:
             # Sector-wise categorized format
             if not df.empty and 'sector' in df.columns:
                 # Group by sector and sort by count descending
-                sector_groups = df.groupby('sector')['name'].agg(list).reset_index()
+                sector_groups = df.groupby('sector', observed=True)['name'].agg(list).reset_index()
                 sector_groups['count'] = sector_groups['name'].apply(len)
                 sector_groups = sector_groups.sort_values('count', ascending=False)
                 
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from tradingview_screener import Query, col, Column
+from utils.universe import get_universe_service
 import plotly.express as px
 from pages.price_bands import fetch_price_bands
 from scipy.stats import zscore
@@ -136,7 +137,7 @@ with st.spinner("Fetching all NSE stocks via TradingView API..."):
             )
             .limit(20000)
         )
-        count, df = q.get_scanner_data()
+        count, df = get_universe_service().scan(q)
 
         # --- Apply price band filter (only 10%, 20%, 5%, No Band) ---
         price_bands_df, _ = fetch_price_bands()
@@ -246,7 +247,7 @@ if not df.empty:
     hist_df = df[[group_col, 'name', returns_col]].copy()
     hist_df = hist_df.rename(columns={group_col: group_label, 'name': 'Stock', returns_col: 'Return'})
     # Find max return per group
-    max_per_group = hist_df.groupby(group_label).apply(lambda x: x.loc[x['Return'].idxmax()]).reset_index(drop=True)
+    max_per_group = hist_df.groupby(group_label, observed=True).apply(lambda x: x.loc[x['Return'].idxmax()]).reset_index(drop=True)
     # X-axis: group (with % of total stocks in group)
     group_sizes = df[group_col].value_counts(normalize=True) * 100
     max_per_group[f'{group_label}Label'] = max_per_group[group_label] + ' (' + max_per_group[group_label].map(lambda x: f"{group_sizes[x]:.1f}".rstrip('0').rstrip('.') if group_sizes[x] % 1 else str(int(group_sizes[x]))) + '%)'
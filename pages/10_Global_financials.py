@@ -369,7 +369,7 @@ if show_returns:
                     # Fallback to TradingView or other logic for non-NSEI indices
                     try:
                         q = Query().select('close').where('ticker', idx_symbol)
-                        q.query['range'] = {'from': f'{year}-01-01', 'to': f'{year}-12-31'}
+                        q = q.set_property('range', {'from': f'{year}-01-01', 'to': f'{year}-12-31'})
                         count, df = q.get_scanner_data()
                         if df.empty or 'close' not in df.columns:
                             row[f"{year}"] = 'NA'
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from tradingview_screener import Query, Column
+from utils.universe import get_universe_service
 import yfinance as yf
 
 st.set_page_config(
@@ -345,11 +346,11 @@ with st.spinner("Running fundamental scan..."):
         .limit(20000)
     )
     # Add required columns to the query columns if not already present
-    current_cols = set(query.query.get('columns', []))
-    for col in REQUIRED_COLUMNS:
-        if col not in current_cols:
-            query.query['columns'].append(col)
-    count, df = query.get_scanner_data()
+    current_cols = list(query.query.get('columns', []))
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in current_cols]
+    if missing_cols:
+        query = query.select(*current_cols, *missing_cols)
+    count, df = get_universe_service().scan(query)
 
 # Post-fetch filters for complex conditions
 if not df.empty:
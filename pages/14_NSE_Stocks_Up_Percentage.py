@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 from tradingview_screener import Query, Column
+from tradingview_screener.evaluate import filter_data
+from utils.universe import get_universe_service, show_as_of
+from utils.changes import show_changes_since_last_refresh
 import plotly.express as px
 from rapidfuzz import process, fuzz
 
@@ -130,12 +133,9 @@ query = (
     .limit(20000)
 )
 
-@st.cache_data(show_spinner=False)
-def fetch_stock_data(_query):
-    return _query.get_scanner_data()
-
 with st.spinner("Loading stock data..."):
-    count, df = fetch_stock_data(query)
+    count, df = get_universe_service().scan(query)
+show_as_of(df)
 
 # --- Robust column renaming and fallback logic ---
 if not df.empty:
@@ -248,17 +248,14 @@ if not df.empty:
         step=1e7,
         format="%.0f"
     )
-    filtered_df = df[
-        (df["Close Price"] >= min_price) &
-        (df["Close Price"] <= max_price) &
-        (df["Market Cap"] >= min_cap) &
-        (df["Market Cap"] <= max_cap)
+    # Re-filter the fetched rows locally (no new request when a slider moves), and enforce the
+    # percent threshold filter again here for robustness
+    local_filters = [
+        Column("Close Price").between(min_price, max_price),
+        Column("Market Cap").between(min_cap, max_cap),
+        Column(sort_col) >= percent_threshold if show_movers else Column(sort_col) <= -percent_threshold,
     ]
-    # Enforce percent threshold filter again here for robustness
-    if show_movers:
-        filtered_df = filtered_df[filtered_df[sort_col] >= percent_threshold]
-    else:
-        filtered_df = filtered_df[filtered_df[sort_col] <= -percent_threshold]
+    filtered_df = filter_data(df, Query().where(*local_filters))
 
     st.markdown("""
         <style>
@@ -289,6 +286,12 @@ if not df.empty:
             filtered_df[display_cols],
             use_container_width=True
         )
+        show_changes_since_last_refresh(
+            f"movers_{selected_exchange}_{actual_period}_{show_movers}",
+            filtered_df[display_cols],
+            key='Symbol',
+            tolerances={'Close Price': 0.01, f'% Change ({actual_period})': 0.01},
+        )
         plot_df = filtered_df.head(30).copy()
         plot_df = plot_df[plot_df['Market Cap'].notna() & (plot_df['Market Cap'] > 0)]
         if not plot_df.empty:
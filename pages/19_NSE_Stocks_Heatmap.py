@@ -1,5 +1,8 @@
 import streamlit as st
 from tradingview_screener import Query, Column
+from tradingview_screener.sort import sort_data
+from utils.universe import get_universe_service, show_as_of
+from utils.changes import show_changes_since_last_refresh
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -159,6 +162,12 @@ show_gainers = st.radio(
     horizontal=True,
     key="gainer_loser_toggle"
 )
+top_n = st.selectbox(
+    "Number of stocks:",
+    options=[50, 100, 250, 500, "All"],
+    index=4,
+    help="Only draw the biggest movers (selected locally, without a new request)."
+)
 
 # --- Feature 2: Group by Sector/Industry ---
 group_by = st.selectbox(
@@ -187,7 +196,8 @@ query = (
 
 # Get data from TradingView
 with st.spinner("Loading NSE stock data..."):
-    count, df = query.get_scanner_data()
+    count, df = get_universe_service().scan(query)
+show_as_of(df)
 
 # Rename columns for easier access
 # Use correct mapping for market cap and other columns
@@ -228,6 +238,14 @@ if 'Close Price' in df.columns:
 else:
     st.warning("'Close Price' column not found in data. Stock price filter not applied.")
 
+# Only report what moved since the previous refresh
+show_changes_since_last_refresh(
+    f"heatmap_{field}",
+    filtered_df[[c for c in ['Stock Name', 'Close Price', field, 'Market Cap'] if c in filtered_df.columns]],
+    key='Stock Name',
+    tolerances={'Close Price': 0.01, field: 0.01},
+)
+
 # Prepare path for treemap based on grouping
 if group_by == "Sector" and 'sector' in filtered_df.columns:
     treemap_path = ['sector', 'Stock Name']
@@ -239,6 +257,10 @@ else:
 # Drop NA and ensure numeric for perf field
 filtered_df = filtered_df.dropna(subset=[field, 'Market Cap', 'Stock Name'])
 filtered_df = filtered_df[pd.to_numeric(filtered_df[field], errors='coerce').notnull()]
+# The shared snapshot stores sector/industry as categoricals, plot them as plain values
+filtered_df = filtered_df.astype(
+    {c: object for c in treemap_path if isinstance(filtered_df[c].dtype, pd.CategoricalDtype)}
+)
 
 # Gainers/Losers logic
 if show_gainers == "Top Gainers":
@@ -257,6 +279,15 @@ else:
         'range_color': (min_val, 0)
     }
 
+# Keep the top N movers, only those N rows are sorted (see `tradingview_screener.sort`)
+if top_n != "All":
+    filtered_df = sort_data(
+        filtered_df,
+        {'sortBy': field, 'sortOrder': 'desc' if show_gainers == "Top Gainers" else 'asc'},
+        end=top_n,
+    )
+    box_sizes = box_sizes.loc[filtered_df.index]
+
 # Create treemap with improved styling
 fig = px.treemap(
     filtered_df,
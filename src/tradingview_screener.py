@@ -1,148 +0,0 @@
-import pandas as pd
-import numpy as np
-from functools import lru_cache
-import time
-from typing import List, Dict, Any, Optional, Union
-import requests
-from bs4 import BeautifulSoup
-import concurrent.futures
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-
-@dataclass
-class Filter:
-    column: str
-    operator: str
-    value: Any
-
-class Query:
-    def __init__(self):
-        self.filters: List[Filter] = []
-        self._cache: Dict[str, Any] = {}
-        self._last_update: float = 0
-        self._cache_ttl: int = 300  # 5 minutes cache TTL
-        self._max_workers: int = 4  # Number of concurrent workers
-        self._batch_size: int = 1000  # Batch size for processing
-
-    def add_filter(self, condition: Filter) -> 'Query':
-        """Add a filter condition to the query"""
-        self.filters.append(condition)
-        return self
-
-    @lru_cache(maxsize=32)
-    def _get_cached_data(self, market: str, instrument_type: str) -> pd.DataFrame:
-        """Get cached data for a market and instrument type"""
-        cache_key = f"{market}_{instrument_type}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        return self._fetch_market_data(market, instrument_type)
-
-    def _fetch_market_data(self, market: str, instrument_type: str) -> pd.DataFrame:
-        """Fetch market data with error handling and retries"""
-        max_retries = 3
-        retry_delay = 1
-
-        for attempt in range(max_retries):
-            try:
-                # Implementation of data fetching
-                # This is a placeholder - implement actual data fetching logic
-                return pd.DataFrame()
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise e
-                time.sleep(retry_delay * (attempt + 1))
-
-    def _process_batch(self, data: pd.DataFrame, start_idx: int, end_idx: int) -> pd.DataFrame:
-        """Process a batch of data efficiently"""
-        batch = data.iloc[start_idx:end_idx].copy()
-        mask = np.ones(len(batch), dtype=bool)
-
-        for condition in self.filters:
-            if condition.operator == '>':
-                mask &= batch[condition.column] > condition.value
-            elif condition.operator == '<':
-                mask &= batch[condition.column] < condition.value
-            elif condition.operator == '==':
-                mask &= batch[condition.column] == condition.value
-            elif condition.operator == '>=':
-                mask &= batch[condition.column] >= condition.value
-            elif condition.operator == '<=':
-                mask &= batch[condition.column] <= condition.value
-
-        return batch[mask]
-
-    def get_data(self) -> pd.DataFrame:
-        """Get filtered data with optimized processing"""
-        current_time = time.time()
-        cache_key = str(self.filters)
-
-        # Check cache
-        if cache_key in self._cache and (current_time - self._last_update) < self._cache_ttl:
-            return self._cache[cache_key]
-
-        # Fetch base data
-        data = self._fetch_base_data()
-        if data.empty:
-            return pd.DataFrame()
-
-        # Process data in parallel batches
-        results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
-            futures = []
-            for i in range(0, len(data), self._batch_size):
-                futures.append(
-                    executor.submit(
-                        self._process_batch,
-                        data,
-                        i,
-                        min(i + self._batch_size, len(data))
-                    )
-                )
-
-            for future in concurrent.futures.as_completed(futures):
-                results.append(future.result())
-
-        # Combine results
-        if results:
-            result = pd.concat(results, ignore_index=True)
-        else:
-            result = pd.DataFrame()
-
-        # Cache the result
-        self._cache[cache_key] = result
-        self._last_update = current_time
-
-        return result
-
-    def _fetch_base_data(self) -> pd.DataFrame:
-        """Fetch base data with error handling"""
-        try:
-            # Implementation of base data fetching
-            # This is a placeholder - implement actual data fetching logic
-            return pd.DataFrame()
-        except Exception as e:
-            print(f"Error fetching base data: {str(e)}")
-            return pd.DataFrame()
-
-class Column:
-    def __init__(self, name: str):
-        self.name = name
-
-    def __gt__(self, other: Any) -> Filter:
-        return Filter(self.name, '>', other)
-
-    def __lt__(self, other: Any) -> Filter:
-        return Filter(self.name, '<', other)
-
-    def __eq__(self, other: Any) -> Filter:
-        return Filter(self.name, '==', other)
-
-    def __ge__(self, other: Any) -> Filter:
-        return Filter(self.name, '>=', other)
-
-    def __le__(self, other: Any) -> Filter:
-        return Filter(self.name, '<=', other)
-
-def col(name: str) -> Column:
-    """Create a column reference"""
-    return Column(name) 
\ No newline at end of file
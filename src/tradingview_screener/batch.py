@@ -0,0 +1,273 @@
+"""
+Run many queries at once without getting rate-limited by the scanner API.
+
+All the batches in the process share the same token bucket and circuit breaker by default, so
+several pages (or sessions) that run their scans at the same time don't add up their request
+rates.
+
+Examples:
+
+>>> from tradingview_screener import batch
+>>> results = batch.run([q1, q2, q3], max_concurrency=4)
+>>> for count, df in results:
+...     print(count, len(df))
+"""
+
+from __future__ import annotations
+
+__all__ = ['CircuitBreaker', 'CircuitOpenError', 'TokenBucket', 'run']
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import requests
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Iterable, Optional, Union
+    from tradingview_screener.query import Query
+
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request, while the circuit breaker is open.
+    """
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket with an adaptive rate (AIMD).
+
+    The rate is halved every time the server throttles us, and it slowly grows back to `rate`
+    after each successful request, so the throughput stays close to the highest rate that the
+    server accepts instead of collapsing into retries.
+
+    :param rate: maximum number of requests per second
+    :param burst: maximum number of requests that can be sent at once (defaults to `rate`)
+    :param min_rate: the rate never goes below this
+    """
+
+    def __init__(self, rate: float = 10, burst: Optional[float] = None, min_rate: float = 0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = max(burst if burst is not None else rate, 1)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        """
+        Block until a token is available, and consume it.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        """
+        The server rejected a request because of the rate, slow down (multiplicative decrease).
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+
+    def succeeded(self) -> None:
+        """
+        A request went through, speed up a little (additive increase).
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} rate={self.rate:.2f}/{self.max_rate}>'
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests for `reset_timeout` seconds after `failure_threshold` consecutive
+    failures, then let a single request through to check if the server recovered.
+
+    :param failure_threshold: number of consecutive failures that opens the circuit
+    :param reset_timeout: number of seconds that the circuit stays open
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def check(self) -> None:
+        """
+        Raise `CircuitOpenError` if the request shouldn't be sent.
+        """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self._probing:
+                self._probing = True  # only one request at a time can check the server
+                return
+            raise CircuitOpenError(
+                f'the scanner API failed {self.failures} times in a row, retrying in '
+                f'{self.reset_timeout}s'
+            )
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failed(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} state={self.state!r} failures={self.failures}>'
+
+
+_bucket = TokenBucket()
+_breaker = CircuitBreaker()
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, 'response', None)
+    if response is None:
+        return None
+    try:
+        return max(float(response.headers['Retry-After']), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in RETRY_STATUS_CODES
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def _run_one(
+    query: Query,
+    bucket: TokenBucket,
+    breaker: CircuitBreaker,
+    max_retries: int,
+    backoff: float,
+    max_backoff: float,
+    kwargs: dict,
+) -> tuple[int, pd.DataFrame]:
+    for attempt in range(max_retries + 1):
+        breaker.check()
+        bucket.acquire()
+        try:
+            result = query.get_scanner_data(**kwargs)
+        except Exception as e:
+            if not _is_retryable(e):
+                breaker.succeeded()  # the server answered, the query itself is wrong
+                raise
+            breaker.failed()
+            if isinstance(e, requests.HTTPError) and e.response.status_code == 429:
+                bucket.throttled()
+            if attempt == max_retries:
+                raise
+
+            # exponential backoff with "full jitter", unless the server told us how long to wait
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_backoff, backoff * 2**attempt))
+            elif delay > max_backoff:
+                raise  # retrying sooner would only be throttled again
+            time.sleep(delay)
+        else:
+            breaker.succeeded()
+            bucket.succeeded()
+            return result
+    raise AssertionError('unreachable')
+
+
+def run(
+    queries: Iterable[Query],
+    max_concurrency: int = 8,
+    rate: Optional[float] = None,
+    max_retries: int = 4,
+    backoff: float = 0.5,
+    max_backoff: float = 30,
+    return_exceptions: bool = False,
+    bucket: Optional[TokenBucket] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    **kwargs,
+) -> list[Union[tuple[int, pd.DataFrame], Exception]]:
+    """
+    Run all the queries concurrently, and return their results in the same order.
+
+    The requests are limited by a token bucket (which slows down when the server answers with
+    HTTP 429), failed requests (429, 5xx and connection errors) are retried with exponential
+    backoff and jitter, and a circuit breaker stops sending requests when the server keeps failing.
+
+    :param queries: the queries to run
+    :param max_concurrency: maximum number of requests in flight
+    :param rate: maximum number of requests per second for this batch only, by default the batch
+        uses the token bucket that is shared by the whole process
+    :param max_retries: maximum number of retries per query
+    :param backoff: base delay of the exponential backoff, in seconds
+    :param max_backoff: maximum delay between two retries, in seconds (a query fails right away if
+        the server asks to wait longer than this with the `Retry-After` header)
+    :param return_exceptions: if True, a query that failed returns its exception instead of
+        raising it (the other queries keep running anyway)
+    :param bucket: a custom token bucket
+    :param breaker: a custom circuit breaker, by default the one shared by the whole process
+    :param kwargs: kwargs to pass to `Query.get_scanner_data()`
+    :return: a list of `(total_count, dataframe)` tuples (or exceptions)
+    """
+    if bucket is None:
+        bucket = TokenBucket(rate) if rate is not None else _bucket
+    if breaker is None:
+        breaker = _breaker
+
+    queries = list(queries)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(queries)))) as executor:
+        futures = [
+            executor.submit(_run_one, q, bucket, breaker, max_retries, backoff, max_backoff, kwargs)
+            for q in queries
+        ]
+
+    results = []
+    for future in futures:
+        exc = future.exception()
+        if exc is None:
+            results.append(future.result())
+        elif return_exceptions:
+            results.append(exc)
+        else:
+            raise exc
+    return results
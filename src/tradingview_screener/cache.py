@@ -0,0 +1,324 @@
+"""
+A cache for the responses of the scanner API.
+
+The responses are stored (still encoded) in a bounded in-memory LRU, backed by an optional SQLite
+file, so that the cache survives a restart of the process (e.g. of the Streamlit server). The
+responses of an authenticated session (fetched with cookies or other headers) are only kept in
+memory, they are never written to the disk.
+
+The cache is only used by the queries that opt into it with `Query.cached()`, which can also serve
+stale responses while they are refreshed in the background (stale-while-revalidate).
+"""
+
+from __future__ import annotations
+
+__all__ = ['ResponseCache', 'get_cache', 'query_key', 'set_cache']
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, Optional, Union
+    from tradingview_screener.models import QueryDict
+
+
+logger = logging.getLogger(__name__)
+
+
+def query_key(url: str, query: QueryDict, request: Optional[dict[str, Any]] = None) -> str:
+    """
+    Return a hash that identifies the query, it doesn't depend on the order of the keys in the
+    dictionaries (but it does on the order of the lists, like the selected columns).
+
+    The arguments of the request that can change its response (like the cookies and the headers
+    of an authenticated session) can be passed in `request`, so that the response of a session
+    is never returned to another one. Only their hash is part of the key.
+
+    >>> query_key(q.url, q.query)
+    'c0b7d6f3...'
+    >>> query_key(q.url, q.query, {'cookies': {'sessionid': '...'}})
+    '5e2a91c8...'
+    """
+    dct: dict[str, Any] = {'url': url, 'query': query}
+    if request:
+        dct['request'] = request
+    canonical = json.dumps(dct, sort_keys=True, separators=(',', ':'), default=_canonical)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _canonical(obj: Any) -> Any:
+    # the mappings that aren't dictionaries, like a `RequestsCookieJar` or `CaseInsensitiveDict`
+    if hasattr(obj, 'items'):
+        return dict(obj.items())
+    return str(obj)
+
+
+def _default_path() -> Path:
+    root = os.environ.get('TRADINGVIEW_SCREENER_CACHE_DIR')
+    if root is None:
+        root = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        root = Path(root) / 'tradingview_screener'
+    return Path(root) / 'responses.sqlite3'
+
+
+class ResponseCache:
+    """
+    A thread-safe two-level cache: an in-memory LRU and an (optional) SQLite file on disk.
+
+    The entries don't have a fixed TTL, instead the caller decides how old an entry may be when
+    reading it (see `get()`), so queries with different TTLs can share the same cache.
+
+    :param maxsize: maximum number of responses kept in memory
+    :param max_bytes: maximum total size of the responses kept in memory
+    :param path: path of the SQLite file, `None` to only cache in memory
+    :param max_disk_age: entries older than this (in seconds) are deleted from the disk
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 64,
+        max_bytes: int = 256 * 1024**2,
+        path: Optional[Union[str, Path]] = None,
+        max_disk_age: float = 24 * 60 * 60,
+    ) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.max_disk_age = max_disk_age
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+        self.path = None if path is None else Path(path)
+        self._db = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, created REAL NOT NULL, content BLOB NOT NULL)'
+            )
+
+    def _put_memory(self, key: str, created: float, content: bytes) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._nbytes -= len(old[1])
+        self._memory[key] = (created, content)
+        self._nbytes += len(content)
+
+        while self._memory and (len(self._memory) > self.maxsize or self._nbytes > self.max_bytes):
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._nbytes -= len(evicted)
+
+    def get_entry(self, key: str) -> Optional[tuple[float, bytes]]:
+        """
+        Return the `(created, content)` of the entry, regardless of its age, or None.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                'SELECT created, content FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = row[0], zlib.decompress(row[1])
+            self._put_memory(key, *entry)
+            return entry
+
+    def get(self, key: str, ttl: float) -> Optional[bytes]:
+        """
+        Return the cached response, or None if it's missing or older than `ttl` seconds.
+        """
+        entry = self.get_entry(key)
+        if entry is None or time.time() - entry[0] > ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry[1]
+
+    def get_stale(
+        self, key: str, ttl: float, stale_ttl: float
+    ) -> Optional[tuple[float, bytes, bool]]:
+        """
+        Return the `(created, content, is_stale)` of the entry, or None if it's missing or older
+        than `stale_ttl` seconds. The entry is stale if it's older than `ttl` seconds.
+        """
+        entry = self.get_entry(key)
+        age = None if entry is None else time.time() - entry[0]
+        with self._lock:
+            if age is None or age > max(ttl, stale_ttl):
+                self.misses += 1
+                return None
+            if age > ttl:
+                self.stale_hits += 1
+                return entry[0], entry[1], True
+            self.hits += 1
+            return entry[0], entry[1], False
+
+    def _begin_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def refresh_in_background(
+        self, key: str, fetch: Callable[[], bytes], persist: bool = True
+    ) -> None:
+        """
+        Call `fetch()` on a background thread and store its result, unless the entry is already
+        being refreshed. If `fetch()` fails, the error is logged and the old entry is kept.
+
+        :param persist: whether the result is also written to the disk (see `set()`)
+        """
+        if not self._begin_refresh(key):
+            return
+
+        def refresh() -> None:
+            try:
+                self.set(key, fetch(), persist=persist)
+            except Exception:
+                logger.exception('failed to refresh a cached response')
+            finally:
+                self._end_refresh(key)
+
+        _get_executor().submit(refresh)
+
+    def refresh_in_background_async(
+        self, key: str, fetch: Callable[[], Awaitable[bytes]], persist: bool = True
+    ) -> None:
+        """
+        The same as `refresh_in_background()`, but `fetch()` is a coroutine function that runs as a
+        task of the current event loop.
+        """
+        if not self._begin_refresh(key):
+            return
+
+        async def refresh() -> None:
+            try:
+                self.set(key, await fetch(), persist=persist)
+            except Exception:
+                logger.exception('failed to refresh a cached response')
+            finally:
+                self._end_refresh(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)  # keep a reference, otherwise the task could be garbage collected
+        task.add_done_callback(self._tasks.discard)
+
+    def set(
+        self, key: str, content: bytes, created: Optional[float] = None, persist: bool = True
+    ) -> None:
+        """
+        Store a response, created at `created` (a unix timestamp, defaults to now).
+
+        :param persist: whether the response is also written to the disk, it should be False for
+            the responses that must not be stored in plain text (like the ones of a session)
+        """
+        created = time.time() if created is None else created
+        with self._lock:
+            self._put_memory(key, created, content)
+
+            if self._db is not None and persist:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO responses VALUES (?, ?, ?)',
+                    (key, created, zlib.compress(content, 1)),
+                )
+                self._db.execute(
+                    'DELETE FROM responses WHERE created < ?', (created - self.max_disk_age,)
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._nbytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM responses')
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} entries={len(self._memory)} bytes={self._nbytes} '
+            f'hits={self.hits} stale_hits={self.stale_hits} misses={self.misses} path={self.path}>'
+        )
+
+
+_default_cache: Optional[ResponseCache] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # the threads that refresh the stale entries, shared by all the caches
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+    return _executor
+
+
+def get_cache() -> ResponseCache:
+    """
+    Return the cache that is shared by all the cached queries.
+
+    It's created lazily, with a disk tier in `~/.cache/tradingview_screener/` (the directory can
+    be changed with the `TRADINGVIEW_SCREENER_CACHE_DIR` environment variable). If the directory
+    isn't writable, the cache is kept in memory only.
+
+    Only the anonymous responses are written to the disk, the ones of an authenticated session
+    (see `Query.cached()`) are kept in memory.
+    """
+    global _default_cache
+
+    if _default_cache is None:
+        with _lock:
+            if _default_cache is None:
+                try:
+                    _default_cache = ResponseCache(path=_default_path())
+                except (OSError, sqlite3.Error):
+                    _default_cache = ResponseCache()
+    return _default_cache
+
+
+def set_cache(cache: ResponseCache) -> None:
+    """
+    Replace the cache that is shared by all the cached queries.
+
+    >>> set_cache(ResponseCache(maxsize=16, path=None))  # memory only
+    """
+    global _default_cache
+
+    with _lock:
+        _default_cache = cache
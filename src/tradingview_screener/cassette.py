@@ -0,0 +1,249 @@
+"""
+Record the traffic of the scanner API in a cassette, and replay it later without network access.
+
+A cassette is a JSON Lines file (gzipped if its name ends with `.gz`) with one request/response
+pair per line. The entries are keyed by the canonical hash of the URL and of the payload (see
+`cache.query_key()`), so a query matches its recording whatever the order of the keys of its
+payload. Only the payload is recorded, never the headers or the cookies of the request.
+
+Recording starts a new cassette (the previous recordings of the file are replaced on the first
+request), so recording a page again always changes what gets replayed.
+
+The replay is deterministic: the recordings of the same query are served in the order they were
+recorded (the last one is repeated), and with `timing` the responses are delayed like the
+recorded ones, so a whole page can be profiled with the latency of the real API, but without its
+variance.
+
+Examples:
+
+>>> transport = CassetteTransport('ema_scanner.jsonl.gz', mode='record')
+>>> Query().set_markets('india').limit(20_000).set_transport(transport).get_scanner_data()
+
+>>> transport = CassetteTransport('ema_scanner.jsonl.gz', timing=1.0)  # replay, in real time
+>>> Query().set_markets('india').limit(20_000).set_transport(transport).get_scanner_data()
+
+The whole app can use a cassette through environment variables (see
+`transport.get_transport()`), e.g. to record a page once and then replay it:
+
+    SCREENER_CASSETTE=ema.jsonl.gz SCREENER_CASSETTE_MODE=record streamlit run streamlit_app.py
+    SCREENER_CASSETTE=ema.jsonl.gz SCREENER_CASSETTE_TIMING=1 streamlit run streamlit_app.py
+
+And the content of a cassette can be listed with `python -m tradingview_screener.cassette show`.
+"""
+
+from __future__ import annotations
+
+__all__ = ['CassetteMiss', 'CassetteTransport', 'read_cassette']
+
+import datetime
+import gzip
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import requests
+
+from tradingview_screener.cache import query_key
+from tradingview_screener.transport import RequestsTransport, Transport
+
+if TYPE_CHECKING:
+    from typing import Any, Iterator, Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+# `record`: send every request and write it to a new cassette, `replay`: never send a request,
+# `auto`: replay the recorded queries, and send and append the others to the cassette
+MODES = ('record', 'replay', 'auto')
+
+
+class CassetteMiss(LookupError):
+    """
+    Raised in `replay` mode when a query wasn't recorded in the cassette.
+    """
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == '.gz':
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_cassette(path: Union[str, Path]) -> Iterator[dict[str, Any]]:
+    """
+    Yield the entries of a cassette, in the order they were recorded.
+
+    A truncated last entry (e.g. if the recording process was killed) is skipped with a warning.
+    """
+    path = Path(path)
+    with _open(path, 'rt') as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning('skipping a truncated entry of the cassette %s', path)
+        except EOFError:
+            logger.warning('the cassette %s is truncated', path)
+
+
+class CassetteTransport(Transport):
+    """
+    A transport that records the responses in a cassette, or replays them from it (see the
+    module documentation).
+
+    :param path: the cassette, gzipped if its name ends with `.gz`
+    :param mode: `replay` (the default), `record` (replaces the cassette) or `auto` (appends to it)
+    :param transport: the transport that sends the requests in `record` and `auto` modes,
+        defaults to a new `RequestsTransport`
+    :param timing: delay each replayed response by its recorded duration times `timing` (0 to
+        replay as fast as possible, 1 for real time)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mode: str = 'replay',
+        transport: Optional[Transport] = None,
+        timing: float = 0.0,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f'unknown mode: {mode!r} (expected one of {", ".join(MODES)})')
+        if timing < 0:
+            raise ValueError(f'timing must be positive, got {timing}')
+        self.path = Path(path)
+        self.mode = mode
+        self.timing = timing
+        self._transport = transport
+        self._owns_transport = transport is None
+        # `key` -> the recordings of the query, and how many times it was replayed
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+        self._replayed: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.recorded = 0
+        # the file is replaced by the first recording, not when the transport is created
+        self._truncate = mode == 'record'
+
+        if mode != 'record':
+            if self.path.exists():
+                for entry in read_cassette(self.path):
+                    self._entries.setdefault(entry['key'], []).append(entry)
+            elif mode == 'replay':
+                raise FileNotFoundError(f'the cassette {self.path} does not exist')
+
+    @property
+    def size(self) -> int:
+        # the number of recorded responses (not `__len__()`, an empty transport must be truthy)
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _next(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            i = self._replayed.get(key, 0)
+            self._replayed[key] = i + 1
+            self.hits += 1
+            return entries[min(i, len(entries) - 1)]
+
+    def _replay(self, entry: dict[str, Any]) -> requests.Response:
+        if self.timing:
+            time.sleep(entry['duration'] * self.timing)
+        r = requests.Response()
+        r.status_code = entry['status']
+        r.reason = entry['reason']
+        r.url = entry['url']
+        r.encoding = 'utf-8'
+        r.headers['content-type'] = entry.get('content_type') or 'application/json'
+        r._content = entry['body'].encode('utf-8')
+        r.elapsed = datetime.timedelta(seconds=entry['elapsed'] * self.timing)
+        return r
+
+    def _record(self, key: str, url: str, payload: Any, kwargs: dict) -> requests.Response:
+        if self._transport is None:
+            with self._lock:
+                if self._transport is None:
+                    self._transport = RequestsTransport()
+        start = time.perf_counter()
+        r = self._transport.post(url, json=payload, **kwargs)
+        duration = time.perf_counter() - start
+        entry = {
+            'key': key,
+            'url': url,
+            'request': payload,
+            'status': r.status_code,
+            'reason': r.reason,
+            'content_type': r.headers.get('content-type'),
+            'body': r.content.decode('utf-8', errors='replace'),
+            # the time to the headers of the response, and the whole request
+            'elapsed': r.elapsed.total_seconds() if r.elapsed else duration,
+            'duration': duration,
+            'recorded': time.time(),
+        }
+        line = json.dumps(entry, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            # one gzip member per entry, so a cassette is readable up to its last complete entry
+            with _open(self.path, 'wt' if self._truncate else 'at') as f:
+                f.write(line)
+            self._truncate = False
+            if self.mode == 'auto':  # replayed from now on
+                self._entries.setdefault(key, []).append(entry)
+            self.recorded += 1
+        return r
+
+    def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        key = query_key(url, json)
+        if self.mode != 'record':
+            entry = self._next(key)
+            if entry is not None:
+                return self._replay(entry)
+            if self.mode == 'replay':
+                raise CassetteMiss(
+                    f'no recorded response for this query to {url} (key {key[:12]}) in '
+                    f'{self.path}, record it with `mode="record"` or `mode="auto"`'
+                )
+        return self._record(key, url, json, kwargs)
+
+    def close(self) -> None:
+        if self._owns_transport and self._transport is not None:
+            self._transport.close()
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} path={str(self.path)!r} mode={self.mode!r} '
+            f'size={self.size} timing={self.timing}>'
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m tradingview_screener.cassette',
+        description='The cassettes of recorded scanner traffic.',
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    show_parser = subparsers.add_parser('show', help='list the entries of a cassette')
+    show_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    print(f'{"key":<12} {"status":>6} {"rows":>7} {"bytes":>10} {"ms":>8}  url')
+    for entry in read_cassette(args.path):
+        try:
+            rows = len(json.loads(entry['body']).get('data') or ())
+        except (ValueError, AttributeError):
+            rows = 0
+        print(
+            f'{entry["key"][:12]:<12} {entry["status"]:>6} {rows:>7} '
+            f'{len(entry["body"]):>10} {entry["duration"] * 1000:>8.1f}  {entry["url"]}'
+        )
+
+
+if __name__ == '__main__':
+    main()
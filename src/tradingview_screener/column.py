@@ -4,11 +4,119 @@ from typing import TYPE_CHECKING
 
 
 if TYPE_CHECKING:
-    from typing import Optional, Iterable
+    from typing import Any, Optional, Iterable
     from tradingview_screener.models import FilterOperationDict
 
 
-class Column:
+_BINARY_OPERATORS = {'+', '-', '*', '/', '**'}
+
+
+def _is_operand(value: Any) -> bool:
+    return isinstance(value, (Column, Expression, int, float)) and not isinstance(value, bool)
+
+
+class _Arithmetic:
+    # the arithmetic operators of `Column` and `Expression`, they build an `Expression`
+
+    def _binary(self, op: str, other: Any, reflected: bool = False) -> Expression:
+        if not _is_operand(other):
+            return NotImplemented
+        return Expression(op, other, self) if reflected else Expression(op, self, other)
+
+    def __add__(self, other) -> Expression:
+        return self._binary('+', other)
+
+    def __radd__(self, other) -> Expression:
+        return self._binary('+', other, reflected=True)
+
+    def __sub__(self, other) -> Expression:
+        return self._binary('-', other)
+
+    def __rsub__(self, other) -> Expression:
+        return self._binary('-', other, reflected=True)
+
+    def __mul__(self, other) -> Expression:
+        return self._binary('*', other)
+
+    def __rmul__(self, other) -> Expression:
+        return self._binary('*', other, reflected=True)
+
+    def __truediv__(self, other) -> Expression:
+        return self._binary('/', other)
+
+    def __rtruediv__(self, other) -> Expression:
+        return self._binary('/', other, reflected=True)
+
+    def __pow__(self, other) -> Expression:
+        return self._binary('**', other)
+
+    def __rpow__(self, other) -> Expression:
+        return self._binary('**', other, reflected=True)
+
+    def __neg__(self) -> Expression:
+        return Expression('neg', self)
+
+    def __abs__(self) -> Expression:
+        return Expression('abs', self)
+
+    def round(self, ndigits: int = 0) -> Expression:
+        return Expression('round', self, ndigits)
+
+
+class Expression(_Arithmetic):
+    """
+    An arithmetic expression of columns and numbers, used for the computed columns of
+    `Query.with_columns()`.
+
+    Expressions are built with the arithmetic operators of `Column` (`+`, `-`, `*`, `/`, `**`,
+    unary `-`, `abs()`) and `round()`, they are evaluated locally, on the fetched rows (see
+    `tradingview_screener.compute`).
+
+    Examples:
+
+    >>> (col('close') - col('EMA50')) / col('EMA50') * 100
+    < Expression(((close - EMA50) / EMA50) * 100) >
+    >>> (col('market_cap_basic') / 1e7).round(2)
+    """
+
+    def __init__(self, op: str, *operands: Any) -> None:
+        self.op = op
+        self.operands = operands
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        The names of the columns used by the expression, in order of appearance.
+        """
+        names: dict[str, None] = {}
+        for operand in self.operands:
+            if isinstance(operand, Column):
+                names[operand.name] = None
+            elif isinstance(operand, Expression):
+                names.update(dict.fromkeys(operand.columns))
+        return list(names)
+
+    def _format(self) -> str:
+        def fmt(operand: Any) -> str:
+            if isinstance(operand, Column):
+                return operand.name
+            if isinstance(operand, Expression):
+                text = operand._format()
+                return f'({text})' if operand.op in _BINARY_OPERATORS else text
+            return repr(operand)
+
+        if self.op in _BINARY_OPERATORS:
+            left, right = self.operands
+            return f'{fmt(left)} {self.op} {fmt(right)}'
+        if self.op == 'neg':
+            return f'-{fmt(self.operands[0])}'
+        return f'{self.op}({", ".join(map(fmt, self.operands))})'
+
+    def __repr__(self) -> str:
+        return f'< Expression({self._format()}) >'
+
+
+class Column(_Arithmetic):
     """
     A Column object represents a field in the tradingview stock screener,
     and it's used in SELECT queries and WHERE queries with the `Query` object.
@@ -44,6 +152,10 @@ class Column:
     >>> Column('description').like('apple')  # the same as `description LIKE '%apple%'`
     >>> Column('premarket_change').not_empty()  # same as `Column('premarket_change') != None`
     >>> Column('earnings_release_next_trading_date_fq').in_day_range(0, 0)  # same day
+
+    The arithmetic operators build an `Expression`, for the computed columns of
+    `Query.with_columns()`:
+    >>> (Column('close') - Column('EMA50')) / Column('EMA50') * 100
     """
 
     def __init__(self, name: str) -> None:
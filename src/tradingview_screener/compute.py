@@ -0,0 +1,233 @@
+"""
+Evaluate the computed columns of `Query.with_columns()` (arithmetic expressions of columns, see
+`column.Expression`) on the rows that were already downloaded.
+
+All the computed columns are evaluated in a single vectorized pass: a computed column that uses
+another one is expanded into a single expression (instead of reading back an intermediate
+column), and with `numexpr` installed (`pip install numexpr`) every expression is compiled and
+evaluated in one fused loop over the rows, without the temporary arrays of NumPy. Without
+`numexpr` the same expressions are evaluated with NumPy.
+
+The values are computed as `float64`, and like with the API, nulls stay null (`NaN`).
+
+Examples:
+
+>>> count, df = Query().select('close', 'EMA50').get_scanner_data()
+>>> compute(df, {'Above_EMA50%': ((col('close') - col('EMA50')) / col('EMA50') * 100).round(2)})
+{'Above_EMA50%': array([ 1.52, -0.3 , ...])}
+"""
+
+from __future__ import annotations
+
+__all__ = ['compute', 'source_columns', 'split_filters']
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tradingview_screener.column import Column, Expression
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Any, Callable, Iterable, Iterator, Mapping, Union
+
+    from tradingview_screener.models import FilterOperationDict, OperationDict, QueryDict
+
+    Data = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+    Computed = Mapping[str, Union[Expression, Column]]
+
+
+_NUMPY_OPERATORS: dict[str, Callable[..., np.ndarray]] = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.true_divide,
+    '**': np.power,
+    'neg': np.negative,
+    'abs': np.abs,
+}
+
+
+def source_columns(computed: Computed) -> list[str]:
+    """
+    Return the columns that must be downloaded to evaluate the computed columns, in order of
+    appearance (the computed columns that are used by other ones aren't included).
+    """
+    names: dict[str, None] = {}
+    for expr in computed.values():
+        columns = expr.columns if isinstance(expr, Expression) else [expr.name]
+        names.update(dict.fromkeys(c for c in columns if c not in computed))
+    return list(names)
+
+
+def _names(expr: FilterOperationDict) -> tuple[str, set[str]]:
+    # the column on the left of a filter expression, and the strings on its right (which are
+    # either column names or values)
+    right = expr.get('right')
+    values = right if isinstance(right, (list, tuple)) else [right]
+    return expr['left'], {v for v in values if isinstance(v, str)}
+
+
+def _expressions(operation: OperationDict) -> Iterator[FilterOperationDict]:
+    for operand in operation['operands']:  # pyright: ignore
+        if 'expression' in operand:
+            yield operand['expression']
+        else:
+            yield from _expressions(operand['operation'])
+
+
+def _uses(expr: FilterOperationDict, names: set[str]) -> bool:
+    left, right = _names(expr)
+    return left in names or bool(right & names)
+
+
+def split_filters(query: QueryDict, names: Iterable[str]) -> tuple[QueryDict, QueryDict]:
+    """
+    Split the filters of a query in the ones that the API can evaluate, and the ones that use the
+    given (computed) columns, which must be evaluated locally.
+
+    The `where()` filters are split one by one (they are joined with AND), while the `where2()`
+    filter is evaluated locally as a whole if any of its expressions uses a computed column.
+    The columns that the local filters need are added to the columns of the remote query.
+
+    :return: a tuple of `(remote, local)` query dictionaries, `local` only has the filters
+    """
+    from tradingview_screener.fields import get_catalog
+
+    names = set(names)
+    remote: dict[str, Any] = dict(query)
+    local: dict[str, Any] = {}
+    expressions: list[FilterOperationDict] = []
+
+    filters = query.get('filter', ())
+    if any(_uses(expr, names) for expr in filters):
+        remote['filter'] = [expr for expr in filters if not _uses(expr, names)]
+        local['filter'] = [expr for expr in filters if _uses(expr, names)]
+        expressions += local['filter']
+    filter2 = query.get('filter2')
+    if filter2 and any(_uses(expr, names) for expr in _expressions(filter2)):  # pyright: ignore
+        del remote['filter2']
+        local['filter2'] = filter2
+        expressions += _expressions(filter2)  # pyright: ignore
+
+    # a string on the right side is a column only if it's a field, like `'EMA50'` (not `'NSE'`)
+    catalog = get_catalog()
+    used: dict[str, None] = {}
+    for expr in expressions:
+        left, right = _names(expr)
+        used[left] = None
+        used.update(dict.fromkeys(sorted(n for n in right if n in catalog)))
+    columns = list(query.get('columns', ()))
+    missing = [c for c in used if c not in names and c not in columns]
+    if missing:
+        remote['columns'] = [*columns, *missing]
+    return remote, local  # pyright: ignore [reportReturnType]
+
+
+def _inline(expr: Any, computed: Computed, resolving: tuple[str, ...] = ()) -> Any:
+    # replace the references to the other computed columns with their expression
+    if isinstance(expr, Column):
+        if expr.name not in computed:
+            return expr
+        if expr.name in resolving:
+            raise ValueError(f'the computed column {expr.name!r} depends on itself')
+        return _inline(computed[expr.name], computed, (*resolving, expr.name))
+    if isinstance(expr, Expression):
+        return Expression(expr.op, *(_inline(o, computed, resolving) for o in expr.operands))
+    return expr
+
+
+def _source(data: Data, name: str) -> np.ndarray:
+    if name not in data:
+        raise KeyError(f'the column {name!r} is missing from the data, add it to the query')
+    try:
+        return np.asarray(data[name], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise TypeError(f'the column {name!r} is not numeric, it cannot be used in an expression')
+
+
+def _evaluate_numpy(expr: Any, sources: dict[str, np.ndarray]) -> Any:
+    if isinstance(expr, Column):
+        return sources[expr.name]
+    if not isinstance(expr, Expression):
+        return expr
+    if expr.op == 'round':
+        return np.round(_evaluate_numpy(expr.operands[0], sources), expr.operands[1])
+    return _NUMPY_OPERATORS[expr.op](*(_evaluate_numpy(o, sources) for o in expr.operands))
+
+
+class _NumExpr:
+    # compiles an expression to a `numexpr` string, the column names become `v0`, `v1`, ...
+    # (they aren't valid identifiers, e.g. `close|1W`), and `round()` (which `numexpr` doesn't
+    # have) is evaluated separately, as a variable
+
+    def __init__(self, numexpr: Any, sources: dict[str, np.ndarray]) -> None:
+        self.numexpr = numexpr
+        self.sources = sources
+        self.variables: dict[str, np.ndarray] = {}
+        self._names: dict[str, str] = {}
+
+    def _variable(self, values: np.ndarray) -> str:
+        name = f'v{len(self.variables)}'
+        self.variables[name] = values
+        return name
+
+    def compile(self, expr: Any) -> str:
+        if isinstance(expr, Column):
+            if expr.name not in self._names:
+                self._names[expr.name] = self._variable(self.sources[expr.name])
+            return self._names[expr.name]
+        if not isinstance(expr, Expression):
+            return repr(float(expr))
+        if expr.op == 'round':
+            inner, ndigits = expr.operands
+            return self._variable(np.round(self.evaluate(inner), ndigits))
+        if expr.op == 'neg':
+            return f'(-{self.compile(expr.operands[0])})'
+        if expr.op == 'abs':
+            return f'abs({self.compile(expr.operands[0])})'
+        left, right = (self.compile(o) for o in expr.operands)
+        return f'({left} {expr.op} {right})'
+
+    def evaluate(self, expr: Any) -> np.ndarray:
+        if isinstance(expr, Column):
+            return self.sources[expr.name]
+        return self.numexpr.evaluate(self.compile(expr), local_dict=self.variables)
+
+
+def _import_numexpr() -> Any:
+    try:
+        import numexpr  # pyright: ignore [reportMissingImports]
+    except ImportError:
+        return None
+    return numexpr
+
+
+def compute(data: Data, computed: Computed, use_numexpr: bool = True) -> dict[str, np.ndarray]:
+    """
+    Evaluate the computed columns on the data, and return them as a dictionary of arrays (in the
+    same order).
+
+    A computed column can use the columns of the data and the other computed columns.
+
+    :param data: a DataFrame, or a dictionary of NumPy arrays (see `frame.to_numpy_columns()`)
+    :param computed: the computed columns, as `{name: expression}`
+    :param use_numexpr: use `numexpr` if it's installed, otherwise NumPy
+    """
+    length = len(data.index) if hasattr(data, 'index') else len(next(iter(data.values()), ()))
+    sources = {name: _source(data, name) for name in source_columns(computed)}
+    numexpr = _import_numexpr() if use_numexpr else None
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for name, expr in computed.items():
+            expr = _inline(expr, computed, (name,))
+            if numexpr is not None:
+                values = _NumExpr(numexpr, sources).evaluate(expr)
+            else:
+                values = _evaluate_numpy(expr, sources)
+            values = np.asarray(values, dtype=np.float64)
+            if values.ndim == 0:  # a constant expression (no columns), one value per row
+                values = np.full(length, values)
+            out[name] = values
+    return out
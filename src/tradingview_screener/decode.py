@@ -0,0 +1,96 @@
+"""
+Decode the JSON responses of the scanner API.
+
+The fastest JSON library that is installed is selected once, at import time: `orjson`, then
+`msgspec`, and finally the standard `json` module. When `msgspec` is installed, it's also used by
+`decode_typed()` to decode straight into the typed structs below.
+
+Run `python benchmarks/decode.py` to compare the backends.
+"""
+
+from __future__ import annotations
+
+__all__ = ['BACKEND', 'decode', 'decode_typed', 'loads', 'unpack']
+
+import json
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Union
+    from tradingview_screener.models import ScreenerDict
+
+
+try:
+    from typing import Optional
+
+    import msgspec
+
+    class ScreenerRowStruct(msgspec.Struct, gc=False):
+        """The same as `models.ScreenerRowDict`, but with attribute access."""
+
+        s: str
+        d: list
+
+    class ScreenerStruct(msgspec.Struct, gc=False):
+        """The same as `models.ScreenerDict`, but with attribute access."""
+
+        totalCount: int
+        # `null` on errors and on empty results
+        data: Optional[list[ScreenerRowStruct]] = None
+
+    _msgspec_loads = msgspec.json.Decoder().decode
+    _decode_typed = msgspec.json.Decoder(ScreenerStruct).decode
+except ImportError:
+    _msgspec_loads = _decode_typed = None
+
+# `orjson` is faster than `msgspec` for plain dictionaries (see `benchmarks/decode.py`)
+try:
+    import orjson
+
+    BACKEND = 'orjson'
+    _loads = orjson.loads
+except ImportError:
+    if _msgspec_loads is not None:
+        BACKEND = 'msgspec'
+        _loads = _msgspec_loads
+    else:
+        BACKEND = 'json'
+        _loads = json.loads
+
+if _decode_typed is None:
+    _decode_typed = _loads
+
+
+def loads(content: bytes | str) -> Any:
+    """
+    Decode a JSON document with the selected backend.
+    """
+    return _loads(content)
+
+
+def decode(content: bytes) -> ScreenerDict:
+    """
+    Decode the response of the scanner API into a plain dictionary.
+    """
+    return _loads(content)
+
+
+def decode_typed(content: bytes) -> Union[ScreenerDict, ScreenerStruct]:
+    """
+    Decode the response of the scanner API into a `ScreenerStruct` when `msgspec` is installed,
+    or into a plain dictionary otherwise (use `unpack()` to read either of them).
+
+    The structs are validated while decoding, and reading their attributes is faster than looking
+    up the keys of a dictionary.
+    """
+    return _decode_typed(content)
+
+
+def unpack(json_obj: Union[ScreenerDict, ScreenerStruct]) -> tuple[int, list[Any]]:
+    """
+    Return the `totalCount` and the `data` of a response, whether it's a dictionary or a struct
+    (a `null` data is an empty list).
+    """
+    if isinstance(json_obj, dict):
+        return json_obj['totalCount'], json_obj.get('data') or []
+    return json_obj.totalCount, json_obj.data or []
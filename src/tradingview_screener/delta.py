@@ -0,0 +1,167 @@
+"""
+Compute the difference between two successive results of a scan, so that only what changed has
+to be rendered (or sent to an alert).
+
+Examples:
+
+>>> _, before = query.get_scanner_data()
+>>> _, after = query.get_scanner_data()  # a few minutes later
+>>> d = diff(before, after, tolerances={'close': 0.05, 'volume': 1000})
+>>> d.added  # the rows of the tickers that entered the result
+>>> d.removed  # the rows of the tickers that left it
+>>> d.cells  # one row per changed value
+          ticker   column      old      new
+0   NSE:RELIANCE    close  2901.35  2903.10
+1       NSE:INFY   volume  1201312  1312441
+>>> d.apply(before).equals(after)  # up to the order of the rows
+"""
+
+from __future__ import annotations
+
+__all__ = ['Delta', 'diff']
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Any, Optional
+
+
+@dataclass(frozen=True)
+class Delta:
+    """
+    The difference between two results of a scan, keyed by `key` (the ticker by default).
+    """
+
+    key: str
+    # the rows of the new result whose key wasn't in the old one
+    added: pd.DataFrame
+    # the rows of the old result whose key isn't in the new one
+    removed: pd.DataFrame
+    # the rows of the new result with at least one changed value
+    changed: pd.DataFrame
+    # one row per changed value, with the columns `key`, `column`, `old`, `new`
+    cells: pd.DataFrame
+
+    @property
+    def empty(self) -> bool:
+        return self.added.empty and self.removed.empty and self.changed.empty
+
+    def __bool__(self) -> bool:
+        return not self.empty
+
+    def apply(self, previous: pd.DataFrame) -> pd.DataFrame:
+        """
+        Apply the delta to the old result, and return the new one (the kept rows stay in their
+        old order, and the added rows go at the end).
+        """
+        import pandas as pd
+
+        df = previous[~previous[self.key].isin(self.removed[self.key])].set_index(self.key)
+        if not self.changed.empty:
+            df.loc[self.changed[self.key], :] = self.changed.set_index(self.key)[df.columns]
+        df = df.reset_index()[previous.columns]
+        return pd.concat([df, self.added[previous.columns]], ignore_index=True)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Return the delta as a JSON-serializable dictionary, for the consumers that only want the
+        changes (like the alerts).
+        """
+        return {
+            'added': self.added.to_dict('records'),
+            'removed': self.removed[self.key].tolist(),
+            'changed': self.cells.to_dict('records'),
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} added={len(self.added)} removed={len(self.removed)} '
+            f'changed={len(self.changed)} cells={len(self.cells)}>'
+        )
+
+
+def _changed(old: np.ndarray, new: np.ndarray, tolerance: float) -> np.ndarray:
+    # compare a column of the old and new results, two nulls are equal
+    if old.dtype.kind in 'iuf' and new.dtype.kind in 'iuf':
+        old = old.astype(np.float64, copy=False)
+        new = new.astype(np.float64, copy=False)
+        both_null = np.isnan(old) & np.isnan(new)
+        return ~(np.abs(new - old) <= tolerance) & ~both_null
+
+    import pandas as pd
+
+    old_null, new_null = pd.isna(old), pd.isna(new)
+    different = np.fromiter(
+        (not (o is n or o == n) for o, n in zip(old, new)), dtype=bool, count=len(old)
+    )
+    return (different | (old_null != new_null)) & ~(old_null & new_null)
+
+
+def diff(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+    key: str = 'ticker',
+    tolerances: Optional[dict[str, float]] = None,
+    default_tolerance: float = 0,
+) -> Delta:
+    """
+    Compute the rows that were added/removed and the values that changed between two results of
+    the same scan.
+
+    :param old: the previous result
+    :param new: the current result
+    :param key: the column that identifies a row, its values must be unique
+    :param tolerances: the maximum absolute difference (per column) under which two numbers are
+        considered equal, so that tiny price movements don't count as changes
+    :param default_tolerance: the tolerance of the numeric columns that aren't in `tolerances`
+    """
+    import pandas as pd
+
+    if set(old.columns) != set(new.columns):
+        raise ValueError('the two results must have the same columns')
+    for df in (old, new):
+        if not df[key].is_unique:
+            raise ValueError(f'the values of the {key!r} column must be unique')
+    tolerances = tolerances or {}
+
+    old_keys = pd.Index(old[key])
+    new_keys = pd.Index(new[key])
+    added = new[~new_keys.isin(old_keys)].reset_index(drop=True)
+    removed = old[~old_keys.isin(new_keys)].reset_index(drop=True)
+
+    # align the rows that are in both results, in the order of the new one
+    common = new_keys[new_keys.isin(old_keys)]
+    new_positions = new_keys.get_indexer(common)
+    old_positions = old_keys.get_indexer(common)
+
+    columns = [c for c in new.columns if c != key]
+    masks = [
+        _changed(
+            old[column].to_numpy()[old_positions],
+            new[column].to_numpy()[new_positions],
+            tolerances.get(column, default_tolerance),
+        )
+        for column in columns
+    ]
+    matrix = np.column_stack(masks) if masks else np.zeros((len(common), 0), dtype=bool)
+    rows, cols = np.nonzero(matrix)
+
+    cells = pd.DataFrame(
+        {
+            key: common.to_numpy()[rows],
+            'column': np.array(columns, dtype=object)[cols],
+            # `object` so that the values of different columns keep their own types
+            'old': pd.Series(
+                [old[columns[c]].iat[old_positions[r]] for r, c in zip(rows, cols)], dtype=object
+            ),
+            'new': pd.Series(
+                [new[columns[c]].iat[new_positions[r]] for r, c in zip(rows, cols)], dtype=object
+            ),
+        }
+    )
+    changed = new.iloc[new_positions[matrix.any(axis=1)]].reset_index(drop=True)
+    return Delta(key, added, removed, changed, cells)
@@ -0,0 +1,339 @@
+"""
+Evaluate the filters of a query locally, against a DataFrame (or the NumPy columns returned by
+`frame.to_numpy_columns()`) that was already downloaded.
+
+This makes it possible to download a universe once, and then re-filter it in a few milliseconds
+every time a filter changes, instead of sending a new request to the scanner API.
+
+The semantics follow the ones of the scanner API:
+
+- nulls never match, except for the `empty` operation
+- a string on the right side of an operation is a column name if the data has that column,
+  otherwise it's a literal value (so `col('high') > 'VWAP'` compares two columns)
+- `match` is a case-insensitive substring search
+- `crosses*` need the values of the previous bar, in columns like `close[1]` and `EMA5[1]`
+
+Examples:
+
+>>> count, df = Query().select('close', 'VWAP', 'exchange').limit(5000).get_scanner_data()
+>>> mask = evaluate(col('close').above_pct('VWAP', 1.03), df)
+>>> df[mask]
+>>> df[evaluate(Or(col('exchange') == 'NYSE', col('close') < 10), df)]
+>>> filter_data(df, Query().where(col('close').between(10, 20)))
+"""
+
+from __future__ import annotations
+
+__all__ = ['evaluate', 'filter_data', 'query_mask']
+
+import operator
+from collections import ChainMap
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tradingview_screener.optimize import optimize
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Any, Callable, Mapping, Union
+    from tradingview_screener.models import (
+        ExpressionDict,
+        FilterOperationDict,
+        OperationComparisonDict,
+        OperationDict,
+        QueryDict,
+    )
+    from tradingview_screener.query import Query
+
+    Data = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+
+
+def _length(data: Data) -> int:
+    if hasattr(data, 'index'):  # DataFrame
+        return len(data.index)
+    return len(next(iter(data.values()), ()))
+
+
+def _column(data: Data, name: str) -> np.ndarray:
+    if name not in data:
+        raise KeyError(f'the column {name!r} is missing from the data, add it to the query')
+    return np.asarray(data[name])
+
+
+def _operand(data: Data, value: Any) -> Any:
+    # a string is a column name if the data has it, like the API does with `col('high') > 'VWAP'`
+    if isinstance(value, str) and value in data:
+        return np.asarray(data[value])
+    return value
+
+
+def _pct_operand(data: Data, value: Any) -> Any:
+    # the reference of the percentage operations is a column, a string can't be multiplied
+    if isinstance(value, str):
+        return _column(data, value)
+    return value
+
+
+def _is_missing(value: Any) -> bool:
+    # `None`, or the NaN of any float type (the lists of the object columns are never missing)
+    return value is None or (isinstance(value, (float, np.floating)) and bool(np.isnan(value)))
+
+
+def _isnull(values: Any) -> Union[np.ndarray, bool]:
+    if not isinstance(values, np.ndarray):
+        return _is_missing(values)
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    if values.dtype.kind == 'O':
+        return np.fromiter((_is_missing(v) for v in values), dtype=bool, count=len(values))
+    return np.zeros(len(values), dtype=bool)
+
+
+def _align(left: np.ndarray, right: Any) -> tuple[np.ndarray, Any]:
+    # compare `float32` columns (see `frame.compact()`) at their own precision, otherwise
+    # `col('close') == 150.2` would never match the `float32` value closest to 150.2
+    if isinstance(right, np.ndarray):
+        if left.dtype == np.float32 and right.dtype == np.float64:
+            return left, right.astype(np.float32)
+        if left.dtype == np.float64 and right.dtype == np.float32:
+            return left.astype(np.float32), right
+    elif left.dtype == np.float32 and isinstance(right, (int, float)):
+        return left, np.float32(right)
+    return left, right
+
+
+def _compare(op: Callable[[Any, Any], Any], left: np.ndarray, right: Any) -> np.ndarray:
+    # compare only the rows where both sides are not null, so that nulls never match and object
+    # arrays with `None` don't raise `TypeError`
+    left, right = _align(left, right)
+    valid = ~(_isnull(left) | _isnull(right))
+    out = np.zeros(len(left), dtype=bool)
+    if isinstance(right, np.ndarray):
+        out[valid] = op(left[valid], right[valid])
+    else:
+        out[valid] = op(left[valid], right)
+    return out
+
+
+def _is_bound(data: Data, value: Any) -> bool:
+    # True if `value` can be the bound of a range (a number or a column)
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, (int, float)) or (isinstance(value, str) and value in data)
+
+
+def _in_range(data: Data, left: np.ndarray, right: list) -> np.ndarray:
+    # the API uses `in_range` both for `between(a, b)` and for `isin([...])`
+    if len(right) == 2 and left.dtype.kind in 'iuf' and all(_is_bound(data, v) for v in right):
+        low, high = (_operand(data, v) for v in right)
+        return _compare(operator.ge, left, low) & _compare(operator.le, left, high)
+
+    if left.dtype.kind != 'O':
+        if left.dtype == np.float32 and all(isinstance(v, (int, float)) for v in right):
+            right = np.asarray(right, dtype=np.float32)
+        return np.isin(left, right) & ~_isnull(left)
+    allowed = set(right)
+    return np.fromiter((v in allowed for v in left), dtype=bool, count=len(left)) & ~_isnull(left)
+
+
+def _in_range_pct(data: Data, left: np.ndarray, right: list) -> np.ndarray:
+    other = _pct_operand(data, right[0])
+    pct1, pct2 = right[1], right[2] if len(right) > 2 else None
+    if pct2 is None:
+        return _compare(operator.ge, left, other * pct1)
+    low, high = sorted((pct1, pct2))
+    return _compare(operator.ge, left, other * low) & _compare(operator.le, left, other * high)
+
+
+def _match(left: np.ndarray, pattern: Any) -> np.ndarray:
+    valid = ~_isnull(left)
+    out = np.zeros(len(left), dtype=bool)
+    if valid.any():
+        strings = np.char.lower(left[valid].astype(str))
+        out[valid] = np.char.find(strings, str(pattern).lower()) >= 0
+    return out
+
+
+def _has(left: np.ndarray, values: Any) -> np.ndarray:
+    # `left` is an `object` array of lists (like `typespecs`), there is nothing to vectorize here
+    values = {values} if isinstance(values, str) else set(values)
+    return np.fromiter(
+        (
+            v is not None
+            and not isinstance(v, float)
+            and not values.isdisjoint((v,) if isinstance(v, str) else v)
+            for v in left
+        ),
+        dtype=bool,
+        count=len(left),
+    )
+
+
+def _crosses(data: Data, expr: FilterOperationDict, above: bool, below: bool) -> np.ndarray:
+    left = _column(data, expr['left'])
+    prev_left = _column(data, f'{expr["left"]}[1]')
+    right = expr['right']
+    if isinstance(right, str) and right in data:
+        right, prev_right = _column(data, right), _column(data, f'{right}[1]')
+    else:
+        prev_right = right
+
+    out = np.zeros(len(left), dtype=bool)
+    if above:
+        out |= _compare(operator.gt, left, right) & _compare(operator.le, prev_left, prev_right)
+    if below:
+        out |= _compare(operator.lt, left, right) & _compare(operator.ge, prev_left, prev_right)
+    return out
+
+
+def _calendar_range(unit: str, a: int, b: int) -> tuple[np.datetime64, np.datetime64]:
+    # the interval `[a, b]` is relative to the current day/week/month (0 is the current one)
+    today = np.datetime64('today', 'D')
+    if unit == 'day':
+        return today + a, today + b + 1
+    if unit == 'week':
+        monday = today - (today.astype('int64') - 4) % 7  # 1970-01-05 was a Monday
+        return monday + 7 * a, monday + 7 * (b + 1)
+    month = today.astype('datetime64[M]')
+    return (month + a).astype('datetime64[D]'), (month + b + 1).astype('datetime64[D]')
+
+
+def _in_calendar_range(left: np.ndarray, unit: str, right: list) -> np.ndarray:
+    start, end = _calendar_range(unit, *right)
+    # the dates are unix timestamps (in seconds)
+    start = start.astype('datetime64[s]').astype('int64')
+    end = end.astype('datetime64[s]').astype('int64')
+    return _compare(operator.ge, left, start) & _compare(operator.lt, left, end)
+
+
+_COMPARISONS = {
+    'greater': operator.gt,
+    'egreater': operator.ge,
+    'less': operator.lt,
+    'eless': operator.le,
+    'equal': operator.eq,
+    'nequal': operator.ne,
+}
+
+
+def _evaluate_expression(expr: FilterOperationDict, data: Data) -> np.ndarray:
+    op = expr['operation']
+    right = expr.get('right')
+
+    if op in ('crosses', 'crosses_above', 'crosses_below'):
+        return _crosses(data, expr, above=op != 'crosses_below', below=op != 'crosses_above')
+
+    left = _column(data, expr['left'])
+    if op in _COMPARISONS:
+        return _compare(_COMPARISONS[op], left, _operand(data, right))
+    if op == 'in_range':
+        return _in_range(data, left, right)
+    if op == 'not_in_range':
+        return ~_in_range(data, left, right) & ~_isnull(left)
+    if op == 'empty':
+        return np.asarray(_isnull(left))
+    if op == 'nempty':
+        return ~_isnull(left)
+    if op in ('match', 'smatch'):
+        return _match(left, right)
+    if op == 'nmatch':
+        return ~_match(left, right) & ~_isnull(left)
+    if op == 'has':
+        return _has(left, right)
+    if op == 'has_none_of':
+        return ~_has(left, right) & ~_isnull(left)
+    if op == 'above%':
+        return _compare(operator.gt, left, _pct_operand(data, right[0]) * right[1])
+    if op == 'below%':
+        return _compare(operator.lt, left, _pct_operand(data, right[0]) * right[1])
+    if op == 'in_range%':
+        return _in_range_pct(data, left, right)
+    if op == 'not_in_range%':
+        other = _pct_operand(data, right[0])
+        return ~_in_range_pct(data, left, right) & ~(_isnull(left) | _isnull(other))
+    if op in ('in_day_range', 'in_week_range', 'in_month_range'):
+        return _in_calendar_range(left, op[3:-6], right)
+    raise ValueError(f'unknown operation: {op!r}')
+
+
+def _evaluate_operation(operation: OperationComparisonDict, data: Data) -> np.ndarray:
+    operator_ = operation['operator']
+    if operator_ not in ('and', 'or'):
+        raise ValueError(f'unknown operator: {operator_!r}')
+
+    out = np.full(_length(data), operator_ == 'and', dtype=bool)
+    for operand in operation['operands']:
+        mask = evaluate(operand, data)
+        # stop as soon as the result can't change anymore
+        if operator_ == 'and':
+            out &= mask
+            if not out.any():
+                break
+        else:
+            out |= mask
+            if out.all():
+                break
+    return out
+
+
+def evaluate(
+    expression: Union[FilterOperationDict, ExpressionDict, OperationDict], data: Data
+) -> np.ndarray:
+    """
+    Evaluate a filter (the output of a `Column` operation, or of `And()`/`Or()`) and return a
+    boolean mask with one value per row.
+
+    :param expression: the filter to evaluate
+    :param data: a DataFrame, or a dictionary of NumPy arrays (see `frame.to_numpy_columns()`)
+
+    >>> evaluate(col('close') > col('VWAP'), df)
+    array([ True, False,  True, ...])
+    """
+    if 'operation' in expression and isinstance(expression['operation'], dict):
+        return _evaluate_operation(expression['operation'], data)  # pyright: ignore
+    if 'expression' in expression:
+        return _evaluate_expression(expression['expression'], data)  # pyright: ignore
+    return _evaluate_expression(expression, data)  # pyright: ignore
+
+
+def query_mask(query: Union[Query, QueryDict], data: Data) -> np.ndarray:
+    """
+    Evaluate all the filters of a query (both `where()` and `where2()`), and return a boolean mask
+    with one value per row.
+
+    The filters are simplified first (see `optimize.optimize()`), and the most selective ones are
+    evaluated first.
+
+    The computed columns of the query (see `Query.with_columns()`) can be used in the filters,
+    they are computed from the data if it doesn't have them already.
+    """
+    if not isinstance(query, dict) and query.computed:
+        missing = {n: e for n, e in query.computed.items() if n not in data}
+        if missing:
+            from tradingview_screener.compute import compute
+
+            data = ChainMap(compute(data, query.computed), data)  # pyright: ignore
+    # the strings that are columns of the data are compared as columns, never as literals
+    dct = optimize(query if isinstance(query, dict) else query._query, data)
+    out = np.ones(_length(data), dtype=bool)
+    for expr in dct.get('filter', ()):
+        out &= _evaluate_expression(expr, data)
+        if not out.any():
+            return out
+    if dct.get('filter2'):
+        out &= _evaluate_operation(dct['filter2'], data)  # pyright: ignore
+    return out
+
+
+def filter_data(data: Data, query: Union[Query, QueryDict]) -> Data:
+    """
+    Return the rows of `data` that match the filters of the query, `data` can be a DataFrame or
+    a dictionary of NumPy arrays.
+
+    >>> filter_data(df, Query().where(col('close') > 10, col('exchange') == 'NYSE'))
+    """
+    mask = query_mask(query, data)  # (the computed columns of the query aren't added)
+    if hasattr(data, 'index'):  # DataFrame
+        return data[mask]  # pyright: ignore
+    return {name: np.asarray(values)[mask] for name, values in data.items()}
@@ -0,0 +1,147 @@
+"""
+Split a query on several markets into one request per market, instead of a single request to the
+`/global/scan` endpoint.
+
+With a large `limit()`, a single global request is slow (the server builds the whole result
+before sending the first byte) and it's all-or-nothing: one slow or failing market fails
+everything. The per-market requests run concurrently (through `batch.run()`, so they are rate
+limited and retried), their rows are merged and sorted again by the `order_by()` of the query, and
+the `offset()`/`limit()` of the query are applied to the merged rows, so the result is the same
+as the one of the global request. The markets that failed are reported instead of raised, so
+that the rows of the others can still be shown.
+
+Examples:
+
+>>> q = Query().set_markets('america', 'india', 'uk').select('name', 'close').limit(5000)
+>>> result = fanout.scan(q.order_by('market_cap_basic', ascending=False))
+>>> result.df  # the 5000 biggest companies of the three markets
+>>> result.failed  # the markets whose request failed, like {'uk': HTTPError(...)}
+{}
+>>> count, df = result  # it unpacks like the result of `get_scanner_data()`
+"""
+
+from __future__ import annotations
+
+__all__ = ['FanOutResult', 'plan', 'scan']
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from tradingview_screener import batch
+from tradingview_screener.query import DEFAULT_RANGE
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Any, Iterator
+    from tradingview_screener.query import Query
+
+
+@dataclass(frozen=True)
+class FanOutResult:
+    """
+    The merged result of a query on several markets.
+    """
+
+    # the total number of rows that matched, in the markets that didn't fail
+    count: int
+    df: pd.DataFrame
+    # the markets that failed, with their exception
+    failed: dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.failed)
+
+    def __iter__(self) -> Iterator[Any]:
+        # so that `count, df = fanout.scan(q)` works like with `get_scanner_data()`
+        return iter((self.count, self.df))
+
+
+def _markets(query: Query) -> list[str]:
+    return list(query._query.get('markets', ()))
+
+
+def plan(query: Query, min_rows: int = 1000) -> list[Query]:
+    """
+    Return the requests that answer the query: one per market if that's faster, otherwise the
+    query itself.
+
+    A query is split when it has several markets and its `limit()` (the end of its `range`) is at
+    least `min_rows` (below that, a single request is as fast as the slowest of several
+    requests). Each market request asks for the rows from 0 to that `limit()`, since the rows of
+    the merged result can come from any of the markets, and it also selects the sort column,
+    which is needed to merge them.
+
+    :param query: the query to plan
+    :param min_rows: the smallest `limit()` for which the query is split
+    """
+    markets = _markets(query)
+    dct = query._query
+    tickers = dct.get('symbols', {}).get('tickers')
+    _, end = dct.get('range', DEFAULT_RANGE)
+    if len(markets) < 2 or tickers or end < min_rows:
+        return [query]
+
+    columns = list(dct.get('columns', ()))
+    sort_by = dct['sort']['sortBy'] if 'sort' in dct else None
+    if sort_by is not None and sort_by not in columns:
+        query = query.select(*columns, sort_by)
+    return [query.set_markets(market).offset(0).limit(end) for market in markets]
+
+
+def _merge(query: Query, frames: list[pd.DataFrame]) -> pd.DataFrame:
+    import pandas as pd
+
+    dct = query._query
+    df = pd.concat(frames, ignore_index=True)
+    if 'sort' in dct:
+        sort = dct['sort']
+        df = df.sort_values(
+            sort['sortBy'],
+            ascending=sort['sortOrder'] == 'asc',
+            na_position='first' if sort.get('nullsFirst') else 'last',
+            kind='stable',
+        )
+    start, end = dct.get('range', DEFAULT_RANGE)
+    columns = ['ticker', *dct.get('columns', ()), *query.computed]
+    return df.iloc[start:end][columns].reset_index(drop=True)
+
+
+def scan(query: Query, min_rows: int = 1000, max_concurrency: int = 8, **kwargs) -> FanOutResult:
+    """
+    Run the query with one request per market (see `plan()`), and merge the results.
+
+    If every market fails, the first exception is raised, since there are no rows to show.
+
+    :param query: the query to run
+    :param min_rows: the smallest `limit()` for which the query is split
+    :param max_concurrency: maximum number of requests in flight
+    :param kwargs: kwargs to pass to `batch.run()` (and from there to `requests.post()`)
+    :return: a `FanOutResult`, which unpacks to `(total_count, dataframe)`
+    """
+    queries = plan(query, min_rows)
+    if len(queries) == 1:
+        count, df = batch.run(queries, **kwargs)[0]  # pyright: ignore [reportGeneralTypeIssues]
+        return FanOutResult(count, df)
+
+    results = batch.run(queries, max_concurrency=max_concurrency, return_exceptions=True, **kwargs)
+    count = 0
+    frames = []
+    failed: dict[str, Exception] = {}
+    for q, result in zip(queries, results):
+        if isinstance(result, Exception):
+            failed[_markets(q)[0]] = result
+        else:
+            count += result[0]
+            frames.append(result[1])
+    if not frames:
+        raise next(iter(failed.values()))
+
+    df = _merge(query, frames)
+    # the same metadata as `Query.get_scanner_data()`, as old as the oldest market
+    created = [f.attrs['created'] for f in frames if 'created' in f.attrs]
+    if created:
+        df.attrs.update(
+            created=min(created), stale=any(f.attrs.get('stale', False) for f in frames)
+        )
+    return FanOutResult(count, df, failed)
@@ -0,0 +1,377 @@
+"""
+An offline catalog of the fields of the scanner API: their display name, type, and the instrument
+types/markets in which they are available.
+
+The catalog ships with the package as a compact JSON index (`data/fields.json`), and it's only
+parsed the first time it's used, so listing the fields never needs a network request.
+The bundled index is generated offline from the field docs, and committed with the package:
+
+    python -m tradingview_screener.fields refresh -o src/tradingview_screener/data/fields.json
+
+(until it's generated, it's a seed of the common fields, see `FieldCatalog.is_seed`). Without
+`-o` the catalog is saved in `~/.cache/tradingview_screener/` (the same directory as the response
+cache), and the most recent of the two catalogs is the one that gets loaded.
+
+Examples:
+
+>>> catalog = get_catalog()
+>>> catalog['market_cap_basic']
+Field(name='market_cap_basic', display_name='Market Capitalization', dtype='fundamental_price', ...)
+>>> catalog.get('close|1W').dtype  # the timeframe/history suffixes are ignored
+'price'
+>>> [f.name for f in catalog.search(market='india', instrument_type='stock')][:3]
+['name', 'description', 'logoid']
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'NUMERIC_DTYPES',
+    'SCREENS',
+    'UNKNOWN_DTYPE',
+    'Field',
+    'FieldCatalog',
+    'get_catalog',
+    'refresh',
+]
+
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Iterator, Optional, Union
+
+
+FORMAT_VERSION = 1
+DOCS_URL = 'https://shner-elmo.github.io/TradingView-Screener/fields/{screen}.html'
+
+# the types (of the field docs) whose values are numbers, `time` fields are unix timestamps
+NUMERIC_DTYPES = frozenset({'number', 'price', 'fundamental_price', 'percent', 'time', 'num_slice'})
+# the type of the fields of the docs that are only a list of names (without a table of types)
+UNKNOWN_DTYPE = 'unknown'
+# the source of the bundled seed catalog
+SEED_SOURCE = 'seed'
+
+_COUNTRY_MARKETS = (
+    'america', 'canada', 'brazil', 'mexico', 'uk', 'germany', 'france', 'italy', 'spain',
+    'netherlands', 'switzerland', 'sweden', 'norway', 'finland', 'denmark', 'belgium', 'austria',
+    'poland', 'portugal', 'greece', 'hungary', 'czech', 'russia', 'turkey', 'israel', 'japan',
+    'china', 'hongkong', 'india', 'singapore', 'korea', 'taiwan', 'australia', 'newzealand',
+    'southafrica', 'egypt', 'nigeria',
+)  # fmt: skip
+
+# the screens of the field docs, with the instrument types and the markets that they cover
+SCREENS: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    'stocks': (('stock', 'dr', 'fund', 'index'), _COUNTRY_MARKETS),
+    'crypto': (('crypto',), ('crypto',)),
+    'coin': (('coin',), ('coin',)),
+    'forex': (('forex',), ('forex',)),
+    'futures': (('futures',), ('futures',)),
+    'bonds': (('bond',), ('bonds',)),
+    'cfd': (('cfd',), ('cfd',)),
+    'options': (('option',), ('options',)),
+    'economics2': (('economic',), ('economics2', 'economy')),
+}
+
+_SUFFIX = re.compile(r'\|\d+[A-Za-z]?$|\[\d+\]$')
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str
+    display_name: str
+    # the type of the field docs, like `number`, `price`, `percent`, `time`, `text`, `bool`, `set`
+    dtype: str
+    instrument_types: tuple[str, ...]
+    markets: tuple[str, ...]
+
+    @property
+    def numeric(self) -> Optional[bool]:
+        # `None` if the type of the field is unknown
+        return None if self.dtype == UNKNOWN_DTYPE else self.dtype in NUMERIC_DTYPES
+
+
+class FieldCatalog:
+    """
+    The fields of the catalog, by name.
+
+    Use `get_catalog()` rather than creating it directly.
+    """
+
+    def __init__(self, index: dict) -> None:
+        if index.get('version') != FORMAT_VERSION:
+            raise ValueError(f'unsupported catalog version: {index.get("version")!r}')
+        self.generated: str = index['generated']
+        self.source: str = index['source']
+
+        screens = index['screens']  # `{screen: [instrument_types, markets]}`, in bit order
+        masks = [(tuple(types), tuple(markets)) for types, markets in screens.values()]
+        dtypes = index['dtypes']
+        # `{screen: [exchanges]}`, the exchanges listed in the field docs of each screen
+        self._exchanges: dict[str, list[str]] = index.get('exchanges', {})
+        self._screens = screens
+        self._fields: dict[str, Field] = {}
+        for name, display_name, dtype, mask in index['fields']:
+            instrument_types: dict[str, None] = {}
+            markets: dict[str, None] = {}
+            for bit, (types, mkts) in enumerate(masks):
+                if mask >> bit & 1:
+                    instrument_types.update(dict.fromkeys(types))
+                    markets.update(dict.fromkeys(mkts))
+            self._fields[name] = Field(
+                name, display_name, dtypes[dtype], tuple(instrument_types), tuple(markets)
+            )
+
+    @property
+    def is_seed(self) -> bool:
+        """
+        Whether this is the seed catalog bundled with the package (only the common fields), rather
+        than a catalog generated from the field docs (see `refresh()`).
+        """
+        return self.source == SEED_SOURCE
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __iter__(self) -> Iterator[Field]:
+        return iter(self._fields.values())
+
+    def __contains__(self, name: object) -> bool:
+        return self.get(name) is not None  # type: ignore[arg-type]
+
+    def __getitem__(self, name: str) -> Field:
+        field = self.get(name)
+        if field is None:
+            raise KeyError(name)
+        return field
+
+    def get(self, name: str, default: Optional[Field] = None) -> Optional[Field]:
+        """
+        Return the field with the given name, ignoring the timeframe (`close|1W`) and history
+        (`close[1]`) suffixes.
+        """
+        field = self._fields.get(name)
+        if field is None and isinstance(name, str):
+            field = self._fields.get(_SUFFIX.sub('', name))
+        return default if field is None else field
+
+    def search(
+        self, market: Optional[str] = None, instrument_type: Optional[str] = None
+    ) -> list[Field]:
+        """
+        Return the fields that are available in the given market and/or for the given instrument
+        type (e.g. `search(market='india', instrument_type='stock')`).
+        """
+        return [
+            f
+            for f in self._fields.values()
+            if (market is None or market in f.markets)
+            and (instrument_type is None or instrument_type in f.instrument_types)
+        ]
+
+    def exchanges(
+        self, market: Optional[str] = None, instrument_type: Optional[str] = None
+    ) -> list[str]:
+        """
+        Return the exchanges of the screens that cover the given market and/or instrument type,
+        sorted by name (e.g. `exchanges(instrument_type='crypto')`).
+        """
+        exchanges: set[str] = set()
+        for screen, (types, markets) in self._screens.items():
+            if (market is None or market in markets) and (
+                instrument_type is None or instrument_type in types
+            ):
+                exchanges.update(self._exchanges.get(screen, ()))
+        return sorted(exchanges)
+
+    def numeric(self, name: str) -> Optional[bool]:
+        """
+        Return whether the values of the field are numbers, or `None` if the field isn't in the
+        catalog (or if its type is unknown).
+        """
+        field = self.get(name)
+        return None if field is None else field.numeric
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} fields={len(self)} generated={self.generated!r}>'
+
+
+def _bundled_path() -> Path:
+    return Path(__file__).parent / 'data' / 'fields.json'
+
+
+def _user_path() -> Path:
+    root = os.environ.get('TRADINGVIEW_SCREENER_CACHE_DIR')
+    if not root:
+        root = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        root = Path(root) / 'tradingview_screener'
+    return Path(root) / 'fields.json'
+
+
+def _load(path: Path) -> Optional[dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == FORMAT_VERSION else None
+
+
+_catalog: Optional[FieldCatalog] = None
+_lock = threading.Lock()
+
+
+def get_catalog() -> FieldCatalog:
+    """
+    Return the field catalog, it's loaded the first time this is called.
+
+    If the catalog was refreshed (see `refresh()`), the most recent of the refreshed and the
+    bundled catalogs is used.
+    """
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                indexes = [i for i in (_load(_bundled_path()), _load(_user_path())) if i]
+                if not indexes:
+                    raise FileNotFoundError(f'the field catalog is missing: {_bundled_path()}')
+                _catalog = FieldCatalog(max(indexes, key=lambda i: i['generated']))
+    return _catalog
+
+
+def _build_index(
+    screens: dict[str, list[tuple[str, str, str]]],
+    generated: str,
+    source: str,
+    exchanges: Optional[dict[str, list[str]]] = None,
+) -> dict:
+    # `screens` is `{screen: [(name, display_name, dtype), ...]}`, the fields that are in several
+    # screens are stored once, with a bitmask of the screens (in the order of `SCREENS`)
+    order = list(SCREENS)
+    dtypes: list[str] = []
+    fields: dict[str, list] = {}
+    for screen, rows in screens.items():
+        bit = 1 << order.index(screen)
+        for name, display_name, dtype in rows:
+            if name in fields:
+                fields[name][3] |= bit
+                continue
+            if dtype not in dtypes:
+                dtypes.append(dtype)
+            fields[name] = [name, display_name, dtypes.index(dtype), bit]
+    index = {
+        'version': FORMAT_VERSION,
+        'generated': generated,
+        'source': source,
+        'screens': {s: [list(types), list(markets)] for s, (types, markets) in SCREENS.items()},
+        'dtypes': dtypes,
+        'fields': list(fields.values()),
+    }
+    if exchanges:
+        index['exchanges'] = {s: sorted(e) for s, e in exchanges.items() if e}
+    return index
+
+
+def _parse_docs(text: str) -> tuple[list[tuple[str, str, str]], list[str]]:
+    # return the `(name, display_name, dtype)` of the fields and the exchanges of a docs page.
+    # The docs are either a plain list of names (`- name` lines), or an HTML table with one
+    # `name | display name | type | exchanges` row per field
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('- ') and line[2:].strip():
+            name = line[2:].strip()
+            rows.append((name, name, UNKNOWN_DTYPE))
+    if rows or '<tr' not in text:
+        return rows, []
+
+    from bs4 import BeautifulSoup  # pyright: ignore [reportMissingImports]
+
+    exchanges: set[str] = set()
+    for tr in BeautifulSoup(text, 'html.parser').select('tr'):
+        cells = [td.get_text(strip=True) for td in tr.find_all('td')]
+        if len(cells) >= 3 and all(cells[:3]):
+            rows.append((cells[0], cells[1], cells[2]))
+            if len(cells) > 3:
+                exchanges.update(e.strip() for e in cells[3].split(',') if e.strip())
+    return rows, sorted(exchanges)
+
+
+def refresh(path: Optional[Union[str, Path]] = None, timeout: float = 10) -> FieldCatalog:
+    """
+    Download the field docs of every screen, and save them as the new catalog.
+
+    :param path: where to save the catalog, by default in `~/.cache/tradingview_screener/` (the
+        directory can be changed with the `TRADINGVIEW_SCREENER_CACHE_DIR` environment variable)
+    :param timeout: the timeout of each request, in seconds
+    """
+    import datetime
+
+    import requests
+
+    global _catalog
+    screens = {}
+    exchanges = {}
+    for screen in SCREENS:
+        r = requests.get(DOCS_URL.format(screen=screen), timeout=timeout)
+        r.raise_for_status()
+        screens[screen], exchanges[screen] = _parse_docs(r.text)
+    if not any(screens.values()):
+        raise ValueError('no fields found in the field docs, did their format change?')
+
+    # the list format of the docs has no display names and types, take them from the seed
+    seed = _load(_bundled_path())
+    if seed is not None:
+        known = FieldCatalog(seed)
+        for rows in screens.values():
+            for i, (name, _, dtype) in enumerate(rows):
+                field = known._fields.get(name)
+                if dtype == UNKNOWN_DTYPE and field is not None:
+                    rows[i] = (name, field.display_name, field.dtype)
+        for screen, names in seed.get('exchanges', {}).items():
+            if not exchanges.get(screen):
+                exchanges[screen] = names
+
+    generated = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    index = _build_index(screens, generated=generated, source=DOCS_URL, exchanges=exchanges)
+    path = _user_path() if path is None else Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+    with _lock:
+        _catalog = FieldCatalog(index)
+    return _catalog
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m tradingview_screener.fields', description='The offline field catalog.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = subparsers.add_parser('refresh', help='regenerate it from the field docs')
+    refresh_parser.add_argument('-o', '--output', help='where to save it')
+    show_parser = subparsers.add_parser('show', help='list the fields')
+    show_parser.add_argument('--market')
+    show_parser.add_argument('--instrument-type')
+    args = parser.parse_args(argv)
+
+    if args.command == 'refresh':
+        catalog = refresh(args.output)
+        print(f'Saved {len(catalog)} fields ({catalog.generated})')
+    else:
+        for field in get_catalog().search(args.market, args.instrument_type):
+            print(f'{field.name:<45} {field.dtype:<18} {field.display_name}')
+
+
+if __name__ == '__main__':
+    main()
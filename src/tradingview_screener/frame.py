@@ -0,0 +1,212 @@
+"""
+Build DataFrames (or plain NumPy arrays) from the responses of the scanner API, one column at a
+time, instead of going through a list of rows.
+
+`compact()` shrinks a DataFrame that is kept in memory for a long time (like the market snapshots
+of `universe.UniverseService`), and `memory_usage()` measures it.
+"""
+
+from __future__ import annotations
+
+__all__ = ['CATEGORICAL_COLUMNS', 'compact', 'memory_usage', 'to_dataframe', 'to_numpy_columns']
+
+import itertools
+from operator import attrgetter, itemgetter
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tradingview_screener.decode import unpack
+from tradingview_screener.fields import get_catalog
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Collection, Iterable, Optional, Sequence
+    from tradingview_screener.decode import ScreenerStruct
+    from tradingview_screener.models import ScreenerDict
+
+
+# low-cardinality string fields, they are stored as `pd.Categorical`
+CATEGORICAL_COLUMNS = frozenset({'sector', 'industry', 'exchange', 'type'})
+
+
+def _convert(values: np.ndarray, numeric: Optional[bool] = None) -> np.ndarray:
+    # `values` is a column of the `object` array, convert it to a numeric dtype if we can.
+    # `numeric` is the type of the field in the catalog (`None` if it isn't there), the text
+    # fields are returned as they are without looking at their values
+    if numeric is False:
+        return values
+    first = next((v for v in values if v is not None), None)
+
+    # `bool` is a subclass of `int`, and we never want to convert strings like `'500325'`
+    if not isinstance(first, (int, float)) or isinstance(first, bool):
+        return values
+
+    try:
+        arr = values.astype(np.float64)  # `None` becomes `NaN`
+    except (ValueError, TypeError):
+        return values  # mixed types, keep them as they are
+
+    # keep integer fields (like `volume`) as integers when there are no nulls
+    if isinstance(first, int) and not np.isnan(arr).any() and (arr == np.trunc(arr)).all():
+        return arr.astype(np.int64)
+    return arr
+
+
+def _transpose(json_obj: ScreenerDict | ScreenerStruct, columns: Sequence[str]) -> list[np.ndarray]:
+    _, data = unpack(json_obj)
+    n_columns = len(columns)
+    n_rows = len(data)
+
+    # the rows are either dictionaries or `ScreenerRowStruct` objects (see `decode.decode_typed()`)
+    if data and not isinstance(data[0], dict):
+        get_symbol, get_values = attrgetter('s'), attrgetter('d')
+    else:
+        get_symbol, get_values = itemgetter('s'), itemgetter('d')
+
+    tickers = np.fromiter(map(get_symbol, data), dtype=object, count=n_rows)
+    # flatten all the values into a single `object` array and reshape it, `np.fromiter()` doesn't
+    # look inside the values, so fields that are lists (like `typespecs`) stay as they are
+    matrix = np.fromiter(
+        itertools.chain.from_iterable(map(get_values, data)),
+        dtype=object,
+        count=n_rows * n_columns,
+    ).reshape(n_rows, n_columns)
+    catalog = get_catalog()
+    return [tickers, *(_convert(matrix[:, i], catalog.numeric(c)) for i, c in enumerate(columns))]
+
+
+def to_numpy_columns(
+    json_obj: ScreenerDict | ScreenerStruct, columns: Iterable[str]
+) -> dict[str, np.ndarray]:
+    """
+    Transpose the rows returned by the API into one NumPy array per column.
+
+    Numeric fields become `int64` (or `float64` when they contain nulls/floats), everything else
+    stays as an `object` array. The tickers are stored under the `ticker` key.
+
+    Examples:
+
+    >>> json_obj = Query().select('close', 'volume').get_scanner_data_raw()
+    >>> to_numpy_columns(json_obj, ['close', 'volume'])
+    {'ticker': array(['NASDAQ:NVDA', 'AMEX:SPY', ...], dtype=object),
+     'close': array([116.14, 542.04, ...]),
+     'volume': array([312636630, 52331224, ...])}
+    """
+    columns = list(columns)
+    return dict(zip(['ticker', *columns], _transpose(json_obj, columns)))
+
+
+def to_dataframe(
+    json_obj: ScreenerDict | ScreenerStruct, columns: Iterable[str], categorical: bool = False
+) -> pd.DataFrame:
+    """
+    Build a DataFrame from the response of the API, column by column.
+
+    This is much faster than letting pandas infer the dtypes of every row.
+
+    :param json_obj: the response of `Query.get_scanner_data_raw()` (or `decode.decode_typed()`)
+    :param columns: the columns that were selected in the query
+    :param categorical: store the fields in `CATEGORICAL_COLUMNS` as `pd.Categorical` (note that
+        unlike strings, categoricals can't be concatenated or assigned new values)
+    """
+    import pandas as pd
+
+    columns = list(columns)
+    arrays = _transpose(json_obj, columns)
+    columns = ['ticker', *columns]
+
+    # the keys are positional so that selecting the same column twice still works
+    dct = {}
+    for i, (name, arr) in enumerate(zip(columns, arrays)):
+        dct[i] = pd.Categorical(arr) if categorical and name in CATEGORICAL_COLUMNS else arr
+
+    df = pd.DataFrame(dct, copy=False)
+    df.columns = columns
+    return df
+
+
+def _to_float32(values: np.ndarray, rtol: float) -> Optional[np.ndarray]:
+    # return the values as `float32` if none of them moves by more than `rtol` (relative)
+    small = values.astype(np.float32)
+    with np.errstate(over='ignore', invalid='ignore'):
+        error = np.abs(small.astype(np.float64) - values)
+        ok = (error <= rtol * np.abs(values)) | np.isnan(values) | (small == values)
+    return small if ok.all() else None
+
+
+def compact(
+    df: pd.DataFrame,
+    categorical: Optional[Collection[str]] = None,
+    rtol: float = 0,
+    read_only: bool = False,
+) -> pd.DataFrame:
+    """
+    Return a copy of the DataFrame that takes less memory.
+
+    - the string columns with repeated values (at most one distinct value every two rows) are
+      dictionary-encoded as `pd.Categorical`, like `sector`, `industry`, `exchange` and `type`
+    - the `float64` columns are stored as `float32` when precision allows, that is when no value
+      changes by more than `rtol` (with the default of 0, only when every value is exact in
+      `float32`, like volumes with nulls, counts and ratings)
+
+    Note that `float32` values are compared at their own precision by `evaluate`, so
+    `col('close') == 150.2` still matches after the column was compacted with `rtol=1e-6`.
+
+    :param df: the DataFrame to compact (it isn't modified)
+    :param categorical: the columns to dictionary-encode (regardless of how many distinct values
+        they have), by default all the string columns with repeated values
+    :param rtol: the maximum relative error of the values that are stored as `float32`
+    :param read_only: make the numeric arrays of the result read-only, for DataFrames that are
+        shared between threads (assigning to one of their values then raises an error instead of
+        silently changing the data of everybody else)
+
+    Examples:
+
+    >>> count, df = Query().select('name', 'sector', 'close', 'volume').limit(20_000).get_scanner_data()
+    >>> memory_usage(df), memory_usage(compact(df, rtol=1e-6))
+    (4912403, 1801287)
+    """
+    import pandas as pd
+
+    dct = {}
+    for i, name in enumerate(df.columns):
+        values = df.iloc[:, i]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            dct[i] = values.array.remove_unused_categories()
+            continue
+
+        arr = values.to_numpy()
+        if arr.dtype == np.float64:
+            small = _to_float32(arr, rtol)
+            arr = arr.copy() if small is None else small
+        elif arr.dtype == object and pd.api.types.infer_dtype(arr, skipna=True) == 'string':
+            if categorical is not None:
+                encode = name in categorical
+            else:
+                encode = len(pd.unique(arr)) <= len(arr) // 2
+            if encode:
+                dct[i] = pd.Categorical(arr)
+                continue
+            arr = arr.copy()
+        else:
+            arr = arr.copy()
+
+        # (pandas can't compute the memory usage of read-only `object` arrays, so they stay as
+        # they are)
+        if read_only and arr.dtype != object:
+            arr.flags.writeable = False
+        dct[i] = arr
+
+    out = pd.DataFrame(dct, index=df.index, copy=False)
+    out.columns = df.columns
+    out.attrs.update(df.attrs)
+    return out
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """
+    Return the memory used by the DataFrame in bytes, including the strings of the `object`
+    columns.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
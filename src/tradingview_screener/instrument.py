@@ -0,0 +1,350 @@
+"""
+Timings of every scan, per phase: network (connect, time to first byte, download), JSON decode,
+DataFrame build, plus the size of the response, the shape of the result and the cache outcome.
+
+The timings are only collected when at least one hook is installed, otherwise the scans don't pay
+anything for them. A hook is a function that receives a `ScanTimings` at the end of each scan
+(`Query.get_scanner_data()`, `get_scanner_data_raw()`, `get_scanner_data_numpy()` and their async
+versions).
+
+The module ships a default in-process metrics registry (`REGISTRY`), that aggregates the timings
+into counters and histograms, and exports them in the Prometheus text format or as JSON.
+
+Examples:
+
+>>> instrument.enable_metrics()  # aggregate every scan into `instrument.REGISTRY`
+>>> Query().select('close').get_scanner_data()
+>>> print(instrument.REGISTRY.to_prometheus())
+# TYPE tradingview_screener_scans_total counter
+tradingview_screener_scans_total{cache="off",method="get_scanner_data",status="ok"} 1
+...
+
+>>> instrument.add_hook(instrument.json_log_hook())  # one JSON log line per scan
+>>> instrument.add_hook(lambda t: print(f'{t.url}: {t.total * 1000:.0f} ms ({t.cache})'))
+
+>>> with instrument.REGISTRY.timer('postprocess', page='heatmap'):  # time page-side code
+...     df = df.groupby('sector', observed=True).mean()
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'REGISTRY',
+    'MetricsRegistry',
+    'ScanTimings',
+    'add_hook',
+    'enable_metrics',
+    'json_log_hook',
+    'remove_hook',
+]
+
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+    from typing import Any, Callable, Iterator, Optional
+    from tradingview_screener.query import Query
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'tradingview_screener'
+# the phases of a scan that are observed in the histograms of the registry, in seconds
+PHASES = ('connect', 'ttfb', 'download', 'request', 'decode', 'frame', 'total')
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class ScanTimings:
+    """
+    The timings (in seconds) of one scan, the phases that didn't happen are `None` (like the
+    network phases of a cache hit, or `connect` when a keep-alive connection was reused or the
+    transport can't measure it).
+    """
+
+    # the method of `Query` that was called, like `get_scanner_data`
+    method: str
+    url: str
+    # `off` (the query isn't cached), `hit`, `stale` (served while refreshed) or `miss`
+    cache: str = 'off'
+    connect: Optional[float] = None
+    # from sending the request to receiving the headers of the response (the `elapsed` of the
+    # response, the transports that can't measure it leave it empty)
+    ttfb: Optional[float] = None
+    download: Optional[float] = None
+    # the whole request, as seen by the caller (`connect` + `ttfb` + `download` + overhead)
+    request: Optional[float] = None
+    # the size of the response body
+    bytes: Optional[int] = None
+    decode: Optional[float] = None
+    frame: Optional[float] = None
+    rows: Optional[int] = None
+    columns: Optional[int] = None
+    total: float = 0.0
+    # the type of the exception, if the scan failed
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+_hooks: list[Callable[[ScanTimings], Any]] = []
+_hooks_lock = threading.Lock()
+_current: contextvars.ContextVar[Optional[ScanTimings]] = contextvars.ContextVar(
+    'tradingview_screener_scan', default=None
+)
+
+
+def add_hook(hook: Callable[[ScanTimings], Any]) -> None:
+    """
+    Call `hook(timings)` at the end of every scan (in the thread of the scan, so it should be
+    fast). The exceptions of the hooks are logged and ignored.
+    """
+    global _hooks
+    with _hooks_lock:
+        _hooks = [*_hooks, hook]  # copied, so that the scans iterate without the lock
+
+
+def remove_hook(hook: Callable[[ScanTimings], Any]) -> None:
+    global _hooks
+    with _hooks_lock:
+        _hooks = [h for h in _hooks if h != hook]  # (bound methods are equal, not identical)
+
+
+@contextlib.contextmanager
+def scan(query: Query, method: str) -> Iterator[Optional[ScanTimings]]:
+    # collect the timings of one call of `Query`, if there are hooks
+    hooks = _hooks
+    if not hooks or _current.get() is not None:  # (a nested call is part of the outer scan)
+        yield None
+        return
+
+    timings = ScanTimings(method=method, url=query.url)
+    token = _current.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    except BaseException as e:
+        timings.error = type(e).__name__
+        raise
+    finally:
+        timings.total = time.perf_counter() - start
+        _current.reset(token)
+        for hook in hooks:
+            try:
+                hook(timings)
+            except Exception:
+                logger.exception('the instrumentation hook %r failed', hook)
+
+
+@contextlib.contextmanager
+def _timed(name: str, timings: ScanTimings) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, name, (getattr(timings, name) or 0.0) + time.perf_counter() - start)
+
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def phase(name: str) -> contextlib.AbstractContextManager:
+    # time a phase (`decode`, `frame`, `request`) of the current scan, if it's instrumented
+    timings = _current.get()
+    return _NULL_CONTEXT if timings is None else _timed(name, timings)
+
+
+def record(**values: Any) -> None:
+    # set some fields of the current scan (like `cache='hit'` or `rows=50`), if it's instrumented
+    timings = _current.get()
+    if timings is not None:
+        for name, value in values.items():
+            setattr(timings, name, value)
+
+
+def record_response(response: requests.Response) -> None:
+    # the network timings of the response of the current scan, the request must have been timed
+    # (with `phase('request')`) already
+    timings = _current.get()
+    if timings is None:
+        return
+    timings.bytes = len(response.content)
+    ttfb = response.elapsed.total_seconds() if response.elapsed else None
+    connect = getattr(response, 'connect_time', None)
+    if ttfb is not None and connect is not None:
+        ttfb = max(ttfb - connect, 0.0)
+    timings.connect = connect
+    timings.ttfb = ttfb
+    if ttfb is not None and timings.request is not None:
+        timings.download = max(timings.request - ttfb - (connect or 0.0), 0.0)
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (k, v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')) for k, v in labels
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms, fed by `observe()` (a scan hook, see `enable_metrics()`)
+    and by `timer()`.
+
+    It's thread-safe, and it can be exported as Prometheus text (`to_prometheus()`, e.g. for a
+    `/metrics` endpoint) or as a JSON-serializable dictionary (`to_json()`).
+
+    :param buckets: the upper bounds of the buckets of the histograms, in seconds
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        # `(name, labels)` -> `[count per bucket..., count, sum]`
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe_value(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += value
+
+    @contextlib.contextmanager
+    def timer(self, phase: str, **labels: str) -> Iterator[None]:
+        """
+        Observe the duration of the block in the `phase_seconds` histogram, e.g. to time the
+        page-side post-processing of a scan result.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_value('phase_seconds', time.perf_counter() - start, phase=phase, **labels)
+
+    def observe(self, timings: ScanTimings) -> None:
+        """
+        Aggregate the timings of a scan, it's the hook installed by `enable_metrics()`.
+        """
+        status = 'ok' if timings.error is None else 'error'
+        self.inc('scans_total', method=timings.method, cache=timings.cache, status=status)
+        if timings.bytes is not None:
+            self.inc('response_bytes_total', timings.bytes)
+        if timings.rows is not None:
+            self.inc('rows_total', timings.rows)
+        for name in PHASES:
+            value = getattr(timings, name)
+            if value is not None:
+                self.observe_value('phase_seconds', value, phase=name)
+
+    def to_prometheus(self) -> str:
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, list(v)) for k, v in self._histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {PREFIX}_{name} counter')
+            lines.append(f'{PREFIX}_{name}{_labels(labels)} {value:g}')
+        for (name, labels), histogram in histograms:
+            metric = f'{PREFIX}_{name}'
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {metric} histogram')
+            for bound, count in zip((*self.buckets, '+Inf'), (*histogram[:-2], histogram[-2])):
+                le = bound if isinstance(bound, str) else f'{bound:g}'
+                lines.append(f'{metric}_bucket{_labels((*labels, ("le", le)))} {count:g}')
+            lines.append(f'{metric}_sum{_labels(labels)} {histogram[-1]:g}')
+            lines.append(f'{metric}_count{_labels(labels)} {histogram[-2]:g}')
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> dict[str, Any]:
+        """
+        Return the metrics as a JSON-serializable dictionary, like
+        `{'counters': [{'name': ..., 'labels': {...}, 'value': 3}], 'histograms': [...]}`.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, list(v)) for k, v in self._histograms.items())
+        return {
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in counters
+            ],
+            'histograms': [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'buckets': dict(zip(map(str, self.buckets), histogram[:-2])),
+                    'count': histogram[-2],
+                    'sum': histogram[-1],
+                }
+                for (name, labels), histogram in histograms
+            ],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} counters={len(self._counters)} '
+            f'histograms={len(self._histograms)}>'
+        )
+
+
+REGISTRY = MetricsRegistry()
+
+
+def enable_metrics(registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """
+    Aggregate the timings of every scan into the registry (the default `REGISTRY`), and return it.
+    """
+    registry = REGISTRY if registry is None else registry
+    if registry.observe not in _hooks:
+        add_hook(registry.observe)
+    return registry
+
+
+def json_log_hook(
+    log: Optional[logging.Logger] = None, level: int = logging.INFO
+) -> Callable[[ScanTimings], None]:
+    """
+    Return a hook that logs the timings of every scan as a single JSON line.
+    """
+    log = logger if log is None else log
+
+    def hook(timings: ScanTimings) -> None:
+        if log.isEnabledFor(level):
+            log.log(level, json.dumps(timings.to_dict(), separators=(',', ':')))
+
+    return hook
@@ -0,0 +1,524 @@
+"""
+A local scan engine: download a market once with the screener client (`tradingview_screener.Query`)
+and filter it locally, as many times as needed.
+
+The filters are evaluated as a single fused boolean mask over NumPy columns: with `numexpr`
+installed (`pip install numexpr`) all the numeric comparisons are compiled into one expression that
+is evaluated in a single multi-threaded pass without temporaries, otherwise each comparison is
+`&=`'d in place into the same mask. Both release the GIL, unlike a pool of threads doing pandas
+boolean masking on slices of the DataFrame.
+
+Above `PROCESS_POOL_MIN_ROWS` rows (and with more than one CPU) the mask is split across a process
+pool: the numeric columns of a downloaded market are copied once into shared memory (shared by
+every query, and released when the market is evicted from `DATA_CACHE`), every worker
+evaluates the filters on its slice of rows and writes its part of the mask into a shared output
+buffer, so nothing is pickled but the filters. `benchmarks/local_engine.py` measures where each
+strategy wins. The workers import this module by name (`tradingview_screener.local_engine`), so the
+pool works with every start method (`fork`, `forkserver` and `spawn`).
+
+Examples:
+
+>>> q = Query(market='india').add_filter(col('close') > 100).add_filter(col('volume') >= 1e6)
+>>> q.get_data()  # the rows of the market that match every filter
+"""
+
+__all__ = [
+    'DATA_CACHE',
+    'RESULT_CACHE',
+    'Column',
+    'Filter',
+    'MarketData',
+    'Query',
+    'SharedColumns',
+    'TTLCache',
+    'col',
+    'filter_key',
+    'fused_mask',
+    'parallel_mask',
+]
+
+import atexit
+import json
+import logging
+import operator
+import os
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+# Below this many rows one fused mask in this process is faster than splitting it across processes
+# (the workers have to be woken up and their slices joined), see `benchmarks/local_engine.py`
+PROCESS_POOL_MIN_ROWS = int(os.environ.get('SCREENER_PROCESS_POOL_MIN_ROWS', '2000000'))
+
+
+@dataclass
+class Filter:
+    column: str
+    operator: str
+    value: Any
+
+
+def filter_key(filters: Sequence[Filter]) -> str:
+    """
+    A canonical representation of the filters, to use as a cache key: it doesn't depend on their
+    order (they are joined with AND) or on duplicates, and equal numbers are equal keys
+    (`col('close') > 100` and `col('close') > 100.0`).
+    """
+
+    def canonical(value: Any) -> Any:
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (int, float, np.number)):
+            return float(value)
+        return value
+
+    terms = {(f.column, f.operator, json.dumps(canonical(f.value), default=str)) for f in filters}
+    return json.dumps(sorted(terms), separators=(',', ':'))
+
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, MarketData):
+        value = value.data
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries expire `ttl` seconds after they were stored.
+
+    Every entry has its own timestamp, and the cache is bounded both by the number of entries and
+    by their total size (the deep memory usage of DataFrames), the least recently used entries are
+    evicted first.
+
+    :param maxsize: maximum number of entries
+    :param max_bytes: maximum total size of the entries
+    :param ttl: default maximum age of an entry, in seconds
+    """
+
+    def __init__(self, maxsize: int = 32, max_bytes: int = 256 * 1024**2, ttl: float = 300):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.nbytes = 0
+        # key -> (created, value, size), from the least to the most recently used
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, ttl: Optional[float] = None) -> Optional[Any]:
+        """Return the value, or None if it's missing or older than `ttl` (default `self.ttl`)"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time(), value, size)
+            self.nbytes += size
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.maxsize or self.nbytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        self.nbytes -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """The counters of the cache, like `{"hits": 10, "misses": 2, ...}`"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': len(self._entries),
+            'nbytes': self.nbytes,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f'<TTLCache entries={len(self)}/{self.maxsize} nbytes={self.nbytes} '
+            f'hits={self.hits} misses={self.misses} evictions={self.evictions}>'
+        )
+
+
+# Shared by every `Query`: the downloaded markets (`MarketData`), and the filtered results
+DATA_CACHE = TTLCache(maxsize=8, max_bytes=1024**3)
+RESULT_CACHE = TTLCache(maxsize=64, max_bytes=256 * 1024**2)
+
+
+def _import_numexpr() -> Any:
+    try:
+        import numexpr  # pyright: ignore [reportMissingImports]
+    except ImportError:
+        return None
+    return numexpr
+
+
+def _is_numeric(values: np.ndarray, value: Any) -> bool:
+    # the comparisons that `numexpr` can evaluate (and that can be evaluated in shared memory)
+    return (
+        values.dtype.kind in 'fiub'
+        and isinstance(value, (int, float, np.number))
+        and not isinstance(value, bool)
+    )
+
+
+def fused_mask(
+    columns: Dict[str, np.ndarray],
+    filters: Sequence[Filter],
+    start: int = 0,
+    stop: Optional[int] = None,
+    use_numexpr: bool = True,
+) -> np.ndarray:
+    """
+    Evaluate all the filters (joined with AND) on the rows `start:stop` of the columns, and return
+    a boolean mask.
+
+    The numeric comparisons are fused into a single `numexpr` expression if it's installed, the
+    others (e.g. `==` on strings) are evaluated with NumPy.
+    """
+    length = len(next(iter(columns.values()))) if columns else 0
+    stop = length if stop is None else stop
+    numexpr = _import_numexpr() if use_numexpr else None
+
+    terms = []
+    variables: Dict[str, Any] = {}
+    mask = None
+    for i, condition in enumerate(filters):
+        if condition.operator not in OPERATORS:
+            raise ValueError(f'unknown operator: {condition.operator!r}')
+        if condition.column not in columns:
+            raise KeyError(f'the column {condition.column!r} is missing from the data')
+        values = columns[condition.column][start:stop]
+        if numexpr is not None and _is_numeric(values, condition.value):
+            variables[f'v{i}'], variables[f'c{i}'] = values, condition.value
+            terms.append(f'(v{i} {condition.operator} c{i})')
+            continue
+        with np.errstate(invalid='ignore'):
+            result = np.asarray(OPERATORS[condition.operator](values, condition.value), dtype=bool)
+        if mask is None:
+            mask = result
+        else:
+            mask &= result
+
+    if terms:
+        result = numexpr.evaluate(' & '.join(terms), local_dict=variables)
+        mask = result if mask is None else mask & result
+    return np.ones(stop - start, dtype=bool) if mask is None else mask
+
+
+def _release(blocks: List[Tuple[shared_memory.SharedMemory, str]]) -> None:
+    for block, _ in blocks:
+        block.close()
+        block.unlink()
+
+
+class SharedColumns:
+    """
+    The numeric columns of a DataFrame, copied once into shared memory blocks so that the workers
+    of the process pool can read them without pickling.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.length = len(data)
+        self._blocks: Dict[str, Tuple[shared_memory.SharedMemory, str]] = {}
+        for name in data.columns:
+            values = data[name].to_numpy()
+            if values.dtype.kind not in 'fiub':
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+            self._blocks[name] = (block, values.dtype.str)
+        # the blocks are released when the object is garbage collected, or at exit
+        self._finalizer = weakref.finalize(self, _release, list(self._blocks.values()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._blocks
+
+    def specs(self) -> List[Tuple[str, str, str]]:
+        """The `(column, block name, dtype)` of every column, to attach them in the workers."""
+        return [(name, block.name, dtype) for name, (block, dtype) in self._blocks.items()]
+
+    def close(self) -> None:
+        self._finalizer()
+        self._blocks.clear()
+
+
+class MarketData:
+    """
+    A downloaded market (an entry of `DATA_CACHE`), and its numeric columns in shared memory,
+    created the first time the process pool is used and shared by every query.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self._shared: Optional[SharedColumns] = None
+        self._lock = threading.Lock()
+
+    def shared(self) -> SharedColumns:
+        with self._lock:
+            if self._shared is None:
+                self._shared = SharedColumns(self.data)
+            return self._shared
+
+
+def _mask_worker(
+    specs: List[Tuple[str, str, str]],
+    length: int,
+    output: str,
+    filters: List[Filter],
+    start: int,
+    stop: int,
+) -> None:
+    # evaluate the filters on the rows `start:stop` and write them into the shared output mask
+    # (the workers share the resource tracker of the parent, which unlinks the blocks)
+    names = [block for _, block, _ in specs] + [output]
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        columns = {
+            name: np.ndarray((length,), np.dtype(dtype), buffer=block.buf)
+            for (name, _, dtype), block in zip(specs, blocks)
+        }
+        out = np.ndarray((length,), bool, buffer=blocks[-1].buf)
+        out[start:stop] = fused_mask(columns, filters, start, stop)
+        del columns, out
+    finally:
+        for block in blocks:
+            block.close()
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        atexit.register(_executor.shutdown)
+    return _executor
+
+
+def parallel_mask(
+    data: pd.DataFrame,
+    shared: SharedColumns,
+    filters: Sequence[Filter],
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    The same as `fused_mask()`, but the numeric filters are evaluated by the process pool, one
+    slice of rows per worker, on the shared copy of the columns.
+    """
+    remote = [f for f in filters if f.column in shared and not isinstance(f.value, (str, bool))]
+    local = [f for f in filters if f not in remote]
+    length = len(data)
+    workers = workers or os.cpu_count() or 1
+
+    output = shared_memory.SharedMemory(create=True, size=max(length, 1))
+    try:
+        out = np.ndarray((length,), bool, buffer=output.buf)
+        out[:] = True
+        step = -(-length // workers)
+        futures = [
+            _get_executor().submit(
+                _mask_worker, shared.specs(), length, output.name, remote, i, min(i + step, length)
+            )
+            for i in range(0, length, step)
+        ]
+        for future in futures:
+            future.result()
+        mask = out.copy()
+        del out
+    finally:
+        output.close()
+        output.unlink()
+
+    if local:
+        mask &= fused_mask(_numpy_columns(data, local), local)
+    return mask
+
+
+def _numpy_columns(data: pd.DataFrame, filters: Sequence[Filter]) -> Dict[str, np.ndarray]:
+    missing = {f.column for f in filters} - set(data.columns)
+    if missing:
+        raise KeyError(f'the columns {sorted(missing)} are missing from the data')
+    return {f.column: data[f.column].to_numpy() for f in filters}
+
+
+class Query:
+    def __init__(
+        self,
+        market: str = 'america',
+        instrument_type: Optional[str] = None,
+        columns: Sequence[str] = ('name', 'close', 'volume', 'market_cap_basic'),
+    ):
+        self.market = market
+        self.instrument_type = instrument_type
+        self.columns: List[str] = list(columns)
+        self.filters: List[Filter] = []
+        self._cache_ttl: float = 300  # 5 minutes cache TTL
+        self._process_min_rows: int = PROCESS_POOL_MIN_ROWS
+
+    def add_filter(self, condition: Filter) -> 'Query':
+        """Add a filter condition to the query"""
+        self.filters.append(condition)
+        return self
+
+    def select(self, *columns: str) -> 'Query':
+        """Set the columns to download, the columns of the filters are always downloaded"""
+        self.columns = list(columns)
+        return self
+
+    def _required_columns(self) -> Tuple[str, ...]:
+        names = dict.fromkeys(self.columns)
+        names.update(dict.fromkeys(f.column for f in self.filters))
+        return tuple(names)
+
+    def _data_key(self) -> Tuple[str, str, Tuple[str, ...]]:
+        # the downloaded data only depends on the market, the instrument type and the set of
+        # columns, so the queries that need the same columns in a different order share it
+        return self.market, self.instrument_type or '', tuple(sorted(self._required_columns()))
+
+    def _get_cached_data(
+        self, market: str, instrument_type: str, columns: Tuple[str, ...]
+    ) -> MarketData:
+        """Get cached data for a market and instrument type"""
+        cache_key = (market, instrument_type, columns)
+        entry = DATA_CACHE.get(cache_key, self._cache_ttl)
+        if entry is None:
+            entry = MarketData(self._fetch_market_data(market, instrument_type, columns))
+            DATA_CACHE.set(cache_key, entry)
+        return entry
+
+    def _fetch_market_data(
+        self, market: str, instrument_type: str, columns: Sequence[str] = ()
+    ) -> pd.DataFrame:
+        """Fetch market data with error handling and retries"""
+        from tradingview_screener.column import col as screener_col
+        from tradingview_screener.query import Query as ScreenerQuery
+
+        query = ScreenerQuery().set_markets(market).select(*(columns or self.columns))
+        if instrument_type:
+            query = query.where(screener_col('type') == instrument_type)
+
+        max_retries = 3
+        retry_delay = 1
+
+        for attempt in range(max_retries):
+            try:
+                # every page of the market, fetched concurrently
+                _, df = query.fetch_all(page_size=5000)
+                return df
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise e
+                time.sleep(retry_delay * (attempt + 1))
+
+    def _mask(self, entry: MarketData) -> np.ndarray:
+        """Evaluate every filter into one boolean mask, in a process pool for large data"""
+        data = entry.data
+        if len(data) >= self._process_min_rows and (os.cpu_count() or 1) > 1:
+            return parallel_mask(data, entry.shared(), self.filters)
+        return fused_mask(_numpy_columns(data, self.filters), self.filters)
+
+    def get_data(self) -> pd.DataFrame:
+        """Get filtered data with optimized processing"""
+        # the columns of the result are in select order, unlike the ones of `_data_key()`
+        columns = list(self._required_columns())
+        cache_key = (self._data_key(), tuple(columns), filter_key(self.filters))
+
+        # Check cache (the callers get a copy, so they can't change the cached result)
+        result = RESULT_CACHE.get(cache_key, self._cache_ttl)
+        if result is not None:
+            return result.copy()
+
+        # Fetch base data
+        entry = self._fetch_base_data()
+        if entry is None or entry.data.empty:
+            return pd.DataFrame()
+
+        # One fused mask, and a single copy of the matching rows
+        result = entry.data.loc[self._mask(entry), columns].reset_index(drop=True)
+
+        # Cache the result
+        RESULT_CACHE.set(cache_key, result)
+
+        return result.copy()
+
+    def _fetch_base_data(self) -> Optional[MarketData]:
+        """Fetch base data with error handling"""
+        try:
+            return self._get_cached_data(*self._data_key())
+        except Exception:
+            logger.exception('failed to fetch the data of %r', self.market)
+            return None
+
+
+class Column:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __gt__(self, other: Any) -> Filter:
+        return Filter(self.name, '>', other)
+
+    def __lt__(self, other: Any) -> Filter:
+        return Filter(self.name, '<', other)
+
+    def __eq__(self, other: Any) -> Filter:
+        return Filter(self.name, '==', other)
+
+    def __ge__(self, other: Any) -> Filter:
+        return Filter(self.name, '>=', other)
+
+    def __le__(self, other: Any) -> Filter:
+        return Filter(self.name, '<=', other)
+
+
+def col(name: str) -> Column:
+    """Create a column reference"""
+    return Column(name)
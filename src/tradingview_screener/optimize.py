@@ -0,0 +1,401 @@
+"""
+Simplify the filters of a query before they are sent to the API (or evaluated locally).
+
+The optimizer only applies rewrites that don't change which rows match:
+
+- nested `And()`/`Or()` with the same operator are flattened, and single-operand ones unwrapped
+- duplicated expressions are removed
+- numeric bounds on the same column are merged into the tightest range
+  (`close > 5`, `close.between(10, 50)`, `close <= 20` becomes `close.between(10, 20)`)
+- `isin()` lists on the same column are intersected (and de-duplicated), unless they are disjoint
+- `Or(col('type') == 'stock', col('type') == 'fund')` becomes `col('type').isin(['stock', 'fund'])`
+- comparisons that are implied by the other ones are removed
+  (`close > EMA50` is redundant next to `close > EMA20` and `EMA20 > EMA50`)
+- `not_empty()` is removed when another expression already rejects the nulls of that column
+- the expressions are sorted by their estimated selectivity, so that the local evaluator
+  can stop as soon as no row is left
+
+A string on the right side of an expression can be a literal or a column name (`between('EMA5',
+'EMA20')` and `isin(['stock', 'fund'])` are the same `in_range` operation), so the lists and the
+`==` comparisons that contain a column name are never treated as sets of values. The column names
+are the fields of the catalog (see `fields.get_catalog()`), the columns of the query, and the
+`columns` passed to `optimize()` (e.g. the columns of the data that is filtered locally).
+
+Examples:
+
+>>> q = Query().where(
+...     col('close') > col('EMA20'),
+...     col('EMA20') > col('EMA50'),
+...     col('close') > col('EMA50'),
+...     col('close').between(10, 500),
+...     col('close') < 100,
+... )
+>>> q.optimize().query['filter']
+[{'left': 'close', 'operation': 'in_range', 'right': [10, 100]},
+ {'left': 'close', 'operation': 'greater', 'right': 'EMA20'},
+ {'left': 'EMA20', 'operation': 'greater', 'right': 'EMA50'}]
+"""
+
+from __future__ import annotations
+
+__all__ = ['optimize', 'optimize_expressions', 'optimize_operation']
+
+import json
+from typing import TYPE_CHECKING
+
+from tradingview_screener.fields import get_catalog
+
+if TYPE_CHECKING:
+    from typing import Any, Container, Optional, Union
+    from tradingview_screener.models import (
+        ExpressionDict,
+        FilterOperationDict,
+        OperationComparisonDict,
+        OperationDict,
+        QueryDict,
+    )
+
+    Operand = Union[ExpressionDict, OperationDict]
+
+
+# lower is more selective (matches fewer rows), these are only rough estimates
+_SELECTIVITY = {
+    'equal': 0,
+    'empty': 1,
+    'match': 2,
+    'smatch': 2,
+    'has': 2,
+    'in_day_range': 2,
+    'in_week_range': 2,
+    'in_month_range': 2,
+    'crosses': 3,
+    'crosses_above': 3,
+    'crosses_below': 3,
+    'in_range': 3,
+    'in_range%': 4,
+    'above%': 4,
+    'below%': 4,
+    'greater': 5,
+    'egreater': 5,
+    'less': 5,
+    'eless': 5,
+    'not_in_range%': 6,
+    'nequal': 7,
+    'not_in_range': 7,
+    'nmatch': 7,
+    'has_none_of': 7,
+    'nempty': 8,
+}
+
+# `(is_upper, strict)`: whether `right` is an upper bound of `left`, and if the bound is strict
+_ORDERINGS = {
+    'greater': (False, True),
+    'egreater': (False, False),
+    'less': (True, True),
+    'eless': (True, False),
+}
+
+
+def _key(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, default=str)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_range(expr: FilterOperationDict) -> bool:
+    # `between(a, b)` with two numbers, as opposed to `isin([...])`
+    right = expr['right']
+    return (
+        expr['operation'] == 'in_range'
+        and len(right) == 2
+        and all(_is_number(v) for v in right)
+        and right[0] <= right[1]
+    )
+
+
+def _is_column(value: Any, columns: Container[str]) -> bool:
+    # whether `value` can be a column name rather than a literal (when in doubt, it's a column)
+    return isinstance(value, str) and (value in columns or value in get_catalog())
+
+
+def _is_set(expr: FilterOperationDict, columns: Container[str]) -> bool:
+    # `isin([...])` of literal values, as opposed to `between(a, b)` with numbers or columns
+    right = expr['right']
+    return (
+        expr['operation'] == 'in_range'
+        and not any(_is_number(v) for v in right)
+        and not (len(right) == 2 and any(_is_column(v, columns) for v in right))
+    )
+
+
+def _is_literal_equal(expr: FilterOperationDict, columns: Container[str]) -> bool:
+    # `col('x') == 'a'`, but not `col('x') == col('y')`
+    right = expr['right']
+    return (
+        expr['operation'] == 'equal' and isinstance(right, str) and not _is_column(right, columns)
+    )
+
+
+def _selectivity(
+    operand: Union[FilterOperationDict, Operand], columns: Container[str] = ()
+) -> float:
+    if isinstance(operand.get('operation'), dict):
+        operation: OperationComparisonDict = operand['operation']  # pyright: ignore
+        scores = [_selectivity(o, columns) for o in operation['operands']]
+        return min(scores) if operation['operator'] == 'and' else max(scores) + 1
+    expr: FilterOperationDict = operand.get('expression', operand)  # pyright: ignore
+    score = _SELECTIVITY.get(expr['operation'], 5)
+    if _is_set(expr, columns):
+        score = 1 + min(len(expr['right']), 1000) / 1000  # short lists match fewer rows
+    elif expr['operation'] in _ORDERINGS and isinstance(expr['right'], str):
+        score += 0.5  # comparing two columns
+    return score
+
+
+def _dedupe(items: list) -> list:
+    seen = set()
+    out = []
+    for item in items:
+        key = _key(item)
+        if key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
+def _merge_ranges(exprs: list[FilterOperationDict]) -> list[FilterOperationDict]:
+    bounds: dict[str, list[int]] = {}
+    for i, expr in enumerate(exprs):
+        op = expr['operation']
+        if _is_range(expr) or (op in _ORDERINGS and _is_number(expr['right'])):
+            bounds.setdefault(expr['left'], []).append(i)
+
+    replaced: dict[int, list[FilterOperationDict]] = {}
+    for column, indexes in bounds.items():
+        if len(indexes) < 2:
+            continue
+
+        # `(value, strict)`, a strict bound is tighter than a non-strict one with the same value
+        lower: Optional[tuple[float, bool]] = None
+        upper: Optional[tuple[float, bool]] = None
+        for i in indexes:
+            expr = exprs[i]
+            if _is_range(expr):
+                new_lower, new_upper = (expr['right'][0], False), (expr['right'][1], False)
+            else:
+                is_upper, strict = _ORDERINGS[expr['operation']]
+                if is_upper:
+                    new_lower, new_upper = None, (expr['right'], strict)
+                else:
+                    new_lower, new_upper = (expr['right'], strict), None
+            if new_lower is not None and (lower is None or new_lower > lower):
+                lower = new_lower
+            if new_upper is not None and (
+                upper is None or (new_upper[0], not new_upper[1]) < (upper[0], not upper[1])
+            ):
+                upper = new_upper
+
+        if (
+            lower is not None
+            and upper is not None
+            and (lower[0] > upper[0] or (lower[0] == upper[0] and (lower[1] or upper[1])))
+        ):
+            continue  # contradictory bounds, no row matches (left as they are)
+
+        merged: list[FilterOperationDict] = []
+        if lower is not None and upper is not None and not lower[1] and not upper[1]:
+            merged.append({'left': column, 'operation': 'in_range', 'right': [lower[0], upper[0]]})
+        else:
+            if lower is not None:
+                op = 'greater' if lower[1] else 'egreater'
+                merged.append({'left': column, 'operation': op, 'right': lower[0]})
+            if upper is not None:
+                op = 'less' if upper[1] else 'eless'
+                merged.append({'left': column, 'operation': op, 'right': upper[0]})
+        replaced[indexes[0]] = merged
+        replaced.update((i, []) for i in indexes[1:])
+
+    out = []
+    for i, expr in enumerate(exprs):
+        out.extend(replaced.get(i, [expr]))
+    return out
+
+
+def _intersect_sets(
+    exprs: list[FilterOperationDict], columns: Container[str]
+) -> list[FilterOperationDict]:
+    first: dict[str, FilterOperationDict] = {}
+    out = []
+    for expr in exprs:
+        if not _is_set(expr, columns):
+            out.append(expr)
+            continue
+        values = list(dict.fromkeys(expr['right']))  # remove duplicates but keep the order
+        column = expr['left']
+        if column in first:
+            allowed = set(values)
+            intersection = [v for v in first[column]['right'] if v in allowed]
+            if len(intersection) == 2 and any(_is_column(v, columns) for v in intersection):
+                out.append(expr)  # it would be read as `between(a, b)`
+                continue
+            if not intersection:
+                out.append(expr)  # disjoint sets, no row matches (left as they are)
+                continue
+            first[column]['right'] = intersection
+            continue
+        first[column] = {'left': column, 'operation': 'in_range', 'right': values}
+        out.append(first[column])
+    return out
+
+
+def _implied(edges: list[tuple[str, str, bool]], i: int) -> bool:
+    # is `edges[i]` implied by a chain of the other edges?
+    upper, lower, strict = edges[i]
+    stack = [(upper, False)]
+    seen = set()
+    while stack:
+        node, path_strict = stack.pop()
+        for j, (a, b, s) in enumerate(edges):
+            if j == i or a != node:
+                continue
+            state = (b, path_strict or s)
+            if b == lower and (state[1] or not strict):
+                return True
+            if state not in seen:
+                seen.add(state)
+                stack.append(state)
+    return False
+
+
+def _remove_implied(exprs: list[FilterOperationDict]) -> list[FilterOperationDict]:
+    # the column-vs-column comparisons form a graph, remove the edges that are implied by a path
+    # (nulls never match, so a chain like `a > b > c` also guarantees that `a` and `c` aren't null)
+    indexes = [
+        i
+        for i, expr in enumerate(exprs)
+        if expr['operation'] in _ORDERINGS and isinstance(expr['right'], str)
+    ]
+    edges = []
+    for i in indexes:
+        expr = exprs[i]
+        is_upper, strict = _ORDERINGS[expr['operation']]
+        left, right = expr['left'], expr['right']
+        edges.append((right, left, strict) if is_upper else (left, right, strict))
+
+    removed = set()
+    for n in reversed(range(len(edges))):
+        if _implied(edges, n):
+            removed.add(indexes[n])
+            edges[n] = ('', '', False)  # an edge that doesn't connect anything
+    return [expr for i, expr in enumerate(exprs) if i not in removed]
+
+
+def _remove_redundant_nempty(exprs: list[FilterOperationDict]) -> list[FilterOperationDict]:
+    # every operation except `empty` rejects the nulls
+    constrained = {e['left'] for e in exprs if e['operation'] not in ('empty', 'nempty')}
+    return [e for e in exprs if not (e['operation'] == 'nempty' and e['left'] in constrained)]
+
+
+def optimize_expressions(
+    exprs: list[FilterOperationDict], columns: Container[str] = ()
+) -> list[FilterOperationDict]:
+    """
+    Optimize a list of expressions that are joined with the AND operator (like `where()`).
+
+    :param columns: names that are columns (besides the fields of the catalog), the strings on the
+        right side of the expressions that are in it are never treated as literal values
+    """
+    exprs = _dedupe(exprs)
+    exprs = _merge_ranges(exprs)
+    exprs = _intersect_sets(exprs, columns)
+    exprs = _remove_implied(exprs)
+    exprs = _remove_redundant_nempty(exprs)
+    return sorted(exprs, key=lambda e: _selectivity(e, columns))
+
+
+def _merge_equals(operands: list[Operand], columns: Container[str]) -> list[Operand]:
+    # `Or(col('x') == 'a', col('x').isin(['b', 'c']))` -> `col('x').isin(['a', 'b', 'c'])`
+    groups: dict[str, list[int]] = {}
+    for i, operand in enumerate(operands):
+        expr = operand.get('expression')
+        if expr is None:
+            continue
+        if _is_literal_equal(expr, columns) or _is_set(expr, columns):
+            groups.setdefault(expr['left'], []).append(i)
+
+    replaced: dict[int, Optional[Operand]] = {}
+    for column, indexes in groups.items():
+        if len(indexes) < 2:
+            continue
+        values = []
+        for i in indexes:
+            right = operands[i]['expression']['right']  # pyright: ignore
+            values.extend(right if isinstance(right, list) else [right])
+        values = list(dict.fromkeys(values))
+        # a list of two numbers would be a range, but there are only literal strings here
+        replaced[indexes[0]] = {
+            'expression': {'left': column, 'operation': 'in_range', 'right': values}
+        }
+        replaced.update((i, None) for i in indexes[1:])
+
+    out = []
+    for i, operand in enumerate(operands):
+        new = replaced.get(i, operand)
+        if new is not None:
+            out.append(new)
+    return out
+
+
+def optimize_operation(
+    operation: OperationComparisonDict, columns: Container[str] = ()
+) -> OperationComparisonDict:
+    """
+    Optimize a tree of `And()`/`Or()` operations (like the argument of `where2()`).
+
+    :param columns: see `optimize_expressions()`
+    """
+    operator = operation['operator']
+
+    operands: list[Operand] = []
+    for operand in operation['operands']:
+        if 'operation' in operand:
+            child = optimize_operation(operand['operation'], columns)  # pyright: ignore
+            if child['operator'] == operator or len(child['operands']) == 1:
+                operands.extend(child['operands'])  # flatten
+            else:
+                operands.append({'operation': child})
+        else:
+            operands.append(operand)
+    operands = _dedupe(operands)
+
+    if operator == 'and':
+        exprs = [o['expression'] for o in operands if 'expression' in o]  # pyright: ignore
+        nested = [o for o in operands if 'expression' not in o]
+        operands = [{'expression': e} for e in optimize_expressions(exprs, columns)] + nested
+        operands.sort(key=lambda o: _selectivity(o, columns))
+    else:
+        operands = _merge_equals(operands, columns)
+        # the local evaluator stops when every row matched, so the broadest operands go first
+        operands.sort(key=lambda o: _selectivity(o, columns), reverse=True)
+
+    if len(operands) == 1 and 'operation' in operands[0]:
+        return operands[0]['operation']  # pyright: ignore
+    return {'operator': operator, 'operands': operands}
+
+
+def optimize(query: QueryDict, columns: Container[str] = ()) -> QueryDict:
+    """
+    Return a copy of the query dictionary with its `filter` and `filter2` optimized.
+
+    :param columns: names that are columns, besides the fields of the catalog and the columns of
+        the query (see `optimize_expressions()`)
+    """
+    query = dict(query)  # pyright: ignore
+    columns = {*columns, *(query.get('columns') or ())}  # a DataFrame yields its column names
+    if query.get('filter'):
+        query['filter'] = optimize_expressions(list(query['filter']), columns)
+    if query.get('filter2'):
+        query['filter2'] = optimize_operation(query['filter2'], columns)
+    return query  # pyright: ignore
@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-__all__ = ['And', 'Or', 'Query']
+__all__ = ['And', 'Or', 'Query', 'gather_scanner_data', 'get_scanner_data_many']
 
+import asyncio
+import copy
 import pprint
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import MappingProxyType
 from typing import TYPE_CHECKING
 
-import requests
-
+from tradingview_screener import instrument
+from tradingview_screener.cache import get_cache, query_key
 from tradingview_screener.column import Column
+from tradingview_screener.decode import decode, decode_typed, unpack
+from tradingview_screener.optimize import optimize
+from tradingview_screener.singleflight import get_async_single_flight, get_single_flight
+from tradingview_screener.transport import AsyncTransport, get_async_transport, get_transport
 
 if TYPE_CHECKING:
+    import numpy as np
     import pandas as pd
-    from typing import Literal, Any
+    import requests
+    from typing import Literal, Any, Iterator, Optional, Union
     from typing_extensions import Self
+    from tradingview_screener.cache import ResponseCache
+    from tradingview_screener.column import Expression
+    from tradingview_screener.transport import Transport
     from tradingview_screener.models import (
         QueryDict,
         SortByDict,
@@ -66,6 +79,15 @@ def Or(*expressions: FilterOperationDict | OperationDict) -> OperationDict:
     return _impl_and_or_chaining(expressions, operator='or')
 
 
+def _check_response(r: requests.Response) -> bytes:
+    if not r.ok:
+        # add the body to the error message for debugging purposes
+        r.reason += f'\n Body: {r.text}\n'
+        r.raise_for_status()
+
+    return r.content
+
+
 class Query:
     """
     This class allows you to perform SQL-like queries on the tradingview stock-screener.
@@ -239,11 +261,18 @@ class Query:
      48  NASDAQ:GBNH   GBNH  0.273000     500412                  9.076764
      49    OTC:CLRMF  CLRMF  0.032500     496049                 17.560935
      [50 rows x 5 columns])
+
+    `Query` objects are immutable, every method returns a new `Query` (that shares the unchanged
+    parts with the original), so a base query can be extended in different ways, shared between
+    threads, and used as a dictionary key:
+    >>> base = Query().set_markets('india').select('name', 'close')
+    >>> gainers = base.order_by('change', ascending=False)
+    >>> losers = base.order_by('change', ascending=True)  # `base` is still unsorted
     """
 
     def __init__(self) -> None:
         # noinspection PyTypeChecker
-        self.query: QueryDict = {
+        query: QueryDict = {
             'markets': ['america'],
             'symbols': {'query': {'types': []}, 'tickers': []},
             'options': {'lang': 'en'},
@@ -252,20 +281,133 @@ class Query:
             'sort': {'sortBy': 'Value.Traded', 'sortOrder': 'desc'},
             'range': DEFAULT_RANGE.copy(),
         }
-        self.url = 'https://scanner.tradingview.com/america/scan'
+        # the attributes are set through `__dict__` because `__setattr__()` is disabled
+        self.__dict__.update(
+            _query=query,
+            _key=None,
+            url='https://scanner.tradingview.com/america/scan',
+            transport=None,
+            async_transport=None,
+            cache=None,
+            cache_ttl=None,
+            cache_stale_ttl=None,
+            computed={},
+        )
+
+    # `Query` objects are immutable: every builder method returns a new `Query`, that shares all
+    # the unchanged values with the original one (they are never modified in place).
+    # This makes it safe to reuse a base query, to share it between threads, and to hash it.
+
+    if TYPE_CHECKING:
+        _query: QueryDict
+        _key: Optional[str]
+        url: str
+        transport: Optional[Transport]
+        async_transport: Optional[AsyncTransport]
+        cache: Optional[ResponseCache]
+        cache_ttl: Optional[float]
+        cache_stale_ttl: Optional[float]
+        # the computed columns of `with_columns()`, they aren't part of the payload
+        computed: dict[str, Union[Expression, Column]]
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(
+            f'Query objects are immutable, so {key!r} cannot be set; use the builder methods '
+            '(like `set_markets()` or `set_property()`) which return a new Query instead'
+        )
+
+    def _replace(self, **attributes: Any) -> Query:
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__, _key=None, **attributes)
+        return new
+
+    def _with(self, changes: dict[str, Any]) -> Query:
+        # return a new query where only the given keys of the `query` dictionary are replaced
+        return self._replace(_query={**self._query, **changes})
+
+    @property
+    def query(self) -> QueryDict:
+        """
+        The JSON payload that is sent to the API, as a read-only mapping.
+
+        It's a copy: changing its lists or dictionaries (like `q.query['columns'].append(...)`)
+        doesn't change the query, use the builder methods instead.
+        """
+        return MappingProxyType(copy.deepcopy(self._query))  # pyright: ignore [reportReturnType]
+
+    @property
+    def key(self) -> str:
+        """
+        A hash of the URL and of the `query` that doesn't depend on the order of the keys (see
+        `cache.query_key()`), it's computed only once.
+        """
+        if self._key is None:
+            self.__dict__['_key'] = query_key(self.url, self._query)
+        return self._key  # pyright: ignore [reportReturnType]
 
     def select(self, *columns: Column | str) -> Self:
-        self.query['columns'] = [
-            col.name if isinstance(col, Column) else Column(col).name for col in columns
-        ]
-        return self
+        names = [col.name if isinstance(col, Column) else Column(col).name for col in columns]
+        if self.computed:  # keep the columns that the computed columns need
+            from tradingview_screener.compute import source_columns
+
+            names = [n for n in names if n not in self.computed]
+            names += [n for n in source_columns(self.computed) if n not in names]
+        return self._with({'columns': names})
+
+    def with_columns(self, **columns: Union[Expression, Column]) -> Self:
+        """
+        Add computed columns, built with the arithmetic operators of `Column` (see
+        `column.Expression`), they are evaluated locally on the rows of the response.
+
+        The columns that the expressions need are added to `select()` automatically, and all the
+        computed columns are evaluated in a single vectorized pass, with `numexpr` if it's
+        installed (see `tradingview_screener.compute`). They are added after the selected columns,
+        in the DataFrames of `get_scanner_data()` and the arrays of `get_scanner_data_numpy()`.
+
+        A computed column can use the previous ones, and it can be used in the filters of
+        `where()` and `where2()`: these filters are removed from the request and evaluated
+        locally, on the rows of the response (so the total count is the one of the API, and a
+        page can have less rows than its `limit()`). Use `universe.UniverseService.scan()` to
+        filter and sort a whole market by computed columns.
+
+        Examples:
+
+        >>> q = (
+        ...     Query()
+        ...     .select('name', 'close')
+        ...     .with_columns(
+        ...         above_ema50=((col('close') - col('EMA50')) / col('EMA50') * 100).round(2),
+        ...         market_cap_cr=(col('market_cap_basic') / 1e7).round(2),
+        ...     )
+        ...     .where(col('above_ema50') > 5)
+        ... )
+        >>> q.query['columns']
+        ['name', 'close', 'EMA50', 'market_cap_basic']
+        >>> count, df = q.get_scanner_data()
+        >>> list(df.columns)
+        ['ticker', 'name', 'close', 'EMA50', 'market_cap_basic', 'above_ema50', 'market_cap_cr']
+
+        :param columns: the computed columns, as `name=expression`
+        """
+        from tradingview_screener.column import Expression
+        from tradingview_screener.compute import source_columns
+
+        for name, expr in columns.items():
+            if not isinstance(expr, (Expression, Column)):
+                raise TypeError(
+                    f'the computed column {name!r} must be an expression of columns, like '
+                    f"`col('close') * col('volume')`, not {type(expr).__name__}"
+                )
+        computed = {**self.computed, **columns}
+        names = [n for n in self._query.get('columns', ()) if n not in computed]
+        names += [n for n in source_columns(computed) if n not in names]
+        return self._replace(_query={**self._query, 'columns': names}, computed=computed)
 
     def where(self, *expressions: FilterOperationDict) -> Self:
         """
         Filter screener (expressions are joined with the AND operator)
         """
-        self.query['filter'] = list(expressions)  # convert tuple[dict] -> list[dict]
-        return self
+        return self._with({'filter': list(expressions)})  # convert tuple[dict] -> list[dict]
 
     def where2(self, operation: OperationDict) -> Self:
         """
@@ -325,8 +467,26 @@ class Query:
            - The `exchange` is one of `'UNISWAP3POLYGON', 'VERSEETH', 'a', 'fffffffff'`, **AND**
            - The `currency_id` is `'USD'`.
         """
-        self.query['filter2'] = operation['operation']
-        return self
+        return self._with({'filter2': operation['operation']})
+
+    def optimize(self) -> Self:
+        """
+        Simplify the filters of `where()` and `where2()` without changing the rows that match:
+        flatten nested `And()`/`Or()`, remove duplicated and implied expressions, merge the ranges
+        on the same column and sort the expressions by selectivity
+        (see `tradingview_screener.optimize`).
+
+        This makes the payload smaller, and the local evaluation (`evaluate.filter_data()`) faster.
+
+        Examples:
+
+        >>> q = Query().where(col('close') > 10, col('close') > 20, col('close') < 50).optimize()
+        >>> q.query['filter']
+        [{'left': 'close', 'operation': 'greater', 'right': 20},
+         {'left': 'close', 'operation': 'less', 'right': 50}]
+        """
+        optimized = optimize(self._query, self.computed)
+        return self._with({k: optimized[k] for k in ('filter', 'filter2') if k in optimized})
 
     def order_by(
         self, column: Column | str, ascending: bool = True, nulls_first: bool = False
@@ -351,16 +511,15 @@ class Query:
             'sortOrder': 'asc' if ascending else 'desc',
             'nullsFirst': nulls_first,
         }
-        self.query['sort'] = dct
-        return self
+        return self._with({'sort': dct})
 
     def limit(self, limit: int) -> Self:
-        self.query.setdefault('range', DEFAULT_RANGE.copy())[1] = limit
-        return self
+        start, _ = self._query.get('range', DEFAULT_RANGE)
+        return self._with({'range': [start, limit]})
 
     def offset(self, offset: int) -> Self:
-        self.query.setdefault('range', DEFAULT_RANGE.copy())[0] = offset
-        return self
+        _, end = self._query.get('range', DEFAULT_RANGE)
+        return self._with({'range': [offset, end]})
 
     def set_markets(self, *markets: str) -> Self:
         """
@@ -373,7 +532,9 @@ class Query:
 
         You may choose any value from `tradingview_screener.constants.MARKETS`.
 
-        If you select multiple countries, you might want to
+        If you select multiple markets with a large `limit()`, you might want to run the query
+        with `fanout.scan()`, which sends one request per market concurrently instead of a single
+        (slower, all-or-nothing) request to the `/global/scan` endpoint.
 
         Examples:
 
@@ -443,14 +604,11 @@ class Query:
         :return: Self
         """
         if len(markets) == 1:
-            market = markets[0]
-            self.url = URL.format(market=market)
-            self.query['markets'] = [market]
+            url = URL.format(market=markets[0])
         else:  # len(markets) == 0 or len(markets) > 1
-            self.url = URL.format(market='global')
-            self.query['markets'] = list(markets)
+            url = URL.format(market='global')
 
-        return self
+        return self._replace(url=url, _query={**self._query, 'markets': list(markets)})
 
     def set_tickers(self, *tickers: str) -> Self:
         """
@@ -481,9 +639,8 @@ class Query:
         :param tickers: One or more tickers, syntax: `exchange:symbol`
         :return: Self
         """
-        self.query.setdefault('symbols', {})['tickers'] = list(tickers)
-        self.set_markets()
-        return self
+        symbols = {**self._query.get('symbols', {}), 'tickers': list(tickers)}
+        return self._with({'symbols': symbols}).set_markets()
 
     def set_index(self, *indexes: str) -> Self:
         """
@@ -530,11 +687,14 @@ class Query:
         :param indexes: One or more strings representing the financial indexes to filter by
         :return: An instance of the `Query` class with the filter applied
         """
-        self.query.setdefault('preset', 'index_components_market_pages')
-        self.query.setdefault('symbols', {})['symbolset'] = list(indexes)
+        new = self._with(
+            {
+                'preset': self._query.get('preset', 'index_components_market_pages'),
+                'symbols': {**self._query.get('symbols', {}), 'symbolset': list(indexes)},
+            }
+        )
         # reset markets list and URL to `/global`
-        self.set_markets()
-        return self
+        return new.set_markets()
 
     # def set_currency(self, currency: Literal['symbol', 'market'] | str) -> Self:
     #     """
@@ -566,13 +726,208 @@ class Query:
     #     return self
 
     def set_property(self, key: str, value: Any) -> Self:
-        self.query[key] = value
-        return self
+        return self._with({key: value})
+
+    def set_transport(self, transport: Union[Transport, AsyncTransport]) -> Self:
+        """
+        Use a specific transport (connection pool) for this query, instead of the one that is
+        shared by all the queries (see `tradingview_screener.transport.get_transport()`).
+
+        An `AsyncTransport` is used by the `*_async()` methods, and a `Transport` by the others.
+
+        Examples:
+
+        >>> from tradingview_screener.transport import RequestsTransport
+        >>> transport = RequestsTransport(pool_maxsize=4, pool_block=True)
+        >>> Query().set_transport(transport).get_scanner_data()
+        """
+        if isinstance(transport, AsyncTransport):
+            return self._replace(async_transport=transport)
+        return self._replace(transport=transport)
+
+    def _prepare_request(self, kwargs: dict[str, Any]) -> None:
+        kwargs.setdefault('headers', HEADERS)
+        kwargs.setdefault('timeout', 20)
+
+    def _session(self, kwargs: dict[str, Any]) -> Optional[dict[str, Any]]:
+        # the arguments of the request that can change its response (like the cookies and the
+        # headers of a session), or None if they're the default ones
+        request = {k: v for k, v in kwargs.items() if k != 'timeout'}
+        return None if request == {'headers': HEADERS} else request
+
+    def _request_key(self, kwargs: dict[str, Any]) -> str:
+        # the key of the query and of the arguments of the request, so that a response fetched
+        # with the cookies (or the headers) of a session is never shared with another session
+        request = self._session(kwargs)
+        if request is None:
+            return self.key
+        return query_key(self.url, self._query, request)
+
+    def cached(
+        self,
+        ttl: float = 300,
+        cache: Optional[ResponseCache] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> Self:
+        """
+        Reuse the response of an identical query (same URL and same `query` dictionary) if it's
+        not older than `ttl` seconds, instead of sending a new request.
+
+        The cookies and headers passed to `get_scanner_data()` are part of the key of the cache,
+        so the response of an authenticated session is never returned to another session.
+
+        The responses are kept in a shared in-memory LRU backed by a SQLite file, so they survive
+        a restart of the process (see `tradingview_screener.cache`). The responses of a session
+        are only kept in memory, they're never written to the disk.
+
+        With `stale_ttl` the cache works in "stale-while-revalidate" mode: a response older than
+        `ttl` (but not older than `stale_ttl`) is returned right away, and refreshed in the
+        background for the next call. Only responses older than `stale_ttl` block on a new request.
+
+        The DataFrames returned by `get_scanner_data()` have the time of the response in
+        `df.attrs['created']` (a unix timestamp), and `df.attrs['stale']` is True if it's older
+        than `ttl`.
+
+        Examples:
+
+        >>> q = Query().set_markets('india').select('close').limit(20000).cached(ttl=60)
+        >>> q.get_scanner_data()  # sends the request
+        >>> q.get_scanner_data()  # returned from the cache
+
+        >>> q = q.cached(ttl=60, stale_ttl=15 * 60)
+        >>> count, df = q.get_scanner_data()  # never waits if the last response is < 15 minutes old
+        >>> time.strftime('as of %H:%M:%S', time.localtime(df.attrs['created']))
+        'as of 10:31:07'
+
+        :param ttl: maximum age of a cached response, in seconds
+        :param cache: the cache to use, defaults to the shared one (`cache.get_cache()`)
+        :param stale_ttl: maximum age of a stale response, in seconds
+        :return: Self
+        """
+        return self._replace(cache_ttl=ttl, cache=cache, cache_stale_ttl=stale_ttl)
+
+    def _post(self, kwargs: dict[str, Any]) -> bytes:
+        # send the query and return the body of the response (still encoded)
+        return self._post_entry(kwargs)[1]
+
+    def _post_entry(self, kwargs: dict[str, Any]) -> tuple[float, bytes, bool]:
+        # return `(created, content, is_stale)`
+        self._prepare_request(kwargs)
+        if self.cache_ttl is None:
+            return time.time(), self._send(kwargs), False
+
+        cache = self.cache if self.cache is not None else get_cache()
+        key = self._request_key(kwargs)
+        persist = self._session(kwargs) is None  # the responses of a session stay in memory
+        stale_ttl = self.cache_ttl if self.cache_stale_ttl is None else self.cache_stale_ttl
+        entry = cache.get_stale(key, self.cache_ttl, stale_ttl)
+        if entry is not None:
+            instrument.record(cache='stale' if entry[2] else 'hit')
+            if entry[2]:
+                cache.refresh_in_background(key, lambda: self._send(kwargs), persist)
+            return entry
+
+        instrument.record(cache='miss')
+        created, content = time.time(), self._send(kwargs)
+        cache.set(key, content, created, persist)
+        return created, content, False
+
+    def _split(self) -> tuple[QueryDict, QueryDict]:
+        # the payload that is sent to the API, and the filters on computed columns (evaluated
+        # locally, see `with_columns()`)
+        if not self.computed:
+            return self._query, {}  # pyright: ignore [reportReturnType]
+        from tradingview_screener.compute import split_filters
+
+        sort = self._query.get('sort')
+        if sort and sort['sortBy'] in self.computed:
+            raise ValueError(
+                f'cannot sort by the computed column {sort["sortBy"]!r}, the API only returns a '
+                'page of the rows, use `UniverseService.scan()` to sort the whole market'
+            )
+        return split_filters(self._query, self.computed)
+
+    def _send(self, kwargs: dict[str, Any]) -> bytes:
+        transport = self.transport or get_transport()
+        payload = self._split()[0]
+
+        def send() -> bytes:
+            with instrument.phase('request'):
+                r = transport.post(self.url, json=payload, **kwargs)
+            instrument.record_response(r)
+            return _check_response(r)
+
+        # concurrent identical queries (with the same cookies and headers) wait for the same
+        # request (see `singleflight`)
+        return get_single_flight().do((self._request_key(kwargs), id(transport)), send)
+
+    async def _post_async(self, kwargs: dict[str, Any]) -> bytes:
+        return (await self._post_entry_async(kwargs))[1]
+
+    async def _post_entry_async(self, kwargs: dict[str, Any]) -> tuple[float, bytes, bool]:
+        self._prepare_request(kwargs)
+        if self.cache_ttl is None:
+            return time.time(), await self._send_async(kwargs), False
+
+        cache = self.cache if self.cache is not None else get_cache()
+        key = self._request_key(kwargs)
+        persist = self._session(kwargs) is None  # the responses of a session stay in memory
+        stale_ttl = self.cache_ttl if self.cache_stale_ttl is None else self.cache_stale_ttl
+        entry = cache.get_stale(key, self.cache_ttl, stale_ttl)
+        if entry is not None:
+            instrument.record(cache='stale' if entry[2] else 'hit')
+            if entry[2]:
+                cache.refresh_in_background_async(key, lambda: self._send_async(kwargs), persist)
+            return entry
+
+        instrument.record(cache='miss')
+        created, content = time.time(), await self._send_async(kwargs)
+        cache.set(key, content, created, persist)
+        return created, content, False
+
+    async def _send_async(self, kwargs: dict[str, Any]) -> bytes:
+        transport = self.async_transport or get_async_transport()
+        payload = self._split()[0]
+
+        async def send() -> bytes:
+            with instrument.phase('request'):
+                r = await transport.post(self.url, json=payload, **kwargs)
+            instrument.record_response(r)
+            return _check_response(r)
+
+        key = (self._request_key(kwargs), id(transport))
+        return await get_async_single_flight().do(key, send)
+
+    def _to_dataframe(
+        self, entry: tuple[float, bytes, bool], categorical: bool = False
+    ) -> tuple[int, pd.DataFrame]:
+        from tradingview_screener.frame import to_dataframe
+
+        created, content, stale = entry
+        with instrument.phase('decode'):
+            json_obj = decode_typed(content)
+        payload, local = self._split()
+        with instrument.phase('frame'):
+            df = to_dataframe(json_obj, payload.get('columns', ()), categorical)
+            if self.computed:
+                from tradingview_screener.compute import compute
+                from tradingview_screener.evaluate import query_mask
+
+                df = df.assign(**compute(df, self.computed))
+                if local:
+                    df = df[query_mask(local, df)].reset_index(drop=True)
+                df = df[['ticker', *self._query.get('columns', ()), *self.computed]]
+        df.attrs.update(created=created, stale=stale)
+        instrument.record(rows=len(df), columns=len(df.columns))
+        return unpack(json_obj)[0], df
 
     def get_scanner_data_raw(self, **kwargs) -> ScreenerDict:
         """
         Perform a POST web-request and return the data from the API (dictionary).
 
+        The request is sent through a pooled keep-alive connection, so consecutive scans don't pay
+        for a new TCP/TLS handshake (see `set_transport()`).
+
         Note that you can pass extra keyword-arguments that will be forwarded to `requests.post()`,
         this can be very useful if you want to pass your own headers/cookies.
 
@@ -588,20 +943,14 @@ class Query:
             ],
         }
         """
-        self.query.setdefault('range', DEFAULT_RANGE.copy())
-
-        kwargs.setdefault('headers', HEADERS)
-        kwargs.setdefault('timeout', 20)
-        r = requests.post(self.url, json=self.query, **kwargs)
-
-        if not r.ok:
-            # add the body to the error message for debugging purposes
-            r.reason += f'\n Body: {r.text}\n'
-            r.raise_for_status()
-
-        return r.json()
-
-    def get_scanner_data(self, **kwargs) -> tuple[int, pd.DataFrame]:
+        with instrument.scan(self, 'get_scanner_data_raw'):
+            content = self._post(kwargs)
+            with instrument.phase('decode'):
+                data = decode(content)
+            instrument.record(rows=len(data.get('data') or ()))
+            return data
+
+    def get_scanner_data(self, categorical: bool = False, **kwargs) -> tuple[int, pd.DataFrame]:
         """
         Perform a POST web-request and return the data from the API as a DataFrame (along with
         the number of rows/tickers that matched your query).
@@ -614,28 +963,238 @@ class Query:
         Note that to get live-data you have to authenticate, which is done by passing your cookies.
         Have a look in the README at the "Real-Time Data Access" sections.
 
+        ### Columnar construction
+
+        The response is decoded with the fastest JSON library available (see
+        `tradingview_screener.decode`), and the DataFrame is built column by column (see
+        `tradingview_screener.frame`): numeric fields get a proper `int64`/`float64` dtype, and with
+        `categorical=True` the low-cardinality fields (`sector`, `industry`, `exchange`, `type`)
+        are stored as categoricals.
+
+        :param categorical: store `sector`, `industry`, `exchange` and `type` as `pd.Categorical`
         :param kwargs: kwargs to pass to `requests.post()`
         :return: a tuple consisting of: (total_count, dataframe)
         """
-        import pandas as pd
+        with instrument.scan(self, 'get_scanner_data'):
+            return self._to_dataframe(self._post_entry(kwargs), categorical)
 
-        json_obj = self.get_scanner_data_raw(**kwargs)
-        rows_count = json_obj['totalCount']
-        data = json_obj['data']
+    def get_scanner_data_numpy(self, **kwargs) -> tuple[int, dict[str, np.ndarray]]:
+        """
+        The same as `get_scanner_data()`, but the data is returned as a dictionary of NumPy arrays
+        (one per column), for code that doesn't need a DataFrame.
 
-        df = pd.DataFrame(
-            data=([row['s'], *row['d']] for row in data),
-            columns=['ticker', *self.query.get('columns', ())],  # pyright: ignore [reportArgumentType]
-        )
-        return rows_count, df
+        >>> count, columns = Query().select('close', 'volume').get_scanner_data_numpy()
+        >>> columns['close'].mean()
+
+        :param kwargs: kwargs to pass to `requests.post()`
+        :return: a tuple consisting of: (total_count, {column: array})
+        """
+        from tradingview_screener.frame import to_numpy_columns
+
+        with instrument.scan(self, 'get_scanner_data_numpy'):
+            content = self._post(kwargs)
+            with instrument.phase('decode'):
+                json_obj = decode_typed(content)
+            payload, local = self._split()
+            with instrument.phase('frame'):
+                columns = to_numpy_columns(json_obj, payload.get('columns', ()))
+                if self.computed:
+                    from tradingview_screener.compute import compute
+                    from tradingview_screener.evaluate import filter_data
+
+                    columns.update(compute(columns, self.computed))
+                    if local:
+                        columns = filter_data(  # pyright: ignore [reportAssignmentType]
+                            columns, local
+                        )
+                    keep = ['ticker', *self._query.get('columns', ()), *self.computed]
+                    columns = {name: columns[name] for name in keep}
+            instrument.record(rows=len(columns['ticker']), columns=len(columns))
+            return unpack(json_obj)[0], columns
+
+    async def get_scanner_data_raw_async(self, **kwargs) -> ScreenerDict:
+        """
+        The same as `get_scanner_data_raw()`, but it doesn't block the event-loop while waiting for
+        the response (see `tradingview_screener.transport.get_async_transport()`).
+
+        >>> await Query().select('close', 'volume').limit(5).get_scanner_data_raw_async()
+        """
+        with instrument.scan(self, 'get_scanner_data_raw_async'):
+            content = await self._post_async(kwargs)
+            with instrument.phase('decode'):
+                data = decode(content)
+            instrument.record(rows=len(data.get('data') or ()))
+            return data
+
+    async def get_scanner_data_async(
+        self, categorical: bool = False, **kwargs
+    ) -> tuple[int, pd.DataFrame]:
+        """
+        The same as `get_scanner_data()`, but it doesn't block the event-loop while waiting for the
+        response, so many queries can run at the same time (see `gather_scanner_data()`).
+
+        >>> await Query().select('close', 'volume').get_scanner_data_async()
+
+        :param categorical: see `get_scanner_data()`
+        :param kwargs: kwargs to pass to the transport's `post()`
+        :return: a tuple consisting of: (total_count, dataframe)
+        """
+        with instrument.scan(self, 'get_scanner_data_async'):
+            return self._to_dataframe(await self._post_entry_async(kwargs), categorical)
+
+    def _with_range(self, start: int, end: int) -> Query:
+        # a query for a different `range` window, without touching `self`
+        return self._with({'range': [start, end]})
+
+    def iter_pages(
+        self,
+        page_size: int = 1000,
+        max_workers: int = 4,
+        max_rows: Optional[int] = None,
+        ordered: bool = True,
+        **kwargs,
+    ) -> Iterator[tuple[int, pd.DataFrame]]:
+        """
+        Fetch all the rows that match the query, one page at a time, and yield every page as soon
+        as it arrives.
+
+        The first page is fetched alone to read the `totalCount`, then the remaining pages are
+        fetched concurrently (with up to `max_workers` requests in flight).
+
+        The pages start from the query's `offset()`, the `limit()` is ignored (use `max_rows`
+        instead). The query itself is never modified.
+
+        The pages are separate requests, so if the rows are sorted by a value that changes between
+        them (like the default `Value.Traded`, or `change`), a row can move from one page to
+        another and be returned twice or not at all. Sort by a stable field (like
+        `order_by('name')`) when every row matters, and de-duplicate on the `ticker`.
+
+        Examples:
+
+        >>> q = Query().set_markets('india').select('name', 'close')
+        >>> for total_count, df in q.iter_pages(page_size=2000):
+        ...     print(f'{len(df)} of {total_count}')
+
+        :param page_size: number of rows per request
+        :param max_workers: maximum number of concurrent requests
+        :param max_rows: stop after this many rows (defaults to all the rows that matched)
+        :param ordered: if True, the pages are yielded in the order of the rows, otherwise as soon
+            as each one arrives
+        :param kwargs: kwargs to pass to `requests.post()`
+        :return: a generator of `(total_count, dataframe)` tuples, one per page
+        """
+        start = self._query.get('range', DEFAULT_RANGE)[0]
+        first = page_size if max_rows is None else min(page_size, max_rows)
+
+        total_count, df = self._with_range(start, start + first).get_scanner_data(**kwargs)
+        yield total_count, df
+
+        end = total_count if max_rows is None else min(total_count, start + max_rows)
+        starts = range(start + page_size, end, page_size)
+        # (the filters on computed columns can remove rows of a full page)
+        if (len(df) < first and not self._split()[1]) or not starts:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [
+                executor.submit(
+                    self._with_range(i, min(i + page_size, end)).get_scanner_data, **kwargs
+                )
+                for i in starts
+            ]
+            for future in futures if ordered else as_completed(futures):
+                yield future.result()
+        finally:
+            # if the generator is closed early, don't wait for the pages that haven't started yet
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_all(
+        self,
+        page_size: int = 1000,
+        max_workers: int = 4,
+        max_rows: Optional[int] = None,
+        **kwargs,
+    ) -> tuple[int, pd.DataFrame]:
+        """
+        Fetch all the rows that match the query by requesting several pages concurrently, instead
+        of a single huge request (or a sequential loop of `offset()`/`limit()` calls).
+
+        Examples:
+
+        >>> q = Query().set_markets('india').select('name', 'close').order_by('name')
+        >>> q.fetch_all(page_size=2000)
+
+        See `iter_pages()` for the parameters.
+
+        :return: a tuple consisting of: (total_count, dataframe)
+        """
+        import pandas as pd
+
+        total_count = 0
+        dfs = []
+        for total_count, df in self.iter_pages(page_size, max_workers, max_rows, **kwargs):
+            dfs.append(df)
+        return total_count, pd.concat(dfs, ignore_index=True)
 
     def copy(self) -> Query:
-        new = Query()
-        new.query = self.query.copy()
-        return self
+        """
+        Return a new `Query` object, note that since queries are immutable this is never needed.
+        """
+        return self._replace()
 
     def __repr__(self) -> str:
-        return f'< {pprint.pformat(self.query)}\n url={self.url!r} >'
+        computed = f'\n computed={pprint.pformat(self.computed)}' if self.computed else ''
+        return f'< {pprint.pformat(self._query)}\n url={self.url!r}{computed} >'
 
     def __eq__(self, other) -> bool:
-        return isinstance(other, Query) and self.query == other.query and self.url == other.url
+        return (
+            isinstance(other, Query)
+            and self._query == other._query
+            and self.url == other.url
+            and repr(self.computed) == repr(other.computed)
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+
+async def gather_scanner_data(
+    *queries: Query, return_exceptions: bool = False, **kwargs
+) -> list[tuple[int, pd.DataFrame]]:
+    """
+    Run all the queries concurrently, so they finish in the time of the slowest one instead of the
+    sum of all of them.
+
+    The results are returned in the same order as the queries.
+
+    Examples:
+
+    >>> nse, bse = await gather_scanner_data(
+    ...     Query().set_markets('india').where(col('exchange') == 'NSE'),
+    ...     Query().set_markets('india').where(col('exchange') == 'BSE'),
+    ... )
+
+    :param queries: the queries to run
+    :param return_exceptions: if True, a query that failed returns its exception instead of
+        cancelling all the others (the same as in `asyncio.gather()`)
+    :param kwargs: kwargs to pass to `Query.get_scanner_data_async()`
+    :return: a list of `(total_count, dataframe)` tuples
+    """
+    return await asyncio.gather(
+        *(q.get_scanner_data_async(**kwargs) for q in queries),
+        return_exceptions=return_exceptions,
+    )
+
+
+def get_scanner_data_many(
+    *queries: Query, return_exceptions: bool = False, **kwargs
+) -> list[tuple[int, pd.DataFrame]]:
+    """
+    A blocking wrapper around `gather_scanner_data()`, for code that doesn't run in an event-loop
+    (like a Streamlit script).
+
+    Note that this can't be called while an event-loop is running in the current thread (e.g. in a
+    Jupyter notebook), in that case just `await gather_scanner_data(...)` directly.
+    """
+    return asyncio.run(gather_scanner_data(*queries, return_exceptions=return_exceptions, **kwargs))
@@ -0,0 +1,678 @@
+"""
+A local stand-in of the scanner API, to run the tests and the load tests without sending a single
+request to `scanner.tradingview.com`.
+
+It's an asyncio HTTP/1.1 server that accepts the same `QueryDict` payloads as the real API on
+`/{market}/scan`, and answers them from a fixture universe: a synthetic one (deterministic, with
+realistic prices, volumes, nulls, types and `typespecs`), or one recorded from the real API. The
+filters (every operation of `where()` and the `where2()` trees) are evaluated with
+`tradingview_screener.evaluate`, the sort with `tradingview_screener.sort`, and the response has
+the `totalCount` and the `range` of rows of the real one (gzipped, if the client accepts it).
+
+The latency and the error rate of the responses can be configured, to see how the app behaves
+with a slow or flaky upstream.
+
+The fields of the field catalog (`tradingview_screener.fields`) that aren't in the universe are
+generated on first use, while the fields that aren't in the catalog are rejected with a 400, like
+the real API does.
+
+Examples:
+
+Run it from the command line, and point the app at it:
+
+    python -m tradingview_screener.server --port 8787 --rows 20000 --latency 0.05 --error-rate 0.01
+    python -m tradingview_screener.server --data india=india.parquet  # a recorded universe
+
+>>> set_transport(RedirectTransport('http://127.0.0.1:8787'))
+>>> Query().set_markets('india').get_scanner_data()  # served by the stand-in
+
+Or run it in a background thread (e.g. in a test):
+
+>>> with ScannerServer(rows=5000, latency=0.02) as server:
+...     transport = RedirectTransport(server.url)
+...     Query().set_transport(transport).get_scanner_data()
+
+A universe can be recorded from the real API with `fetch_all()`:
+
+>>> _, df = Query().set_markets('india').select('name', 'close', 'volume').fetch_all()
+>>> df.to_parquet('india.parquet')
+"""
+
+from __future__ import annotations
+
+__all__ = ['ScannerServer', 'load_universe', 'synthetic_universe']
+
+import asyncio
+import gzip
+import json
+import logging
+import math
+import random
+import threading
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from tradingview_screener.evaluate import query_mask
+from tradingview_screener.sort import sort_indices
+from tradingview_screener.universe import _expression_columns, _Fields, _operation_columns
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Any, Mapping, Optional, Union
+    from tradingview_screener.models import QueryDict
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8787
+_EXCHANGES = {
+    'america': ('NASDAQ', 'NYSE', 'AMEX', 'OTC'),
+    'canada': ('TSX', 'TSXV'),
+    'uk': ('LSE',),
+    'germany': ('XETR', 'FWB'),
+    'india': ('NSE', 'BSE'),
+    'japan': ('TSE',),
+    'crypto': ('BINANCE', 'COINBASE', 'BYBIT'),
+    'forex': ('FX_IDC', 'OANDA'),
+}
+_TYPES = ('stock', 'fund', 'dr', 'structured', 'index')
+_TYPE_WEIGHTS = (0.7, 0.18, 0.05, 0.05, 0.02)
+_TYPESPECS = {
+    'stock': (['common'], ['common'], ['common'], ['preferred']),
+    'fund': (['etf'], ['etf'], ['etn'], ['mutual'], []),
+    'dr': ([],),
+    'structured': ([],),
+    'index': ([],),
+}
+_SECTORS = (
+    'Finance',
+    'Technology Services',
+    'Electronic Technology',
+    'Health Technology',
+    'Energy Minerals',
+    'Retail Trade',
+    'Utilities',
+    'Producer Manufacturing',
+    'Consumer Non-Durables',
+    'Transportation',
+    'Communications',
+)
+# how long a connection waits for the next request before it's closed
+_KEEP_ALIVE_TIMEOUT = 60
+_MAX_BODY = 16 * 1024 * 1024
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    502: 'Bad Gateway',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+def _object_array(values: list) -> np.ndarray:
+    # (`np.array()` would turn a list of lists into a 2D array)
+    out = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        out[i] = value
+    return out
+
+
+def _symbols(n: int) -> np.ndarray:
+    # unique ticker-like names: BAA, BAB, ...
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    out = []
+    for i in range(n):
+        name = ''
+        i += 26**2  # at least 3 letters
+        while i:
+            i, r = divmod(i, 26)
+            name = letters[r] + name
+        out.append(name)
+    return np.array(out, dtype=object)
+
+
+def synthetic_universe(market: str = 'america', rows: int = 20_000, seed: int = 0) -> pd.DataFrame:
+    """
+    Return a deterministic synthetic market, with the columns that the queries use the most
+    (the other fields of the catalog are generated on demand by `ScannerServer`).
+
+    The values look like the real ones: log-normal prices, volumes and market caps, consistent
+    `open`/`high`/`low`/`close`/`close[1]`/`change`, nulls where the real API has them (like the
+    market cap of the funds, or the dividends of most tickers), and the `type`/`typespecs`
+    combinations of the screener.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng([seed, zlib.crc32(market.encode())])
+    names = _symbols(rows)
+    exchanges = np.array(_EXCHANGES.get(market, (market.upper(),)), dtype=object)
+    exchange = exchanges[rng.integers(0, len(exchanges), rows)]
+    types = np.array(_TYPES, dtype=object)[rng.choice(len(_TYPES), rows, p=_TYPE_WEIGHTS)]
+    typespecs = np.empty(rows, dtype=object)
+    for type_, choices in _TYPESPECS.items():
+        positions = np.flatnonzero(types == type_)
+        picks = rng.integers(0, len(choices), len(positions))
+        typespecs[positions] = _object_array([list(choices[i]) for i in picks])
+    is_stock = (types == 'stock') | (types == 'dr')
+    sectors = np.array(_SECTORS, dtype=object)[rng.integers(0, len(_SECTORS), rows)]
+    sectors[~is_stock] = None
+
+    close = np.round(rng.lognormal(3, 1.2, rows), 2)
+    previous = np.round(close / (1 + rng.normal(0, 0.03, rows)), 2)
+    open_ = np.round(close / (1 + rng.normal(0, 0.01, rows)), 2)
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, rows))), 2)
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, rows))), 2)
+    volume = rng.lognormal(12, 2, rows).astype(np.int64)
+    market_cap = close * rng.lognormal(17, 1.5, rows)
+    market_cap[~is_stock] = np.nan
+    dividends = np.round(rng.uniform(0, 8, rows), 2)
+    dividends[~is_stock | (rng.random(rows) < 0.4)] = np.nan
+
+    return pd.DataFrame(
+        {
+            'ticker': exchange + ':' + names,
+            'name': names,
+            'description': names + ' Inc.',
+            'exchange': exchange,
+            'type': types,
+            'typespecs': typespecs,
+            'sector': sectors,
+            'close': close,
+            'close[1]': previous,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'change': np.round((close / previous - 1) * 100, 4),
+            'volume': volume,
+            'Value.Traded': close * volume,
+            'market_cap_basic': market_cap,
+            'VWAP': np.round(close * (1 + rng.normal(0, 0.01, rows)), 2),
+            'price_52_week_low': np.round(close * rng.uniform(0.3, 1, rows), 2),
+            'price_52_week_high': np.round(close * rng.uniform(1, 2.5, rows), 2),
+            'dividends_yield_current': dividends,
+            'RSI': rng.uniform(5, 95, rows),
+            'relative_volume_10d_calc': rng.lognormal(0, 0.5, rows),
+        }
+    )
+
+
+def load_universe(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Load a recorded universe (a `.parquet`, `.feather`/`.arrow`, `.csv` or `.pkl` file of the
+    DataFrame returned by `get_scanner_data()`/`fetch_all()`, with its `ticker` column).
+    """
+    import pandas as pd
+
+    path = Path(path)
+    readers = {
+        '.parquet': pd.read_parquet,
+        '.feather': pd.read_feather,
+        '.arrow': pd.read_feather,
+        '.csv': pd.read_csv,
+        '.pkl': pd.read_pickle,
+        '.pickle': pd.read_pickle,
+    }
+    if path.suffix not in readers:
+        raise ValueError(f'unsupported file type: {path.suffix!r} (expected {", ".join(readers)})')
+    df = readers[path.suffix](path)
+    if 'ticker' not in df.columns:
+        raise ValueError(f'{path} has no `ticker` column')
+    return df
+
+
+def _to_columns(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    # the universe is kept as NumPy arrays: strings (and categoricals) as `object` arrays with
+    # `None` for the nulls, like the ones built from the API responses
+    columns = {}
+    for name, series in df.items():
+        if series.dtype.kind in 'biuf':
+            columns[name] = series.to_numpy()
+        else:
+            values = series.to_numpy(dtype=object)
+            columns[name] = np.where(series.isna().to_numpy(), None, values)
+    return columns
+
+
+def _generate(name: str, field: Any, columns: Mapping[str, np.ndarray], seed: int) -> np.ndarray:
+    # the values of a catalog field that isn't in the universe
+    n = len(columns['ticker'])
+    rng = np.random.default_rng([seed, zlib.crc32(name.encode())])
+    base = name.split('[')[0].split('|')[0]
+    if base != name and base in columns and columns[base].dtype.kind in 'iuf':
+        # another timeframe or a previous bar of a column of the universe: close to its values
+        return columns[base] * rng.lognormal(0, 0.02, n)
+
+    if field.dtype == 'bool':
+        return rng.random(n) < 0.5
+    if field.dtype == 'text':
+        values = np.array([f'{field.display_name} {i}' for i in range(8)], dtype=object)
+        return values[rng.integers(0, len(values), n)]
+    if field.dtype == 'set':
+        return _object_array([[f'{base}{i}'] for i in rng.integers(0, 4, n)])
+    if field.dtype == 'time':
+        now = 1_760_000_000
+        values = rng.integers(now - 365 * 86400, now + 90 * 86400, n).astype(np.float64)
+    elif field.dtype == 'percent':
+        values = rng.normal(0, 5, n)
+    elif field.dtype in ('price', 'fundamental_price') and 'close' in columns:
+        values = columns['close'] * rng.lognormal(0, 0.1, n)
+    elif field.dtype == 'fundamental_price':
+        values = rng.lognormal(15, 2, n)
+    else:
+        values = rng.uniform(0, 100, n)
+    values[rng.random(n) < 0.05] = np.nan
+    return values
+
+
+def _json_values(values: np.ndarray) -> list:
+    if values.dtype.kind == 'f':
+        out = values.astype(object)
+        out[np.isnan(values)] = None
+        return out.tolist()
+    if values.dtype.kind == 'O':
+        return [None if isinstance(v, float) and math.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class ScannerServer:
+    """
+    A local stand-in of the scanner API (see the module documentation).
+
+    Use `start()`/`stop()` (or a `with` block) to run it in a background thread, or await
+    `listen()` to run it in an event-loop of your own. The responses are computed in the default
+    executor of the event-loop, so a slow query doesn't block the other connections.
+
+    :param universes: the recorded universes, by market (see `load_universe()`), the other markets
+        are synthetic (see `synthetic_universe()`)
+    :param rows: number of rows of the synthetic markets
+    :param seed: seed of the synthetic markets and of the latency/error injection
+    :param latency: delay of every response, in seconds
+    :param jitter: a random delay between 0 and `jitter` seconds, added to `latency`
+    :param error_rate: the fraction of the requests that fail with `error_status`
+    :param error_status: the status code of the injected errors
+    :param host: the address to listen on
+    :param port: the port to listen on, 0 to pick a free one (see `url`)
+    """
+
+    def __init__(
+        self,
+        universes: Optional[Mapping[str, pd.DataFrame]] = None,
+        rows: int = 20_000,
+        seed: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ) -> None:
+        if not 0 <= error_rate <= 1:
+            raise ValueError(f'error_rate must be between 0 and 1, got {error_rate}')
+        self._universes = {m: _to_columns(df) for m, df in (universes or {}).items()}
+        self.rows = rows
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.host = host
+        self.port = port
+        # the number of scans that were answered, and of the injected errors
+        self.requests = 0
+        self.injected_errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[asyncio.Server] = None
+        self._connections: set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    # --- the scanner ---
+
+    def universe(self, market: str) -> dict[str, np.ndarray]:
+        """
+        Return the columns of a market (a synthetic one is created on first use).
+        """
+        with self._lock:
+            columns = self._universes.get(market)
+            if columns is None:
+                df = synthetic_universe(market, self.rows, self.seed)
+                columns = self._universes[market] = _to_columns(df)
+            return columns
+
+    def _column(self, market: str, name: str) -> np.ndarray:
+        from tradingview_screener.fields import get_catalog
+
+        columns = self.universe(market)
+        values = columns.get(name)
+        if values is None:
+            field = get_catalog().get(name)
+            if field is None:
+                raise _BadRequest(f'Unknown field "{name}"')
+            with self._lock:
+                values = columns.get(name)
+                if values is None:
+                    values = columns[name] = _generate(name, field, columns, self.seed)
+        return values
+
+    def _markets(self, market: str, payload: QueryDict) -> list[str]:
+        if market != 'global':
+            return [market]
+        if payload.get('markets'):
+            return list(payload['markets'])
+        # `set_tickers()` clears the markets: use the markets of the exchanges of the tickers
+        exchanges = {t.partition(':')[0] for t in (payload.get('symbols') or {}).get('tickers', ())}
+        markets = [m for m, names in _EXCHANGES.items() if exchanges.intersection(names)]
+        with self._lock:
+            return markets or sorted(self._universes) or ['america']
+
+    def scan(self, market: str, payload: QueryDict) -> dict[str, Any]:
+        """
+        Answer a query like the scanner API, and return the response (before JSON encoding).
+
+        :param market: the market of the URL (`/{market}/scan`), with `global` the markets are
+            the ones of the payload
+        """
+        if not isinstance(payload, dict):
+            raise _BadRequest('the body must be a JSON object')
+        markets = self._markets(market, payload)
+        start, end = payload.get('range', [0, 50])
+        if not (isinstance(start, int) and isinstance(end, int) and 0 <= start <= end):
+            raise _BadRequest(f'invalid range: {[start, end]!r}')
+        columns = payload.get('columns', ())
+        sort = payload.get('sort')
+
+        # the selected and sorted fields must exist, while a string on the right side of a filter
+        # is only a column if it's a field (otherwise it's a value, like `'NSE'`)
+        names = dict.fromkeys(['ticker', 'type', *columns, *([sort['sortBy']] if sort else [])])
+        fields = _Fields([self.universe(m) for m in markets])
+        filter_columns: set[str] = set()
+        for expr in payload.get('filter', ()):
+            filter_columns |= _expression_columns(expr, fields)
+        if payload.get('filter2'):
+            filter_columns |= _operation_columns(payload['filter2'], fields)  # pyright: ignore
+        names.update(dict.fromkeys(sorted(c for c in filter_columns if c in fields)))
+        parts = [{name: self._column(m, name) for name in names} for m in markets]
+        data = {name: np.concatenate([p[name] for p in parts]) for name in names}
+
+        rows = np.arange(len(data['ticker']))
+        symbols = payload.get('symbols') or {}
+        if symbols.get('tickers'):
+            import pandas as pd
+
+            positions = pd.Index(data['ticker']).get_indexer(symbols['tickers'])
+            rows = positions[positions >= 0]
+        types = set((symbols.get('query') or {}).get('types') or ())
+        if types:
+            rows = rows[np.fromiter((t in types for t in data['type'][rows]), bool, len(rows))]
+        if payload.get('filter') or payload.get('filter2'):
+            try:
+                mask = query_mask(payload, data)
+            except KeyError as e:  # a filter on a field that doesn't exist
+                raise _BadRequest(e.args[0]) from e
+            rows = rows[mask[rows]]
+
+        if sort:
+            positions = sort_indices(data, sort, start, end, rows=rows)
+        else:
+            positions = rows[start:end]
+        values = [_json_values(data[c][positions]) for c in columns]
+        tickers = data['ticker'][positions].tolist()
+        return {
+            'totalCount': len(rows),
+            'data': [
+                {'s': s, 'd': list(d)}
+                for s, d in zip(tickers, zip(*values) if values else [()] * len(tickers))
+            ],
+        }
+
+    def _respond(self, method: str, path: str, body: bytes) -> tuple[int, dict[str, Any]]:
+        parts = path.strip('/').split('/')
+        if len(parts) == 2 and parts[1] == 'scan':
+            if method != 'POST':
+                return 405, {'error': f'{method} is not allowed'}
+            try:
+                payload = json.loads(body or b'{}')
+                response = self.scan(parts[0], payload)
+            except (_BadRequest, ValueError, TypeError, KeyError) as e:
+                message = e.args[0] if isinstance(e, _BadRequest) else f'{type(e).__name__}: {e}'
+                return 400, {'totalCount': 0, 'error': message, 'data': None}
+            with self._lock:
+                self.requests += 1
+            return 200, response
+        if path == '/health':
+            return 200, {'status': 'ok', 'requests': self.requests}
+        return 404, {'error': f'{path} not found'}
+
+    def _encode(
+        self, method: str, path: str, body: bytes, accept_encoding: str
+    ) -> tuple[int, bytes, bool]:
+        # the CPU-bound part of a request, it runs in the executor
+        status, response = self._respond(method, path, body)
+        content = json.dumps(response, separators=(',', ':')).encode()
+        if 'gzip' in accept_encoding and len(content) > 1024:
+            return status, gzip.compress(content, compresslevel=5), True
+        return status, content, False
+
+    # --- the HTTP server ---
+
+    async def _handle_request(
+        self, method: str, path: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, bytes, bool]:
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and path.endswith('/scan') and self._random.random() < self.error_rate:
+            with self._lock:
+                self.injected_errors += 1
+            content = json.dumps({'totalCount': 0, 'error': 'injected error', 'data': None})
+            return self.error_status, content.encode(), False
+
+        loop = asyncio.get_running_loop()
+        accept_encoding = headers.get('accept-encoding', '')
+        return await loop.run_in_executor(None, self._encode, method, path, body, accept_encoding)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), _KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                if 'chunked' in headers.get('transfer-encoding', ''):
+                    status, content, gzipped = 411, b'{"error":"Content-Length required"}', False
+                    body = b''
+                else:
+                    length = int(headers.get('content-length', 0))
+                    if length > _MAX_BODY:
+                        status, content, gzipped = 413, b'{"error":"too large"}', False
+                    else:
+                        body = await reader.readexactly(length)
+                        path = urlsplit(target).path
+                        status, content, gzipped = await self._handle_request(
+                            method, path, headers, body
+                        )
+
+                keep_alive = (
+                    version == 'HTTP/1.1'
+                    and headers.get('connection', '').lower() != 'close'
+                    and status not in (411, 413)
+                )
+                head = [
+                    f'HTTP/1.1 {status} {_REASONS.get(status, "Unknown")}',
+                    'Content-Type: application/json',
+                    f'Content-Length: {len(content)}',
+                    f'Connection: {"keep-alive" if keep_alive else "close"}',
+                ]
+                if gzipped:
+                    head.append('Content-Encoding: gzip')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # the client went away, or sent garbage
+        except asyncio.CancelledError:
+            pass  # the server is stopping
+        finally:
+            if task is not None:
+                self._connections.discard(task)
+            writer.close()
+
+    async def listen(self) -> asyncio.Server:
+        """
+        Start listening in the running event-loop, and return the `asyncio.Server`
+        (`port` is updated if it was 0).
+        """
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    async def _close(self, server: asyncio.Server) -> None:
+        server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await server.wait_closed()
+
+    def _run(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    def start(self) -> str:
+        """
+        Run the server in a background thread, and return its URL.
+        """
+        if self._thread is not None:
+            raise RuntimeError('the server is already running')
+        loop = self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, args=(loop,), name='scanner-server', daemon=True
+        )
+        self._thread.start()
+        try:
+            # the errors of `listen()` (like a port that is already in use) are raised here
+            self._server = asyncio.run_coroutine_threadsafe(self.listen(), loop).result()
+        except BaseException:
+            self.stop()
+            raise
+        logger.info('the scanner stand-in is listening on %s', self.url)
+        return self.url
+
+    def stop(self) -> None:
+        if self._thread is None or self._loop is None:
+            return
+        if self._server is not None:
+            asyncio.run_coroutine_threadsafe(self._close(self._server), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = self._loop = self._server = None
+
+    def __enter__(self) -> ScannerServer:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} url={self.url!r} markets={sorted(self._universes)} '
+            f'latency={self.latency} error_rate={self.error_rate}>'
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m tradingview_screener.server',
+        description='A local stand-in of the scanner API, for offline tests and load tests.',
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--rows', type=int, default=20_000, help='rows of the synthetic markets')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of every response (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random delay (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of failed scans')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument(
+        '--data',
+        action='append',
+        default=[],
+        metavar='MARKET=PATH',
+        help='a recorded universe for a market (see `load_universe()`), can be repeated',
+    )
+    args = parser.parse_args(argv)
+
+    universes = {}
+    for item in args.data:
+        market, sep, path = item.partition('=')
+        if not sep:
+            parser.error(f'--data expects MARKET=PATH, got {item!r}')
+        universes[market] = load_universe(path)
+    server = ScannerServer(
+        universes,
+        rows=args.rows,
+        seed=args.seed,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        host=args.host,
+        port=args.port,
+    )
+
+    async def serve() -> None:
+        listening = await server.listen()
+        print(f'Serving the scanner API on {server.url}/{{market}}/scan')
+        print(f'Use it with: set_transport(RedirectTransport({server.url!r}))')
+        async with listening:
+            await listening.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
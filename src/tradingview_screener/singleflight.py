@@ -0,0 +1,126 @@
+"""
+Coalesce concurrent identical requests ("single-flight").
+
+When several threads (or tasks) send the same query at the same time, only the first one sends
+the request, and the others wait for it and get the same response. The responses are shared
+still encoded (`bytes` are immutable), so every caller decodes its own copy and can modify its
+DataFrame freely.
+
+The requests are only coalesced while they are in flight, use `Query.cached()` to also reuse
+the responses afterwards.
+"""
+
+from __future__ import annotations
+
+__all__ = ['AsyncSingleFlight', 'SingleFlight', 'get_async_single_flight', 'get_single_flight']
+
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+    T = TypeVar('T')
+
+
+class _Call:
+    __slots__ = ('error', 'event', 'result')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time, the concurrent callers with the same key wait for it
+    and get its result (or its exception).
+
+    >>> flight = SingleFlight()
+    >>> flight.do(query.key, lambda: transport.post(...))
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.shared = 0  # number of callers that got the result of another call
+        self._in_flight: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.event.set()
+        return call.result
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} calls={self.calls} shared={self.shared}>'
+
+
+class AsyncSingleFlight:
+    """
+    The same as `SingleFlight`, but for coroutines, the calls are coalesced per event loop.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.shared = 0
+        self._in_flight: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[Hashable, asyncio.Future]
+        ] = weakref.WeakKeyDictionary()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        in_flight = self._in_flight.setdefault(asyncio.get_running_loop(), {})
+        future = in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            future = in_flight[key] = asyncio.ensure_future(fn())
+            future.add_done_callback(lambda _: in_flight.pop(key, None))
+            self.calls += 1
+        # if one of the callers is cancelled, the request keeps going for the others
+        return await asyncio.shield(future)
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} calls={self.calls} shared={self.shared}>'
+
+
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Return the `SingleFlight` that is shared by all the queries.
+    """
+    return _single_flight
+
+
+def get_async_single_flight() -> AsyncSingleFlight:
+    """
+    Return the `AsyncSingleFlight` that is shared by all the queries.
+    """
+    return _async_single_flight
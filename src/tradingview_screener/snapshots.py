@@ -0,0 +1,171 @@
+"""
+Persist the market snapshots of `universe.UniverseService` as Arrow IPC (Feather v2) files, so
+that several processes on the same host (like the workers of a Streamlit deployment) share them.
+
+Each snapshot is written to a new file, named after the time it was fetched, and moved into place
+with an atomic rename, so readers never see a partial file and never wait for a writer: they
+simply open the most recent complete file. The files are memory-mapped, so the numeric columns of
+every process point to the same physical pages of the OS page cache instead of one copy each.
+
+Requires `pyarrow` (`pip install pyarrow`).
+
+Examples:
+
+>>> store = SnapshotStore('/dev/shm/tradingview_screener')
+>>> service = UniverseService(store=store)  # every worker shares the snapshots of the store
+>>> store.read('india')  # the latest snapshot that was written by any process
+Snapshot(market='india', columns=frozenset({...}), count=4715, df=..., created=1718289420.5)
+"""
+
+from __future__ import annotations
+
+__all__ = ['SnapshotStore']
+
+import importlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from tradingview_screener.universe import Snapshot
+
+if TYPE_CHECKING:
+    from typing import Optional, Union
+
+
+_METADATA_KEY = b'tradingview_screener'
+_SUFFIX = '.arrow'
+
+
+class SnapshotStore:
+    """
+    A directory of memory-mapped Arrow IPC snapshots, one sub-directory per market.
+
+    It's safe to use from several threads and processes: the writers never modify a file that
+    was already published, and the readers only open published files.
+
+    :param path: the directory of the store (e.g. in `/dev/shm` to keep it in memory)
+    :param keep: how many versions of each market are kept on disk, the older ones are deleted
+        (processes that still map them keep their pages until they open a newer version)
+    """
+
+    def __init__(self, path: Union[str, Path], keep: int = 2) -> None:
+        importlib.import_module('pyarrow')  # fail early if it isn't installed
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.keep = max(keep, 1)
+        self.reads = 0
+        self.writes = 0
+        # the last snapshot that was opened for each market, with the name of its file
+        self._opened: dict[str, tuple[str, Snapshot]] = {}
+        self._lock = threading.Lock()
+
+    def _market_dir(self, market: str) -> Path:
+        return self.path / market
+
+    def versions(self, market: str) -> list[Path]:
+        """
+        Return the published files of the market, from the oldest to the most recent.
+        """
+        try:
+            names = os.listdir(self._market_dir(market))
+        except FileNotFoundError:
+            return []
+        # the names start with the zero-padded creation time, so they sort chronologically
+        return [self._market_dir(market) / n for n in sorted(names) if n.endswith(_SUFFIX)]
+
+    def write(self, snapshot: Snapshot) -> Path:
+        """
+        Write the snapshot to a new file, and publish it atomically.
+        """
+        import pyarrow as pa  # pyright: ignore [reportMissingImports]
+
+        table = pa.Table.from_pandas(snapshot.df, preserve_index=False)
+        # `from_pandas()` turns NaN into nulls, which can't be read back without a copy, so the
+        # float columns keep their NaN (and have no validity bitmap)
+        for i, name in enumerate(table.column_names):
+            values = snapshot.df.iloc[:, i].to_numpy()
+            if values.dtype.kind == 'f':
+                table = table.set_column(i, name, pa.array(values, from_pandas=False))
+        metadata = {
+            'market': snapshot.market,
+            'columns': sorted(snapshot.columns),
+            'count': snapshot.count,
+            'created': snapshot.created,
+        }
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[_METADATA_KEY] = json.dumps(metadata).encode()
+        table = table.replace_schema_metadata(schema_metadata)
+
+        directory = self._market_dir(snapshot.market)
+        directory.mkdir(parents=True, exist_ok=True)
+        # the pid and thread id keep the names unique between writers of the same instant
+        name = f'{int(snapshot.created * 1e6):020d}-{os.getpid()}-{threading.get_ident()}'
+        tmp = directory / f'.{name}.tmp'
+        path = directory / f'{name}{_SUFFIX}'
+        with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.writes += 1
+        self._delete_old_versions(snapshot.market)
+        return path
+
+    def _delete_old_versions(self, market: str) -> None:
+        for path in self.versions(market)[: -self.keep]:
+            try:
+                path.unlink()
+            except OSError:  # already deleted by another process, or still mapped on Windows
+                pass
+
+    def read(self, market: str) -> Optional[Snapshot]:
+        """
+        Return the most recent snapshot of the market, or `None` if there isn't any.
+
+        The file is only opened again when a new version was published, and it's memory-mapped:
+        the float columns (with or without NaN) and the other numeric columns without nulls are
+        read-only views of the mapped file, the other columns are copied (the categoricals are
+        read back as categoricals).
+        """
+        for _ in range(3):  # the file can be deleted between listing and opening it
+            versions = self.versions(market)
+            if not versions:
+                return None
+            path = versions[-1]
+            with self._lock:
+                opened = self._opened.get(market)
+            if opened is not None and opened[0] == path.name:
+                return opened[1]
+            try:
+                snapshot = self._open(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self._opened[market] = (path.name, snapshot)
+                self.reads += 1
+            return snapshot
+        return None
+
+    def _open(self, path: Path) -> Snapshot:
+        import pyarrow as pa  # pyright: ignore [reportMissingImports]
+
+        source = pa.memory_map(str(path), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        metadata = json.loads(table.schema.metadata[_METADATA_KEY])
+        df = table.to_pandas(split_blocks=True)
+        return Snapshot(
+            market=metadata['market'],
+            columns=frozenset(metadata['columns']),
+            count=metadata['count'],
+            df=df,
+            created=metadata['created'],
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} path={str(self.path)!r} reads={self.reads} '
+            f'writes={self.writes}>'
+        )
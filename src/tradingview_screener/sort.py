@@ -0,0 +1,165 @@
+"""
+Sort rows that were already downloaded like the scanner API does (`Query.order_by()`), but only as
+far as needed: to show the first N rows, they are selected with a partial sort
+(`numpy.argpartition()`, linear in the number of rows) and only those N rows are fully sorted.
+
+This makes a "top 50" out of a whole market a matter of microseconds, so toggling the direction of
+the sort or changing N doesn't need a new request.
+
+The order is the same as the one of a stable sort: the ties keep the order of the data, and the
+nulls are placed first or last according to `nullsFirst` (last by default, like the API). Several
+sort keys can be given, the next ones break the ties of the previous ones.
+
+Examples:
+
+>>> df = service.snapshot('india', ['name', 'change']).df
+>>> sort_data(df, {'sortBy': 'change', 'sortOrder': 'desc'}, end=50)  # the top 50 gainers
+>>> sort_data(df, [{'sortBy': 'sector', 'sortOrder': 'asc'}, {'sortBy': 'change', 'sortOrder': 'desc'}])
+"""
+
+from __future__ import annotations
+
+__all__ = ['sort_data', 'sort_indices']
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Mapping, Optional, Sequence, Union
+    from tradingview_screener.models import SortByDict
+
+    Data = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+
+
+def _length(data: Data) -> int:
+    if hasattr(data, 'index'):  # DataFrame
+        return len(data.index)
+    return len(next(iter(data.values()), ()))
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    # sortable `float64` keys (NaN for the nulls) for any kind of column
+    if values.dtype.kind in 'fiub':
+        return values.astype(np.float64, copy=False)
+    if values.dtype.kind in 'mM':  # datetimes/timedeltas, NaT is the smallest int64
+        out = values.view(np.int64).astype(np.float64)
+        out[np.isnat(values)] = np.nan
+        return out
+
+    import pandas as pd
+
+    # strings and other objects: their rank among the distinct values, nulls are -1
+    codes, _ = pd.factorize(values, sort=True)
+    out = codes.astype(np.float64)
+    out[codes < 0] = np.nan
+    return out
+
+
+def _key(data: Data, sort: SortByDict, rows: Optional[np.ndarray]) -> np.ndarray:
+    # the keys of the rows, in increasing order of the sort (descending keys are negated)
+    name = sort['sortBy']
+    if name not in data:
+        raise KeyError(f'the column {name!r} is missing from the data, add it to the query')
+    column = data[name]
+    if hasattr(column, 'cat'):  # categorical Series, sorted in the order of its categories
+        codes = np.asarray(column.cat.codes)
+        values = np.where(codes < 0, np.nan, codes.astype(np.float64))
+    else:
+        values = _ranks(np.asarray(column))
+    if rows is not None:
+        values = values[rows]
+    return values if sort.get('sortOrder', 'asc') == 'asc' else -values
+
+
+def _lexsort(
+    positions: np.ndarray, keys: list[np.ndarray], sorts: Sequence[SortByDict]
+) -> np.ndarray:
+    # stable sort of the positions (which are in increasing order) by all the keys
+    columns = []
+    for key, sort in zip(keys, sorts):
+        values = key[positions]
+        nulls = np.isnan(values)
+        # the null flag is more significant than the value
+        columns += [nulls != bool(sort.get('nullsFirst', False)), np.where(nulls, 0, values)]
+    # `np.lexsort()` wants the most significant key last
+    return positions[np.lexsort(columns[::-1])]
+
+
+def sort_indices(
+    data: Data,
+    sort: Union[SortByDict, Sequence[SortByDict]],
+    start: int = 0,
+    end: Optional[int] = None,
+    rows: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Return the positions of the rows that are between `start` and `end` once the data is sorted
+    (like the `range` of a query), in sorted order.
+
+    Only the first `end` rows are sorted, the others are only partitioned.
+
+    :param data: a DataFrame, or a dictionary of NumPy arrays (see `frame.to_numpy_columns()`)
+    :param sort: the sort of `Query.order_by()` (`query.query['sort']`), or a list of them
+    :param start: the position of the first row to return, in the sorted rows
+    :param end: the position after the last row to return, defaults to all the rows
+    :param rows: only sort these rows of the data (e.g. the ones that matched a filter)
+    :return: the positions of the rows in `data` (not in `rows`)
+    """
+    sorts = [sort] if isinstance(sort, dict) else list(sort)
+    n = _length(data) if rows is None else len(rows)
+    end = n if end is None else min(end, n)
+    if end <= start or not sorts:
+        out = np.arange(start, max(end, start))
+        return out if rows is None else rows[out]
+
+    keys = [_key(data, s, rows) for s in sorts]
+    primary = keys[0]
+    nulls = np.isnan(primary)
+    null_positions = np.flatnonzero(nulls)
+    groups = [np.flatnonzero(~nulls), null_positions]
+    if sorts[0].get('nullsFirst', False):
+        groups.reverse()
+
+    selected = []
+    needed = end
+    for positions in groups:
+        if needed <= 0:
+            break
+        if positions is null_positions:
+            # the nulls are only ordered by the next keys
+            if len(sorts) > 1:
+                positions = _lexsort(positions, keys[1:], sorts[1:])
+            positions = positions[:needed]
+        elif needed < len(positions):
+            values = primary[positions]
+            # every row with a key up to the `needed`-th smallest one, the ties are kept so that
+            # the next keys and the order of the data can break them
+            kth = np.partition(values, needed - 1)[needed - 1]
+            positions = _lexsort(positions[values <= kth], keys, sorts)[:needed]
+        else:
+            positions = _lexsort(positions, keys, sorts)
+        selected.append(positions)
+        needed -= len(positions)
+
+    out = np.concatenate(selected)[start:end]
+    return out if rows is None else rows[out]
+
+
+def sort_data(
+    data: Data,
+    sort: Union[SortByDict, Sequence[SortByDict]],
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Data:
+    """
+    Return the rows of `data` between `start` and `end` once it's sorted (see `sort_indices()`),
+    `data` can be a DataFrame or a dictionary of NumPy arrays.
+
+    >>> sort_data(df, {'sortBy': 'change', 'sortOrder': 'asc', 'nullsFirst': False}, end=50)
+    """
+    positions = sort_indices(data, sort, start, end)
+    if hasattr(data, 'index'):  # DataFrame
+        return data.iloc[positions]  # pyright: ignore
+    return {name: np.asarray(values)[positions] for name, values in data.items()}
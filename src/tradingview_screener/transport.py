@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+__all__ = [
+    'AsyncTransport',
+    'HTTPXAsyncTransport',
+    'HTTPXTransport',
+    'RedirectTransport',
+    'RequestsTransport',
+    'ThreadedAsyncTransport',
+    'Transport',
+    'get_async_transport',
+    'get_transport',
+    'set_async_transport',
+    'set_transport',
+]
+
+import asyncio
+import datetime
+import importlib.util
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from typing import Any, AsyncIterator, Optional, Union
+
+
+def _installed(name: str) -> bool:
+    # whether an optional package can be imported (without importing it)
+    return importlib.util.find_spec(name) is not None
+
+
+def _accept_encoding() -> str:
+    # `urllib3` (and `httpx`) decode brotli transparently, but only if one of the brotli packages
+    # is installed, so we only advertise it when we are able to decode it
+    if _installed('brotli') or _installed('brotlicffi'):
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+class Transport(ABC):
+    """
+    The object that the `Query` uses to send the HTTP requests to the scanner API.
+
+    A transport owns a pool of keep-alive connections, so that consecutive scans reuse the same
+    TCP/TLS connection instead of doing a new handshake every time.
+
+    Subclasses only have to implement `post()`, which must return a `requests.Response` (so that
+    the error handling in `Query.get_scanner_data_raw()` works the same for every transport). Its
+    `elapsed` is the time to the headers of the response, like with `requests`, or zero if the
+    transport can't measure it (see `instrument.ScanTimings.ttfb`).
+    """
+
+    @abstractmethod
+    def post(self, url: str, json: Any, **kwargs) -> requests.Response: ...
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class RequestsTransport(Transport):
+    """
+    A transport backed by a `requests.Session`, it's thread-safe and shared by all the `Query`
+    objects by default.
+
+    :param pool_connections: number of hosts to keep a connection pool for
+    :param pool_maxsize: maximum number of connections kept alive per host
+    :param pool_block: if True, block when all the connections of a host are in use, instead of
+        opening a throw-away connection (this effectively limits the concurrency per host)
+    :param max_retries: number of retries on connection errors (not on HTTP errors)
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        pool_block: bool = False,
+        max_retries: int = 0,
+    ) -> None:
+        self.session = requests.Session()
+        self.session.headers['accept-encoding'] = _accept_encoding()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        return self.session.post(url, json=json, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__}>'
+
+
+class HTTPXTransport(Transport):
+    """
+    A transport backed by `httpx.Client`, which can use HTTP/2 (requires `pip install httpx[http2]`).
+
+    The responses are converted to `requests.Response` objects, so the rest of the library
+    doesn't have to care about which transport is used.
+
+    :param http2: use HTTP/2 if the server supports it
+    :param max_connections: maximum number of open connections (across all hosts)
+    :param max_keepalive_connections: maximum number of idle connections kept alive
+    :param verify: verify the TLS certificates (or the path of a CA bundle), `httpx` only accepts
+        it for the whole client, so the requests can't use another value
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 16,
+        max_keepalive_connections: int = 16,
+        verify: Union[bool, str] = True,
+    ) -> None:
+        import httpx  # pyright: ignore [reportMissingImports]
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.verify = verify
+        self.client = httpx.Client(
+            http2=http2,
+            limits=limits,
+            headers={'accept-encoding': _accept_encoding()},
+            verify=verify,
+        )
+
+    def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        _check_verify(self, kwargs)
+        request = self.client.build_request('POST', url, json=json, **kwargs)
+        start = time.perf_counter()
+        r = self.client.send(request, stream=True)  # returns with the headers
+        ttfb = time.perf_counter() - start
+        try:
+            r.read()
+        finally:
+            r.close()
+        return _to_requests_response(r, ttfb)
+
+    def close(self) -> None:
+        self.client.close()
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__}>'
+
+
+def _check_verify(transport: Any, kwargs: dict[str, Any]) -> None:
+    # `verify` is an option of the `httpx` clients, not of their requests
+    verify = kwargs.pop('verify', transport.verify)
+    if verify != transport.verify:
+        raise ValueError(
+            f'the requests of {type(transport).__name__} cannot set `verify`, create the transport '
+            f'with `{type(transport).__name__}(verify={verify!r})` instead'
+        )
+
+
+def _to_requests_response(r: Any, ttfb: float) -> requests.Response:
+    # convert a `httpx.Response` to a `requests.Response`, its `elapsed` is the time to the headers
+    # like with `requests` (the one of `httpx` also includes the download of the body)
+    response = requests.Response()
+    response.status_code = r.status_code
+    response.reason = r.reason_phrase
+    response.headers.update(r.headers)
+    response.url = str(r.url)
+    response.encoding = r.encoding
+    response._content = r.content  # already decompressed by httpx
+    response.elapsed = datetime.timedelta(seconds=ttfb)
+    return response
+
+
+class RedirectTransport(Transport):
+    """
+    Send the requests to another server, with the same path (`/{market}/scan`), like a local
+    stand-in of the scanner API (see `tradingview_screener.server`) or a caching proxy.
+
+    The URL of the queries doesn't change, so their cache keys (see `Query.cached()`) are the same
+    as with the real API.
+
+    >>> set_transport(RedirectTransport('http://127.0.0.1:8787'))
+    >>> Query().get_scanner_data()  # sent to http://127.0.0.1:8787/america/scan
+
+    :param base_url: the scheme and host (and optional path prefix) of the other server
+    :param transport: the transport that sends the requests, defaults to a new
+        `RequestsTransport` (not the shared one, which can be this transport)
+    """
+
+    def __init__(self, base_url: str, transport: Optional[Transport] = None) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.transport = transport if transport is not None else RequestsTransport()
+
+    def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        parts = urlsplit(url)
+        target = self.base_url + parts.path + (f'?{parts.query}' if parts.query else '')
+        return self.transport.post(target, json=json, **kwargs)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} base_url={self.base_url!r}>'
+
+
+_default_transport: Optional[Transport] = None
+_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """
+    Return the transport that is shared by all the `Query` objects that don't have their own
+    transport.
+
+    It's created lazily on the first call, using HTTP/2 if `httpx` and `h2` are installed, and
+    falling back to a pooled `requests.Session` otherwise.
+
+    If the `SCREENER_SCANNER_URL` environment variable is set (e.g. `http://127.0.0.1:8787`), the
+    requests are sent to that server instead (see `RedirectTransport`), like a local stand-in of
+    the scanner API for load tests (see `tradingview_screener.server`).
+
+    If `SCREENER_CASSETTE` is set to the path of a cassette, the responses are replayed from it,
+    or recorded in it (see `tradingview_screener.cassette`), depending on `SCREENER_CASSETTE_MODE`
+    (`replay` by default, `record` or `auto`); `SCREENER_CASSETTE_TIMING` sets the `timing` of the
+    replay.
+    """
+    global _default_transport
+
+    if _default_transport is None:
+        with _lock:
+            if _default_transport is None:
+                transport: Transport
+                if _installed('httpx') and _installed('h2'):
+                    transport = HTTPXTransport()
+                else:
+                    transport = RequestsTransport()
+                base_url = os.environ.get('SCREENER_SCANNER_URL')
+                if base_url:
+                    transport = RedirectTransport(base_url, transport)
+                cassette = os.environ.get('SCREENER_CASSETTE')
+                if cassette:
+                    from tradingview_screener.cassette import CassetteTransport
+
+                    transport = CassetteTransport(
+                        cassette,
+                        mode=os.environ.get('SCREENER_CASSETTE_MODE', 'replay'),
+                        transport=transport,
+                        timing=float(os.environ.get('SCREENER_CASSETTE_TIMING', '0')),
+                    )
+                _default_transport = transport
+    return _default_transport
+
+
+def set_transport(transport: Transport) -> None:
+    """
+    Replace the transport that is shared by all the `Query` objects.
+
+    Examples:
+
+    >>> from tradingview_screener.transport import RequestsTransport, set_transport
+    >>> set_transport(RequestsTransport(pool_maxsize=64, pool_block=True))
+    """
+    global _default_transport
+
+    # the old transport isn't closed, since other threads might still be using it
+    with _lock:
+        _default_transport = transport
+
+
+class AsyncTransport(ABC):
+    """
+    The asynchronous counterpart of `Transport`, used by `Query.get_scanner_data_raw_async()`.
+
+    Subclasses only have to implement the coroutine `post()`, which must return a
+    `requests.Response`.
+    """
+
+    @abstractmethod
+    async def post(self, url: str, json: Any, **kwargs) -> requests.Response: ...
+
+    async def aclose(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+
+class ThreadedAsyncTransport(AsyncTransport):
+    """
+    Run the requests of a (blocking) `Transport` in a worker thread, so that they can be awaited.
+
+    This is the fallback when `httpx` isn't installed; the requests still share the keep-alive
+    connections of the synchronous transport.
+
+    :param transport: the transport to use, defaults to the shared one (`get_transport()`)
+    """
+
+    def __init__(self, transport: Optional[Transport] = None) -> None:
+        self.transport = transport
+
+    async def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        transport = self.transport or get_transport()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: transport.post(url, json=json, **kwargs))
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} transport={self.transport!r}>'
+
+
+class HTTPXAsyncTransport(AsyncTransport):
+    """
+    A non-blocking transport backed by `httpx.AsyncClient` (with HTTP/2 if `h2` is installed).
+
+    A client (and its connection pool) is bound to the event-loop that created it, so one client
+    is kept per event-loop; this is what makes it safe to call `asyncio.run()` multiple times, like
+    a Streamlit script does on every rerun. The client of a loop is closed when `asyncio.run()`
+    returns (or by `aclose()` in that loop).
+
+    :param http2: use HTTP/2 if the server supports it
+    :param max_connections: maximum number of open connections (across all hosts)
+    :param max_keepalive_connections: maximum number of idle connections kept alive
+    :param verify: verify the TLS certificates (or the path of a CA bundle), see `HTTPXTransport`
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 16,
+        max_keepalive_connections: int = 16,
+        verify: Union[bool, str] = True,
+    ) -> None:
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.verify = verify
+        # `loop` -> `(client, closer)`, see `_closer()`
+        self._clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[Any, Any]] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _new_client(self) -> Any:
+        import httpx  # pyright: ignore [reportMissingImports]
+
+        http2 = self.http2 and _installed('h2')
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+        )
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=limits,
+            headers={'accept-encoding': _accept_encoding()},
+            verify=self.verify,
+        )
+
+    @staticmethod
+    async def _closer(client: Any) -> AsyncIterator[None]:
+        # an async generator that is suspended for as long as the client is used, the loop closes
+        # the open async generators in `loop.shutdown_asyncgens()` (called by `asyncio.run()`
+        # before it closes the loop), which closes the client in the loop that created it
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    async def _get_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            client = self._new_client()
+            closer = self._closer(client)
+            await closer.__anext__()
+            entry = self._clients[loop] = (client, closer)
+        return entry[0]
+
+    async def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        _check_verify(self, kwargs)
+        client = await self._get_client()
+        request = client.build_request('POST', url, json=json, **kwargs)
+        start = time.perf_counter()
+        r = await client.send(request, stream=True)  # returns with the headers
+        ttfb = time.perf_counter() - start
+        try:
+            await r.aread()
+        finally:
+            await r.aclose()
+        return _to_requests_response(r, ttfb)
+
+    async def aclose(self) -> None:
+        entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()  # closes the client
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__}>'
+
+
+_default_async_transport: Optional[AsyncTransport] = None
+
+
+def get_async_transport() -> AsyncTransport:
+    """
+    Return the async transport that is shared by all the `Query` objects.
+
+    It uses `httpx.AsyncClient` if `httpx` is installed, otherwise it runs the requests of the
+    shared synchronous transport in a thread-pool (as it does with `SCREENER_SCANNER_URL` and
+    `SCREENER_CASSETTE`, see `get_transport()`).
+    """
+    global _default_async_transport
+
+    if _default_async_transport is None:
+        with _lock:
+            if _default_async_transport is None:
+                if os.environ.get('SCREENER_SCANNER_URL') or os.environ.get('SCREENER_CASSETTE'):
+                    _default_async_transport = ThreadedAsyncTransport()
+                    return _default_async_transport
+                if _installed('httpx'):
+                    _default_async_transport = HTTPXAsyncTransport()
+                else:
+                    _default_async_transport = ThreadedAsyncTransport()
+    return _default_async_transport
+
+
+def set_async_transport(transport: AsyncTransport) -> None:
+    """
+    Replace the async transport that is shared by all the `Query` objects.
+    """
+    global _default_async_transport
+
+    with _lock:
+        _default_async_transport = transport
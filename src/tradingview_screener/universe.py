@@ -0,0 +1,483 @@
+"""
+Answer queries locally from a snapshot of the whole market, instead of sending one request per
+query.
+
+A `UniverseService` keeps one wide snapshot per market, with the union of the columns that
+were ever requested for that market, and refreshes it on a background thread. Every query that
+the service can answer (one market, no ticker list, ...) is then answered by filtering, sorting
+and projecting that snapshot (see `tradingview_screener.evaluate`), so many sessions that run
+many different queries cost a single upstream fetch per refresh interval.
+
+The snapshots are compacted (see `frame.compact()`) and read-only, since they are shared by every
+session, and `UniverseService.memory_usage()` reports how much memory they take (which can be
+bounded with `max_bytes`). With a `snapshots.SnapshotStore`, the snapshots are also shared by
+the processes of the same host: a snapshot fetched by one of them is published as a memory-mapped
+Arrow file, and the others use it instead of fetching their own.
+
+Examples:
+
+>>> service = UniverseService(refresh_interval=300)
+>>> service.start()  # refresh the snapshots in the background
+>>> q = Query().set_markets('india').select('name', 'close').where(col('exchange') == 'NSE')
+>>> service.scan(q)  # the first scan of a market fetches its snapshot
+(2204,
+             ticker        name    close
+ 0    NSE:RELIANCE    RELIANCE  2901.35
+ ...)
+>>> service.scan(q.select('name', 'change').order_by('change', ascending=False))  # local
+"""
+
+from __future__ import annotations
+
+__all__ = ['Snapshot', 'UniverseService']
+
+import logging
+import threading
+import time
+from collections import ChainMap
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tradingview_screener import frame
+from tradingview_screener.evaluate import query_mask
+from tradingview_screener.query import Query
+from tradingview_screener.sort import sort_indices
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from typing import Container, Iterable, Optional
+    from tradingview_screener.models import FilterOperationDict, OperationComparisonDict
+    from tradingview_screener.snapshots import SnapshotStore
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT = Query().query
+# the operations where a string on the right side is (almost) always a column name
+_COLUMN_OPERANDS = {
+    'greater',
+    'egreater',
+    'less',
+    'eless',
+    'crosses',
+    'crosses_above',
+    'crosses_below',
+}
+_PCT_OPERATIONS = {'above%', 'below%', 'in_range%', 'not_in_range%'}
+# the keys of the query dictionary that `UniverseService.scan()` knows how to answer
+_LOCAL_KEYS = {'markets', 'symbols', 'options', 'columns', 'filter', 'filter2', 'sort', 'range'}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    All the rows of a market, with a superset of the columns that the queries need.
+    """
+
+    market: str
+    columns: frozenset[str]
+    count: int
+    df: pd.DataFrame
+    created: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created
+
+    @property
+    def nbytes(self) -> int:
+        return frame.memory_usage(self.df)
+
+
+class _Fields:
+    # the names that are fields: the columns of the universes and the fields of the catalog, like
+    # the scanner API a string on the right side of a filter is a column if it's a field
+    def __init__(self, universes: Iterable[Container[str]]) -> None:
+        self.universes = list(universes)
+
+    def __contains__(self, name: object) -> bool:
+        from tradingview_screener.fields import get_catalog
+
+        if not isinstance(name, str):
+            return False
+        return any(name in columns for columns in self.universes) or name in get_catalog()
+
+
+def _expression_columns(expr: FilterOperationDict, known: Iterable[str]) -> set[str]:
+    op = expr['operation']
+    right = expr.get('right')
+    columns = {expr['left']}
+    if op in _COLUMN_OPERANDS and isinstance(right, str):
+        columns.add(right)
+    elif op in _PCT_OPERATIONS and isinstance(right[0], str):
+        columns.add(right[0])
+    elif isinstance(right, str) and right in known:
+        columns.add(right)
+    elif isinstance(right, list):
+        columns.update(v for v in right if isinstance(v, str) and v in known)
+
+    if op.startswith('crosses'):  # the values of the previous bar
+        columns.update(f'{c}[1]' for c in list(columns))
+    return columns
+
+
+def _operation_columns(operation: OperationComparisonDict, known: Iterable[str]) -> set[str]:
+    columns = set()
+    for operand in operation['operands']:
+        if 'expression' in operand:
+            columns |= _expression_columns(operand['expression'], known)  # pyright: ignore
+        else:
+            columns |= _operation_columns(operand['operation'], known)  # pyright: ignore
+    return columns
+
+
+class UniverseService:
+    """
+    A thread-safe, process-wide store of market snapshots.
+
+    :param refresh_interval: how often the snapshots are refreshed, in seconds
+    :param base_query: the query used to fetch the snapshots (its markets, columns and filters are
+        replaced), use it to set a transport or a cache
+    :param page_size: number of rows per request while fetching a snapshot
+    :param max_rows: maximum number of rows of a snapshot (the first ones by `name`)
+    :param max_age: a snapshot older than this (in seconds) is never used, the callers wait for a
+        new one instead (defaults to 3 times `refresh_interval`)
+    :param compact: store the snapshots with `frame.compact()` (dictionary-encoded strings,
+        `float32` where it's lossless, and read-only numeric arrays)
+    :param max_bytes: the maximum memory used by all the snapshots together, the least recently
+        used markets are dropped (and fetched again on their next scan) to stay under it
+    :param store: share the snapshots with the other processes through this store, see
+        `snapshots.SnapshotStore`
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 300,
+        base_query: Optional[Query] = None,
+        page_size: int = 5000,
+        max_rows: Optional[int] = None,
+        max_age: Optional[float] = None,
+        compact: bool = True,
+        max_bytes: Optional[int] = None,
+        store: Optional[SnapshotStore] = None,
+    ) -> None:
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age if max_age is not None else 3 * refresh_interval
+        self.base_query = base_query if base_query is not None else Query()
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.compact = compact
+        self.max_bytes = max_bytes
+        self.store = store
+        self.fetches = 0
+        self.evictions = 0
+
+        self._snapshots: dict[str, Snapshot] = {}
+        self._columns: dict[str, set[str]] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._refreshing: set[str] = set()
+        self._last_used: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _market_lock(self, market: str) -> threading.RLock:
+        with self._lock:
+            return self._locks.setdefault(market, threading.RLock())
+
+    def register(self, market: str, columns: Iterable[str]) -> None:
+        """
+        Add columns to the snapshot of the market, they are fetched on the next refresh.
+        """
+        with self._lock:
+            self._columns.setdefault(market, set()).update(columns)
+
+    def refresh(self, market: str) -> Snapshot:
+        """
+        Fetch a new snapshot of the market, with all the registered columns.
+        """
+        with self._market_lock(market):
+            with self._lock:
+                columns = sorted(self._columns.get(market, ()))
+            count, df = self._fetch(market, columns)
+            if self.compact:
+                df = frame.compact(df, read_only=True)
+            snapshot = Snapshot(market, frozenset(columns), count, df, time.time())
+            if self.store is not None:
+                snapshot = self._publish(snapshot)
+            with self._lock:
+                self._snapshots[market] = snapshot
+                self._last_used.setdefault(market, snapshot.created)
+                self.fetches += 1
+            self._evict(keep=market)
+            return snapshot
+
+    def _fetch(self, market: str, columns: list[str]) -> tuple[int, pd.DataFrame]:
+        import pandas as pd
+
+        # the whole market (without the filters of the base query), sorted by `name` rather than
+        # by a live value like the default `Value.Traded`: the pages are fetched concurrently, and
+        # rows that move between the requests would be duplicated in a page and missing from another
+        base = self.base_query.set_markets(market).select(*columns).order_by('name')
+        query = base._replace(_query={k: v for k, v in base._query.items() if k != 'filter2'})
+        query = query.set_property('filter', [])
+
+        count, df = query.fetch_all(page_size=self.page_size, max_rows=self.max_rows)
+        df = df.drop_duplicates('ticker', ignore_index=True)
+        expected = count if self.max_rows is None else min(count, self.max_rows)
+        if len(df) < expected:
+            # the symbols with the same name can still swap pages: list the tickers of the whole
+            # market in a single request (that can't overlap itself), and fetch the missing ones
+            _, tickers = (
+                query.select('name').set_property('range', [0, expected]).get_scanner_data()
+            )
+            missing = tickers.loc[~tickers['ticker'].isin(df['ticker']), 'ticker'].unique()
+            if len(missing):
+                rest = query.set_tickers(*missing).set_markets(market).limit(len(missing))
+                df = pd.concat([df, rest.get_scanner_data()[1]], ignore_index=True)
+            if len(df) < expected:
+                logger.warning('the snapshot of %r has %d of %d rows', market, len(df), expected)
+        return count, df
+
+    def _publish(self, snapshot: Snapshot) -> Snapshot:
+        # write the snapshot to the store, and use the memory-mapped copy (that the other processes
+        # share) instead of the one that was just fetched
+        try:
+            self.store.write(snapshot)  # pyright: ignore [reportOptionalMemberAccess]
+            stored = self.store.read(snapshot.market)  # pyright: ignore [reportOptionalMemberAccess]
+        except Exception:
+            logger.exception('failed to write the snapshot of %r to the store', snapshot.market)
+            return snapshot
+        usable = stored is not None and snapshot.columns <= stored.columns
+        return stored if usable and stored.created >= snapshot.created else snapshot  # pyright: ignore
+
+    def _adopt(self, market: str) -> Optional[Snapshot]:
+        # use the snapshot of the store if it's more recent than ours (another process fetched it)
+        current = self._snapshots.get(market)
+        if self.store is None:
+            return current
+        try:
+            stored = self.store.read(market)
+        except Exception:
+            logger.exception('failed to read the snapshot of %r from the store', market)
+            return current
+        if stored is None or (current is not None and stored.created <= current.created):
+            return current
+        with self._lock:
+            self._snapshots[market] = stored
+            self._last_used.setdefault(market, time.time())
+            # keep the columns that the other processes need in the next refreshes
+            self._columns.setdefault(market, set()).update(stored.columns)
+        return stored
+
+    def _refresh_stale(self, market: str) -> None:
+        # refresh the snapshot, unless another process already published a recent one
+        snapshot = self._adopt(market)
+        with self._lock:
+            columns = set(self._columns.get(market, ()))
+        recent = snapshot is not None and snapshot.age < self.refresh_interval
+        if self.store is not None and recent and columns <= snapshot.columns:  # pyright: ignore
+            return
+        self.refresh(market)
+
+    def memory_usage(self) -> dict[str, int]:
+        """
+        Return the memory used by the snapshot of each market, in bytes.
+        """
+        return {market: s.nbytes for market, s in list(self._snapshots.items())}
+
+    def _evict(self, keep: str) -> None:
+        # drop the least recently used snapshots until they all fit in `max_bytes`
+        if self.max_bytes is None:
+            return
+        sizes = self.memory_usage()
+        total = sum(sizes.values())
+        with self._lock:
+            for market in sorted(sizes, key=lambda m: self._last_used.get(m, 0)):
+                if total <= self.max_bytes:
+                    break
+                if market == keep or market not in self._snapshots:
+                    continue
+                del self._snapshots[market]
+                self._last_used.pop(market, None)
+                total -= sizes[market]
+                self.evictions += 1
+
+    def snapshot(self, market: str, columns: Iterable[str] = ()) -> Snapshot:
+        """
+        Return the snapshot of the market.
+
+        A snapshot older than `refresh_interval` is still returned right away (and refreshed in
+        the background if the refresh thread isn't running), the caller only waits for a new
+        fetch if the snapshot doesn't exist yet, if it's missing some of the columns, or if it's
+        older than `max_age`.
+        """
+        columns = set(columns)
+        self.register(market, columns)
+        with self._lock:
+            self._last_used[market] = time.time()
+
+        snapshot = self._snapshots.get(market)
+        if snapshot is None or snapshot.age > self.refresh_interval:
+            snapshot = self._adopt(market)
+        if not self._is_usable(snapshot, columns):
+            with self._market_lock(market):
+                # another thread (or process) might have fetched it while we were waiting
+                snapshot = self._adopt(market)
+                if not self._is_usable(snapshot, columns):
+                    return self.refresh(market)
+
+        if snapshot.age > self.refresh_interval and not self.running:  # pyright: ignore
+            self._refresh_in_background(market)
+        return snapshot  # pyright: ignore
+
+    def _is_usable(self, snapshot: Optional[Snapshot], columns: set[str]) -> bool:
+        return snapshot is not None and columns <= snapshot.columns and snapshot.age <= self.max_age
+
+    def _refresh_in_background(self, market: str) -> None:
+        with self._lock:
+            if market in self._refreshing:
+                return
+            self._refreshing.add(market)
+
+        def refresh() -> None:
+            try:
+                self._refresh_stale(market)
+            except Exception:
+                logger.exception('failed to refresh the snapshot of %r', market)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(market)
+
+        threading.Thread(target=refresh, name=f'universe-refresh-{market}', daemon=True).start()
+
+    def can_answer(self, query: Query) -> bool:
+        """
+        Return True if the query can be answered from a snapshot: a single market, all the
+        symbols of that market, and the default options.
+
+        The queries with their own transport or response cache (`Query.set_transport()`,
+        `Query.cached()`) are never answered from a snapshot, since it's fetched with the ones of
+        `base_query`.
+        """
+        dct = query._query
+        return (
+            query.transport is None
+            and query.async_transport is None
+            and query.cache_ttl is None
+            and len(dct.get('markets', ())) == 1
+            and dct.get('symbols') == _DEFAULT['symbols']
+            and dct.get('options') == _DEFAULT['options']
+            and set(dct) <= _LOCAL_KEYS
+        )
+
+    def required_columns(self, query: Query, known: Iterable[str] = ()) -> set[str]:
+        """
+        Return the columns that a snapshot needs to answer the query: the selected ones, the sort
+        column, and the columns of the filters. The computed columns of the query (see
+        `Query.with_columns()`) are replaced by the columns that they need.
+
+        A string on the right side of `==`, `isin()`, etc. is only considered a column if it's in
+        `known` (e.g. the columns of the snapshot and the field catalog, like the scanner API
+        does), otherwise it's a value (like `'NSE'` in `col('exchange') == 'NSE'`).
+        """
+        dct = query._query
+        columns = set(dct.get('columns', ()))
+        if 'sort' in dct:
+            columns.add(dct['sort']['sortBy'])
+        for expr in dct.get('filter', ()):
+            columns |= _expression_columns(expr, known)
+        if dct.get('filter2'):
+            columns |= _operation_columns(dct['filter2'], known)  # pyright: ignore
+        if query.computed:
+            from tradingview_screener.compute import source_columns
+
+            columns = (columns - set(query.computed)) | set(source_columns(query.computed))
+        return columns
+
+    def scan(self, query: Query, **kwargs) -> tuple[int, pd.DataFrame]:
+        """
+        Answer the query from the snapshot of its market, with the same result as
+        `query.get_scanner_data()`. Queries that can't be answered locally (see `can_answer()`)
+        are sent to the API, and so are the ones with `kwargs` (like the cookies of a session),
+        since the snapshot is fetched without them.
+
+        The snapshot is returned right away even while it's being refreshed in the background,
+        `df.attrs['created']` holds the time it was fetched.
+
+        Unlike the API, the filters and the sort can use the computed columns of the query (see
+        `Query.with_columns()`), since they are computed on the whole market.
+
+        :param kwargs: the arguments of `Query.get_scanner_data()`
+        :return: a tuple consisting of: (total_count, dataframe)
+        """
+        if kwargs or not self.can_answer(query):
+            return query.get_scanner_data(**kwargs)
+
+        dct = query._query
+        market = dct['markets'][0]
+        existing = self._snapshots.get(market)
+        known = _Fields([existing.columns] if existing is not None else [])
+        snapshot = self.snapshot(market, self.required_columns(query, known))
+
+        data = snapshot.df
+        computed = {}
+        if query.computed:
+            from tradingview_screener.compute import compute
+
+            computed = compute(snapshot.df, query.computed)
+            data = ChainMap(computed, snapshot.df)
+        rows = np.flatnonzero(query_mask(query, data))  # pyright: ignore [reportArgumentType]
+        start, end = dct.get('range', _DEFAULT['range'])
+        if 'sort' in dct:
+            # only the rows of the range are sorted, the others are only partitioned
+            positions = sort_indices(data, dct['sort'], start, end, rows=rows)  # pyright: ignore
+        else:
+            positions = rows[start:end]
+        columns = ['ticker', *dct.get('columns', ())]
+        result = snapshot.df.iloc[positions][columns].reset_index(drop=True)
+        for name, values in computed.items():
+            result[name] = values[positions]
+        # the categories of the whole market would otherwise show up in `groupby()`, etc.
+        for name in result.select_dtypes('category').columns:
+            result[name] = result[name].cat.remove_unused_categories()
+        # the same metadata as `Query.get_scanner_data()`
+        result.attrs.update(created=snapshot.created, stale=snapshot.age > self.refresh_interval)
+        return len(rows), result
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            for market in list(self._snapshots):
+                try:
+                    self._refresh_stale(market)
+                except Exception:
+                    logger.exception('failed to refresh the snapshot of %r', market)
+
+    def start(self) -> None:
+        """
+        Start refreshing the snapshots every `refresh_interval` seconds, on a daemon thread.
+        """
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='universe-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __repr__(self) -> str:
+        markets = {m: len(s.df) for m, s in self._snapshots.items()}
+        return (
+            f'<{type(self).__name__} markets={markets} fetches={self.fetches} '
+            f'evictions={self.evictions}>'
+        )
@@ -1,10 +1,9 @@
 import streamlit as st
 import inspect
 from src.tradingview_screener import Query, col
+from src.tradingview_screener.sort import sort_data
 import pandas as pd
 import io
-import requests
-from bs4 import BeautifulSoup
 import subprocess
 from functools import lru_cache
 import numpy as np
@@ -314,82 +313,28 @@ if selected_tab == "📝 Build Query":
             st.warning("⚠️ Please select at least one instrument type to continue")
             st.stop()
 
-        # 2. Fetch fields & exchanges dynamically
-        @st.cache_data(show_spinner=False, ttl=60*60)
-        def fetch_fields_for_market(market_code: str, instrument_type: str = 'stock') -> tuple:
-            """Fetch and cache fields for a market"""
-            INSTRUMENT_FIELD_URLS = {
-                'stock': 'stocks',
-                'dr': 'stocks',
-                'fund': 'stocks',
-                'crypto': 'crypto',
-                'forex': 'forex',
-                'futures': 'futures',
-                'bond': 'bonds',
-                'index': 'stocks',
-                'economic': 'economics2',
-                'cfd': 'cfd',
-                'coin': 'crypto',
-                'option': 'options'
-            }
+        # 2. Fields come from the field catalog bundled with the package (no network request)
+        @st.cache_resource(show_spinner=False)
+        def load_field_catalog():
+            """Return the field catalog bundled with the package, it's never fetched at runtime"""
+            from src.tradingview_screener import fields as field_catalog
 
-            url_suffix = INSTRUMENT_FIELD_URLS.get(instrument_type, 'stocks')
-            url = f"https://shner-elmo.github.io/TradingView-Screener/fields/{url_suffix}.html"
+            return field_catalog.get_catalog()
 
-            try:
-                with st.spinner(f"🔄 Fetching fields for {INSTRUMENT_TYPES[instrument_type]}..."):
-                    resp = requests.get(url, timeout=5)
-                    resp.raise_for_status()
-                    content = resp.text
-
-                    fields = []
-                    exchanges = set()
-                    # If the content is a plain text list (not HTML table)
-                    for line in content.splitlines():
-                        line = line.strip()
-                        if line.startswith("- "):
-                            field_name = line[2:]
-                            if field_name:
-                                fields.append({
-                                    "name": field_name,
-                                    "display": field_name,
-                                    "type": "string",  # Default type
-                                })
-                    if not fields:
-                        # fallback to old HTML parsing in case the format changes
-                        soup = BeautifulSoup(content, "html.parser")
-                        for row in soup.select("tr"):
-                            cols = row.find_all("td")
-                            if len(cols) >= 3:
-                                field_name = cols[0].text.strip()
-                                display_name = cols[1].text.strip()
-                                field_type = cols[2].text.strip()
-                                if not all([field_name, display_name, field_type]):
-                                    continue
-                                fields.append({
-                                    "name": field_name,
-                                    "display": display_name,
-                                    "type": field_type,
-                                })
-                                if len(cols) > 3:
-                                    exchanges.update([e.strip() for e in cols[3].text.split(",") if e.strip()])
-                    if not fields:
-                        basic_fields = [
-                            {"name": "name", "display": "Name", "type": "string"},
-                            {"name": "description", "display": "Description", "type": "string"},
-                            {"name": "type", "display": "Type", "type": "string"},
-                            {"name": "exchange", "display": "Exchange", "type": "string"},
-                            {"name": "close", "display": "Close", "type": "float"},
-                            {"name": "volume", "display": "Volume", "type": "float"},
-                        ]
-                        st.warning(f"⚠️ No fields found for {INSTRUMENT_TYPES[instrument_type]}, using basic fields")
-                        return basic_fields, []
-
-                    st.success(f"✅ Successfully loaded {len(fields)} fields for {INSTRUMENT_TYPES[instrument_type]}")
-                    return fields, sorted(list(exchanges))
-
-            except Exception as e:
-                st.error(f"❌ Error fetching fields: {str(e)}")
+        @st.cache_data(show_spinner=False)
+        def fetch_fields_for_market(market_code: str, instrument_type: str = 'stock') -> tuple:
+            """Return the fields and exchanges of the catalog for a market and instrument type"""
+            catalog = load_field_catalog()
+            catalog_fields = catalog.search(instrument_type=instrument_type)
+            # not every market of the app is in the catalog (e.g. the asset classes have their own
+            # markets), so only narrow by market when it actually matches some fields
+            in_market = [f for f in catalog_fields if market_code in f.markets]
+            fields = [
+                {"name": f.name, "display": f.display_name, "type": f.dtype}
+                for f in (in_market or catalog_fields)
+            ]
+            if not fields:
+                st.warning(f"⚠️ No fields found for {INSTRUMENT_TYPES[instrument_type]}, using basic fields")
                 return [
                     {"name": "name", "display": "Name", "type": "string"},
                     {"name": "description", "display": "Description", "type": "string"},
@@ -398,6 +343,8 @@ if selected_tab == "📝 Build Query":
                     {"name": "close", "display": "Close", "type": "float"},
                     {"name": "volume", "display": "Volume", "type": "float"},
                 ], []
+            exchanges = catalog.exchanges(market=market_code, instrument_type=instrument_type)
+            return fields, exchanges or catalog.exchanges(instrument_type=instrument_type)
 
         # Loading animation for field fetching
         with st.container():
@@ -472,7 +419,9 @@ if selected_tab == "📝 Build Query":
                     help="Select one or more exchanges to filter by"
                 )
             else:
-                exchange_options = HARDCODED_EXCHANGES.get(market_code.lower(), [])
+                exchange_options = HARDCODED_EXCHANGES.get(market_code.lower())
+                if exchange_options is None:  # the exchanges of the field docs
+                    exchange_options = ['All'] + sorted(all_exchanges) if all_exchanges else []
                 selected_exchanges = st.multiselect(
                     "🏢 Select Exchanges",
                     options=exchange_options,
@@ -587,7 +536,7 @@ if selected_tab == "📝 Build Query":
                     query_code += f".where({filter_conds})"
 
             if sort_by:
-                query_code += f".sort('{sort_by}', '{sort_order}')"
+                query_code += f".order_by('{sort_by}', ascending={sort_order == 'asc'})"
 
             query_code += f".offset({offset}).limit({row_limit})"
 
@@ -673,11 +622,25 @@ if selected_tab == "📝 Build Query":
                         q = q.where(eval(f"col('{f}') {o} {repr(v)}"))
 
                 if sort_by:
-                    q = q.sort(sort_by, sort_order)
+                    q = q.order_by(sort_by, ascending=sort_order == "asc")
 
                 q = q.offset(offset).limit(row_limit)
 
-                count, df = q.get_scanner_data()
+                # When the previous run already fetched every matching row, a new sort or row
+                # range is answered from those rows (partial sort, no request)
+                unsorted = {k: v for k, v in q.query.items() if k not in ("sort", "range")}
+                previous = st.session_state.get("complete_query_result")
+                if previous is not None and previous[0] == unsorted:
+                    _, count, full_df = previous
+                    start, end = q.query["range"]
+                    if "sort" in q.query:
+                        df = sort_data(full_df, q.query["sort"], start, end).reset_index(drop=True)
+                    else:
+                        df = full_df.iloc[start:end].reset_index(drop=True)
+                else:
+                    count, df = q.get_scanner_data()
+                    if offset == 0 and len(df) >= count:
+                        st.session_state.complete_query_result = (unsorted, count, df)
 
                 if 'type' in df.columns:
                     df = df[df['type'].isin(selected_types)]
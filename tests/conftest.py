@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from http import HTTPStatus
+from json import dumps
+from typing import Any, Callable, Optional, Union
+
+import requests
+
+from tradingview_screener.transport import Transport
+
+
+def make_response(
+    body: Union[dict, bytes],
+    status: int = 200,
+    headers: Optional[dict[str, str]] = None,
+    elapsed: float = 0.0,
+) -> requests.Response:
+    """A response of the scanner API, `body` is JSON-encoded unless it's bytes."""
+    r = requests.Response()
+    r.status_code = status
+    r.reason = HTTPStatus(status).phrase
+    r.headers.update(headers or {})
+    r._content = body if isinstance(body, bytes) else dumps(body).encode()
+    r.elapsed = datetime.timedelta(seconds=elapsed)
+    return r
+
+
+class FakeTransport(Transport):
+    """
+    Answer the scans without a network request, and record them in `calls` (`(url, json)`).
+
+    :param data: the rows of the responses (`{'s': ticker, 'd': [...]}`), only the ones in the
+        `range` of the scan are sent
+    :param respond: `respond(url, json)` returns the body of the response (or the whole response)
+        instead of `data`
+    :param statuses: the status codes of the first responses, the next ones are 200
+    :param headers: the headers of the responses that aren't 200 (like `Retry-After`)
+    :param delay: the time to wait before each response, in seconds
+    :param elapsed: the `elapsed` of the responses, in seconds
+    """
+
+    def __init__(
+        self,
+        data: Optional[list[dict[str, Any]]] = None,
+        respond: Optional[Callable[[str, Any], Union[dict, bytes, requests.Response]]] = None,
+        statuses: tuple[int, ...] = (),
+        headers: Optional[dict[str, str]] = None,
+        delay: float = 0.0,
+        elapsed: float = 0.0,
+    ) -> None:
+        self.data = data if data is not None else [{'s': 'NSE:TCS', 'd': [3500.5]}]
+        self.respond = respond or self._rows
+        self.statuses = list(statuses)
+        self.headers = headers
+        self.delay = delay
+        self.elapsed = elapsed
+        self.calls: list[tuple[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _rows(self, url: str, json: Any) -> dict:
+        start, end = json['range']
+        return {'totalCount': len(self.data), 'data': self.data[start:end]}
+
+    def post(self, url: str, json: Any, **kwargs) -> requests.Response:
+        with self._lock:
+            self.calls.append((url, json))
+            status = self.statuses.pop(0) if self.statuses else 200
+        if self.delay:
+            time.sleep(self.delay)
+        body = self.respond(url, json)
+        if isinstance(body, requests.Response):
+            return body
+        headers = self.headers if status != 200 else None
+        return make_response(body, status, headers, self.elapsed)
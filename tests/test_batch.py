@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pytest
+import requests
+
+from tradingview_screener import batch
+from tradingview_screener.query import Query
+
+from conftest import FakeTransport
+
+
+def flaky(statuses: list[int], retry_after: str | None = None) -> FakeTransport:
+    """Answer with the given status codes first, and then with a valid response."""
+    return FakeTransport(
+        respond=lambda url, json: {
+            'totalCount': 1,
+            'data': [{'s': 'NSE:TCS', 'd': [json['range']]}],
+        },
+        statuses=tuple(statuses),
+        headers=None if retry_after is None else {'Retry-After': retry_after},
+    )
+
+
+def test_run():
+    transport = flaky([429, 503])
+    queries = [Query().select('close').offset(i).set_transport(transport) for i in range(5)]
+    bucket = batch.TokenBucket(rate=1000)
+
+    results = batch.run(queries, max_concurrency=2, bucket=bucket, backoff=0.001)
+    assert [df['close'][0] for _, df in results] == [[i, 50] for i in range(5)]  # in order
+    assert len(transport.calls) == 7
+    assert bucket.rate <= 1000
+
+
+def test_run_errors():
+    # non-retryable errors are raised right away
+    transport = flaky([400])
+    with pytest.raises(requests.HTTPError):
+        batch.run(
+            [Query().select('close').set_transport(transport)], breaker=batch.CircuitBreaker()
+        )
+    assert len(transport.calls) == 1
+
+    transport = flaky([400])
+    breaker = batch.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    results = batch.run(
+        [
+            Query().select('close').set_transport(transport),
+            Query().select('close').set_transport(transport),
+        ],
+        max_concurrency=1,
+        breaker=breaker,
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], requests.HTTPError)
+    assert results[1][0] == 1  # pyright: ignore [reportIndexIssue]
+
+    # the circuit opens after too many consecutive failures
+    transport = flaky([500] * 10)
+    results = batch.run(
+        [Query().select('close').set_transport(transport)] * 3,
+        max_concurrency=1,
+        max_retries=1,
+        backoff=0.001,
+        breaker=breaker,
+        return_exceptions=True,
+    )
+    assert breaker.state == 'open'
+    assert isinstance(results[-1], batch.CircuitOpenError)
+
+
+def test_retry_after():
+    query = Query().select('close')
+    bucket = batch.TokenBucket(rate=1000)
+
+    transport = flaky([429], retry_after='0.01')
+    count, _ = batch.run([query.set_transport(transport)], bucket=bucket)[0]
+    assert count == 1 and len(transport.calls) == 2
+
+    # the server asks to wait longer than `max_backoff`: fail right away instead of sleeping
+    transport = flaky([429], retry_after='3600')
+    with pytest.raises(requests.HTTPError, match='429'):
+        batch.run([query.set_transport(transport)], bucket=bucket, max_backoff=1)
+    assert len(transport.calls) == 1
+
+
+def test_token_bucket():
+    bucket = batch.TokenBucket(rate=10, burst=2)
+    bucket.throttled()
+    assert bucket.rate == 5
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 10
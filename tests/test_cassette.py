@@ -0,0 +1,139 @@
+import gzip
+import time
+
+import pytest
+
+from tradingview_screener import Query, col
+from tradingview_screener.cassette import CassetteMiss, CassetteTransport, read_cassette
+from tradingview_screener.server import ScannerServer
+from tradingview_screener.transport import RedirectTransport
+
+from conftest import FakeTransport
+
+QUERY = (
+    Query()
+    .set_markets('india')
+    .select('name', 'close', 'EMA20')
+    .where(col('close') > col('EMA20'))
+    .limit(2000)
+)
+
+
+@pytest.fixture(scope='module')
+def server():
+    with ScannerServer(rows=3000, latency=0.05) as server:
+        yield server
+
+
+def test_record_and_replay(server, tmp_path):
+    path = tmp_path / 'scans.jsonl.gz'
+    with CassetteTransport(path, mode='record', transport=RedirectTransport(server.url)) as t:
+        count, recorded = QUERY.set_transport(t).get_scanner_data()
+        QUERY.limit(10).set_transport(t).get_scanner_data()
+    assert t.recorded == 2
+
+    entries = list(read_cassette(path))
+    assert [e['key'] for e in entries] == [QUERY.key, QUERY.limit(10).key]
+    assert 'headers' not in entries[0] and entries[0]['request']['range'] == [0, 2000]
+    assert entries[0]['duration'] >= 0.05
+    assert path.stat().st_size < len(entries[0]['body']) / 2  # compressed
+
+    # replayed without the server, as fast as possible
+    replay = CassetteTransport(path)
+    start = time.perf_counter()
+    replayed_count, replayed = QUERY.set_transport(replay).get_scanner_data()
+    assert time.perf_counter() - start < 0.05
+    assert replayed_count == count and replayed.equals(recorded)
+    assert replay.hits == 1
+
+    # with the recorded timing
+    start = time.perf_counter()
+    CassetteTransport(path, timing=1.0).post(QUERY.url, json=dict(QUERY.query))
+    assert time.perf_counter() - start >= entries[0]['duration']
+
+    with pytest.raises(CassetteMiss, match='no recorded response'):
+        QUERY.limit(11).set_transport(replay).get_scanner_data()
+
+
+def counting(start=0):
+    # every response has a different `totalCount`
+    transport = FakeTransport(
+        respond=lambda url, json: {'totalCount': start + len(transport.calls), 'data': []}
+    )
+    return transport
+
+
+def replay_counts(path, n=3):
+    replay = CassetteTransport(path)
+    return [replay.post(QUERY.url, json=dict(QUERY.query)).json()['totalCount'] for _ in range(n)]
+
+
+def test_recordings_are_replayed_in_order(tmp_path):
+    path = tmp_path / 'scans.jsonl'
+    t = CassetteTransport(path, mode='record', transport=counting())
+    for _ in range(2):
+        t.post(QUERY.url, json=dict(QUERY.query))
+    assert replay_counts(path) == [1, 2, 2]  # the last recording is repeated
+
+
+def test_record_again(tmp_path):
+    path = tmp_path / 'scans.jsonl.gz'
+    CassetteTransport(path, mode='record', transport=counting()).post(
+        QUERY.url, json=dict(QUERY.query)
+    )
+    assert replay_counts(path) == [1, 1, 1]
+
+    # a new recording replaces the old one, but not until something is recorded
+    t = CassetteTransport(path, mode='record', transport=counting(start=10))
+    assert replay_counts(path) == [1, 1, 1]
+    t.post(QUERY.url, json=dict(QUERY.query))
+    t.post(QUERY.url, json=dict(QUERY.limit(5).query))
+    assert replay_counts(path) == [11, 11, 11]
+    assert len(list(read_cassette(path))) == 2
+
+    # `auto` appends to the cassette
+    auto = CassetteTransport(path, mode='auto', transport=counting(start=20))
+    auto.post(QUERY.url, json=dict(QUERY.limit(7).query))
+    assert len(list(read_cassette(path))) == 3
+
+
+def test_auto_mode(server, tmp_path):
+    path = tmp_path / 'scans.jsonl.gz'
+    t = CassetteTransport(path, mode='auto', transport=RedirectTransport(server.url))
+    QUERY.set_transport(t).get_scanner_data()
+    QUERY.set_transport(t).get_scanner_data()
+    assert (t.recorded, t.hits) == (1, 1)
+    assert CassetteTransport(path, mode='auto').size == 1
+
+
+def test_truncated_cassette(server, tmp_path):
+    path = tmp_path / 'scans.jsonl.gz'
+    t = CassetteTransport(path, mode='record', transport=RedirectTransport(server.url))
+    t.post(QUERY.url, json=dict(QUERY.query))
+    t.post(QUERY.url, json=dict(QUERY.limit(5).query))
+    path.write_bytes(path.read_bytes()[:-20])  # the recording was killed
+
+    assert len(list(read_cassette(path))) == 1
+    with gzip.open(path, 'rb') as f, pytest.raises(EOFError):
+        f.read()
+
+
+def test_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CassetteTransport(tmp_path / 'missing.jsonl')
+    with pytest.raises(ValueError, match='unknown mode'):
+        CassetteTransport(tmp_path / 'scans.jsonl', mode='rewind')
+
+
+def test_environment(server, tmp_path, monkeypatch):
+    from tradingview_screener import transport
+
+    path = tmp_path / 'scans.jsonl.gz'
+    monkeypatch.setattr(transport, '_default_transport', None)
+    monkeypatch.setenv('SCREENER_SCANNER_URL', server.url)
+    monkeypatch.setenv('SCREENER_CASSETTE', str(path))
+    monkeypatch.setenv('SCREENER_CASSETTE_MODE', 'record')
+    default = transport.get_transport()
+    assert isinstance(default, CassetteTransport) and default.mode == 'record'
+    QUERY.get_scanner_data()
+    assert len(list(read_cassette(path))) == 1
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener import Query, col
+from tradingview_screener.column import Expression
+from tradingview_screener.compute import _NumExpr, _inline, compute, source_columns, split_filters
+from tradingview_screener.evaluate import filter_data
+from tradingview_screener.universe import UniverseService
+
+from test_universe import market_transport
+
+
+DATA = {
+    'close': np.array([110.0, 90.0, None], dtype=object),
+    'EMA50': np.array([100.0, 100.0, 50.0]),
+    'volume': np.array([10, 20, 30]),
+}
+COMPUTED = {
+    'above': ((col('close') - col('EMA50')) / col('EMA50') * 100).round(2),
+    'distance': abs(col('above')),
+    'turnover': col('close') * col('volume') / 1e3,
+}
+
+
+def test_expression():
+    expr = (col('close') - col('EMA50')) / col('EMA50') * 100
+    assert isinstance(expr, Expression)
+    assert expr.columns == ['close', 'EMA50']
+    assert repr(expr) == '< Expression(((close - EMA50) / EMA50) * 100) >'
+    assert repr(-((2 / col('x')) ** 2)) == '< Expression(-((2 / x) ** 2)) >'
+    # the comparisons still build filters
+    assert (col('close') > col('EMA50')) == {
+        'left': 'close',
+        'operation': 'greater',
+        'right': 'EMA50',
+    }
+    with pytest.raises(TypeError):
+        col('close') + 'EMA50'
+
+
+def test_compute():
+    assert source_columns(COMPUTED) == ['close', 'EMA50', 'volume']
+    out = compute(DATA, COMPUTED, use_numexpr=False)
+    assert list(out) == ['above', 'distance', 'turnover']
+    np.testing.assert_array_equal(out['above'], [10.0, -10.0, np.nan])
+    np.testing.assert_array_equal(out['distance'], [10.0, 10.0, np.nan])
+    np.testing.assert_array_equal(out['turnover'], [1.1, 1.8, np.nan])
+    # a DataFrame gives the same result
+    df = pd.DataFrame(DATA)
+    np.testing.assert_array_equal(compute(df, COMPUTED, use_numexpr=False)['above'], out['above'])
+
+    with pytest.raises(KeyError, match='missing'):
+        compute(DATA, {'x': col('RSI') * 2})
+    with pytest.raises(ValueError, match='depends on itself'):
+        compute(DATA, {'a': col('b') + 1, 'b': col('a') * 2})
+
+
+def test_numexpr_compilation():
+    sources = {k: np.asarray(v, dtype=np.float64) for k, v in DATA.items()}
+    sources['close|1W'] = sources['close']
+    compiler = _NumExpr(None, sources)
+    expr = _inline(COMPUTED['distance'], COMPUTED)
+    # `round()` isn't a numexpr function, so it becomes a variable
+    compiler.numexpr = type(
+        'numexpr', (), {'evaluate': lambda s, local_dict: eval(s, {}, local_dict)}
+    )
+    assert compiler.compile(expr) == 'abs(v2)'
+    np.testing.assert_array_equal(compiler.variables['v2'], [10.0, -10.0, np.nan])
+    assert compiler.compile(col('close|1W') * 2) == '(v3 * 2.0)'
+
+
+def test_split_filters():
+    q = Query().select('name').with_columns(above=col('close') / col('EMA50'))
+    q = q.where(col('above') > 1, col('exchange') == 'NSE', col('RSI') < col('above'))
+    remote, local = split_filters(q.query, q.computed)
+    assert remote['filter'] == [{'left': 'exchange', 'operation': 'equal', 'right': 'NSE'}]
+    assert [e['left'] for e in local['filter']] == ['above', 'RSI']
+    # the columns of the local filters are fetched
+    assert remote['columns'] == ['name', 'close', 'EMA50', 'RSI']
+    assert q.query['columns'] == ['name', 'close', 'EMA50']
+
+
+def test_with_columns():
+    q = Query().select('name', 'close').with_columns(above=col('close') / col('EMA50'))
+    assert q.query['columns'] == ['name', 'close', 'EMA50']
+    assert q.computed == {'above': q.computed['above']}
+    # the source columns are kept by `select()`
+    assert q.select('name').query['columns'] == ['name', 'close', 'EMA50']
+    assert q != Query().select('name', 'close', 'EMA50')
+    with pytest.raises(TypeError, match='expression'):
+        Query().with_columns(x=2)
+    with pytest.raises(ValueError, match='cannot sort'):
+        q.order_by('above')._split()
+
+
+def test_get_scanner_data():
+    transport = market_transport()
+    q = (
+        Query()
+        .set_transport(transport)
+        .select('name')
+        .with_columns(traded=col('Value.Traded') / 1e9, double=col('traded') * 2)
+        .where(col('double') > 12, col('exchange') == 'NSE')
+    )
+    count, df = q.get_scanner_data()
+    assert count == 4  # the count of the API
+    assert df.to_dict('records') == [
+        {'ticker': 'NSE:TCS', 'name': 'TCS', 'Value.Traded': 9e9, 'traded': 9.0, 'double': 18.0},
+        {'ticker': 'NSE:INFY', 'name': 'INFY', 'Value.Traded': 8e9, 'traded': 8.0, 'double': 16.0},
+    ]
+    _, payload = transport.calls[0]
+    assert payload['filter'] == [{'left': 'exchange', 'operation': 'equal', 'right': 'NSE'}]
+    assert payload['columns'] == ['name', 'Value.Traded']
+
+    count, columns = q.get_scanner_data_numpy()
+    assert list(columns) == ['ticker', 'name', 'Value.Traded', 'traded', 'double']
+    np.testing.assert_array_equal(columns['double'], [18.0, 16.0])
+
+
+def test_evaluate_computed_columns():
+    df = pd.DataFrame(DATA)
+    q = Query().with_columns(above=COMPUTED['above']).where(col('above') > 0)
+    assert filter_data(df, q).index.tolist() == [0]
+
+
+def test_universe_scan():
+    service = UniverseService(base_query=Query().set_transport(market_transport()))
+    q = (
+        Query()
+        .set_markets('india')
+        .select('name')
+        .with_columns(move=col('close') * col('change') / 100)
+        .where(col('move') > 0)
+        .order_by('move', ascending=False)
+        .limit(2)
+    )
+    count, df = service.scan(q)
+    assert count == 3
+    assert df['ticker'].tolist() == ['BSE:TCS', 'NSE:TCS']
+    assert df.columns.tolist() == ['ticker', 'name', 'close', 'change', 'move']
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener.delta import diff
+
+
+@pytest.fixture
+def old() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            'ticker': ['NSE:TCS', 'NSE:INFY', 'NSE:IRFC', 'NSE:SBIN'],
+            'close': [3500.5, 1500.0, 150.2, np.nan],
+            'volume': [1000, 2000, 3000, 4000],
+            'sector': ['Technology', 'Technology', 'Finance', None],
+        }
+    )
+
+
+def test_diff(old: pd.DataFrame):
+    new = pd.DataFrame(
+        {
+            'ticker': ['NSE:IRFC', 'NSE:TCS', 'NSE:SBIN', 'NSE:ITC'],
+            'close': [150.21, 3510.0, np.nan, 410.0],
+            'volume': [3000, 1000, 4500, 100],
+            'sector': ['Finance', 'Technology', 'Finance', 'Consumer'],
+        }
+    )
+    d = diff(old, new, tolerances={'close': 0.05})
+    assert d.added['ticker'].tolist() == ['NSE:ITC']
+    assert d.removed['ticker'].tolist() == ['NSE:INFY']
+    assert d.changed['ticker'].tolist() == ['NSE:TCS', 'NSE:SBIN']  # IRFC is within tolerance
+    assert d.cells.to_dict('records') == [
+        {'ticker': 'NSE:TCS', 'column': 'close', 'old': 3500.5, 'new': 3510.0},
+        {'ticker': 'NSE:SBIN', 'column': 'volume', 'old': 4000, 'new': 4500},
+        {'ticker': 'NSE:SBIN', 'column': 'sector', 'old': None, 'new': 'Finance'},
+    ]
+    assert d.to_dict()['removed'] == ['NSE:INFY']
+
+    # applying the delta to the old result gives the new one (without the tolerated changes)
+    result = d.apply(old).set_index('ticker').sort_index()
+    expected = new.set_index('ticker').sort_index()
+    expected.loc['NSE:IRFC', 'close'] = 150.2
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_no_changes(old: pd.DataFrame):
+    d = diff(old, old.iloc[::-1].copy())
+    assert not d and d.empty
+    assert d.cells.empty
+
+    with pytest.raises(ValueError):
+        diff(old, old[['ticker', 'close']])
+    with pytest.raises(ValueError):
+        diff(old, pd.concat([old, old]))
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener import And, Or, Query, col
+from tradingview_screener.evaluate import evaluate, filter_data, query_mask
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    now = int(time.time())
+    return pd.DataFrame(
+        {
+            'ticker': ['NASDAQ:AAPL', 'NYSE:KO', 'NYSE:SPY', 'OTC:XYZ'],
+            'name': ['AAPL', 'KO', 'SPY', 'XYZ'],
+            'description': ['Apple Inc.', 'Coca-Cola Company', 'SPDR S&P 500', None],
+            'close': [200.0, 60.0, 500.0, np.nan],
+            'close[1]': [190.0, 61.0, 505.0, 1.0],
+            'VWAP': [190.0, 61.0, 480.0, 1.0],
+            'VWAP[1]': [195.0, 60.0, 490.0, 1.0],
+            'volume': [50_000_000, 10_000_000, 80_000_000, 100],
+            'exchange': ['NASDAQ', 'NYSE', 'NYSE', 'OTC'],
+            'type': ['stock', 'stock', 'fund', 'stock'],
+            'typespecs': [['common'], ['common'], ['etf'], None],
+            'earnings_release_next_date': [now, now + 40 * 86400, None, now - 400 * 86400],
+        }
+    )
+
+
+def names(df: pd.DataFrame, expression) -> list[str]:
+    return df['name'][evaluate(expression, df)].tolist()
+
+
+def test_comparisons(df: pd.DataFrame):
+    assert names(df, col('close') > 100) == ['AAPL', 'SPY']
+    assert names(df, col('close') >= 200) == ['AAPL', 'SPY']
+    assert names(df, col('close') < 100) == ['KO']  # nulls never match
+    assert names(df, col('close') <= 60) == ['KO']
+    assert names(df, col('close') != 60) == ['AAPL', 'SPY']
+    assert names(df, col('exchange') == 'NYSE') == ['KO', 'SPY']
+    assert names(df, col('exchange') != 'OTC') == ['AAPL', 'KO', 'SPY']
+
+    # a string on the right side is a column if the data has it
+    assert names(df, col('close') > 'VWAP') == ['AAPL', 'SPY']
+    assert names(df, col('close') > col('VWAP')) == ['AAPL', 'SPY']
+
+
+def test_ranges(df: pd.DataFrame):
+    assert names(df, col('close').between(60, 200)) == ['AAPL', 'KO']
+    assert names(df, col('close').not_between(60, 200)) == ['SPY']
+    assert names(df, col('close').between('VWAP', 1000)) == ['AAPL', 'SPY']
+    assert names(df, col('exchange').isin(['NYSE', 'OTC'])) == ['KO', 'SPY', 'XYZ']
+    assert names(df, col('exchange').not_in(['NYSE', 'OTC'])) == ['AAPL']
+    assert names(df, col('volume').isin([100, 10_000_000, 7])) == ['KO', 'XYZ']
+
+
+def test_pct(df: pd.DataFrame):
+    assert names(df, col('close').above_pct('VWAP', 1.03)) == ['AAPL', 'SPY']
+    assert names(df, col('close').below_pct('VWAP', 1)) == ['KO']
+    assert names(df, col('close').between_pct('VWAP', 1.03, 1.05)) == ['SPY']
+    assert names(df, col('close').not_between_pct('VWAP', 1.03, 1.05)) == ['AAPL', 'KO']
+
+    for expr in (
+        col('close').above_pct('EMA20', 1.03),
+        col('close').below_pct('EMA20', 1),
+        col('close').between_pct('EMA20', 1.03, 1.05),
+        col('close').not_between_pct('EMA20', 1.03, 1.05),
+    ):
+        with pytest.raises(KeyError, match="'EMA20' is missing"):
+            evaluate(expr, df)
+
+
+def test_strings_and_sets(df: pd.DataFrame):
+    assert names(df, col('description').like('COLA')) == ['KO']
+    assert names(df, col('description').not_like('cola')) == ['AAPL', 'SPY']
+    assert names(df, col('description').empty()) == ['XYZ']
+    assert names(df, col('close').not_empty()) == ['AAPL', 'KO', 'SPY']
+    assert names(df, col('typespecs').has(['common', 'preferred'])) == ['AAPL', 'KO']
+    assert names(df, col('typespecs').has('etf')) == ['SPY']
+    assert names(df, col('typespecs').has_none_of(['etf'])) == ['AAPL', 'KO']
+
+
+def test_crosses_and_dates(df: pd.DataFrame):
+    assert names(df, col('close').crosses_above('VWAP')) == ['AAPL']
+    assert names(df, col('close').crosses_below('VWAP')) == ['KO']
+    assert names(df, col('close').crosses('VWAP')) == ['AAPL', 'KO']
+
+    assert names(df, col('earnings_release_next_date').in_day_range(0, 0)) == ['AAPL']
+    assert names(df, col('earnings_release_next_date').in_day_range(-500, 0)) == ['AAPL', 'XYZ']
+    assert names(df, col('earnings_release_next_date').in_week_range(0, 0)) == ['AAPL']
+    assert names(df, col('earnings_release_next_date').in_month_range(1, 2)) == ['KO']
+
+    with pytest.raises(KeyError, match='volume\\[1\\]'):
+        evaluate(col('volume').crosses(10), df)
+
+
+def test_where2_and_query(df: pd.DataFrame):
+    tree = Or(
+        And(col('type') == 'stock', col('typespecs').has(['common'])),
+        col('close') > 400,
+    )
+    assert names(df, tree) == ['AAPL', 'KO', 'SPY']
+
+    q = Query().where(col('exchange') == 'NYSE').where2(tree)
+    assert query_mask(q, df).tolist() == [False, True, True, False]
+    assert filter_data(df, q)['name'].tolist() == ['KO', 'SPY']
+
+    # the same filters work on the NumPy columns
+    arrays = {name: df[name].to_numpy() for name in df.columns}
+    assert filter_data(arrays, q)['name'].tolist() == ['KO', 'SPY']
+
+
+def test_compact_data(df: pd.DataFrame):
+    from tradingview_screener.frame import compact
+
+    small = compact(df, rtol=1e-6)
+    assert small['close'].dtype == np.float32
+    # the same results as on the original data, `float32` columns are compared at their precision
+    for expr in (
+        col('close') == df['close'].iloc[0],
+        col('close').isin(df['close'].tolist()[:2]),
+        col('close') > 'VWAP',
+        col('exchange') == 'NYSE',
+    ):
+        assert names(small, expr) == names(df, expr)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import pytest
+import requests
+
+from tradingview_screener import Query, batch, col, fanout
+from tradingview_screener.transport import Transport
+
+from conftest import FakeTransport, make_response
+
+
+MARKETS = {
+    'america': {'NASDAQ:AAPL': 3000.0, 'NYSE:KO': 270.0, 'AMEX:SPY': None},
+    'india': {'NSE:RELIANCE': 230.0, 'NSE:TCS': 150.0},
+    'uk': {'LSE:SHEL': 200.0},
+}
+
+
+def markets_transport(failing: tuple[str, ...] = ()) -> FakeTransport:
+    """Answers every market from `MARKETS` (sorted by `market_cap_basic`), fails on `failing`."""
+
+    def respond(url, json):
+        market = json['markets'][0] if len(json['markets']) == 1 else None
+        if market in failing:
+            return make_response(b'{}', status=400)
+
+        rows = [
+            (ticker, cap)
+            for m in json['markets']
+            for ticker, cap in MARKETS[m].items()
+            if cap is None or cap > 100
+        ]
+        rows.sort(key=lambda row: (row[1] is None, -(row[1] or 0)))
+        start, end = json['range']
+        data = [
+            {
+                's': t,
+                'd': [
+                    {'name': t.split(':')[1], 'market_cap_basic': cap}[c] for c in json['columns']
+                ],
+            }
+            for t, cap in rows[start:end]
+        ]
+        return {'totalCount': len(rows), 'data': data}
+
+    return FakeTransport(respond=respond)
+
+
+def make_query(transport: Transport) -> Query:
+    return (
+        Query()
+        .set_markets('america', 'india', 'uk')
+        .select('name')
+        .where(col('market_cap_basic') > 100)
+        .order_by('market_cap_basic', ascending=False)
+        .set_transport(transport)
+    )
+
+
+def test_plan():
+    q = make_query(markets_transport())
+    assert fanout.plan(q) == [q]  # a small limit is faster in a single request
+    assert fanout.plan(q.set_markets('india').limit(5000)) == [q.set_markets('india').limit(5000)]
+
+    queries = fanout.plan(q.offset(10).limit(2000))
+    assert [p.url.split('/')[-2] for p in queries] == ['america', 'india', 'uk']
+    assert all(p.query['range'] == [0, 2000] for p in queries)
+    assert all(p.query['columns'] == ['name', 'market_cap_basic'] for p in queries)
+
+
+def test_scan():
+    transport = markets_transport()
+    q = make_query(transport)
+    expected_count, expected = q.get_scanner_data()  # through `/global/scan`
+    assert transport.calls[-1][0].endswith('/global/scan')
+
+    breaker = batch.CircuitBreaker()
+    result = fanout.scan(q.offset(1).limit(3), min_rows=0, breaker=breaker)
+    assert len(transport.calls) == 4
+    assert result.count == expected_count == 6
+    assert result.df.to_dict('records') == expected.iloc[1:3].reset_index(drop=True).to_dict(
+        'records'
+    )
+    assert result.df.columns.tolist() == ['ticker', 'name']  # without the sort column
+    count, df = result  # unpacks like the result of `get_scanner_data()`
+    assert count == 6 and df is result.df
+    assert not result.partial
+
+    # the failed markets are reported, and the others are still merged
+    transport = markets_transport(failing=('india',))
+    result = fanout.scan(make_query(transport), min_rows=0, breaker=breaker)
+    assert list(result.failed) == ['india']
+    assert isinstance(result.failed['india'], requests.HTTPError)
+    assert result.df['ticker'].tolist() == ['NASDAQ:AAPL', 'NYSE:KO', 'LSE:SHEL', 'AMEX:SPY']
+
+    with pytest.raises(requests.HTTPError):
+        fanout.scan(
+            make_query(markets_transport(failing=('america', 'india', 'uk'))),
+            min_rows=0,
+            breaker=breaker,
+        )
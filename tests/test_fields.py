@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+from tradingview_screener import fields
+from tradingview_screener.fields import FieldCatalog, _build_index, _parse_docs, get_catalog
+from tradingview_screener.frame import to_numpy_columns
+
+from conftest import make_response
+
+
+def test_bundled_catalog():
+    catalog = get_catalog()
+    assert catalog is get_catalog()  # loaded once
+    assert len(catalog) > 100
+
+    field = catalog['market_cap_basic']
+    assert field.display_name == 'Market Capitalization'
+    assert field.numeric
+    assert 'stock' in field.instrument_types and 'india' in field.markets
+    assert 'crypto' not in field.markets
+
+    # the timeframe and history suffixes are ignored
+    assert catalog['close|1W'].name == 'close'
+    assert catalog.get('RSI[1]').name == 'RSI'
+    assert catalog.get('not_a_field') is None and 'not_a_field' not in catalog
+    with pytest.raises(KeyError):
+        catalog['not_a_field']
+
+    names = {f.name for f in catalog.search(market='india', instrument_type='stock')}
+    assert {'close', 'sector', 'price_earnings_ttm'} <= names
+    assert 'strike' not in names
+    assert catalog.numeric('sector') is False and catalog.numeric('unknown') is None
+
+    # the bundled catalog is the seed, with the exchanges of the screens
+    assert catalog.is_seed
+    assert {'NSE', 'BSE', 'NYSE'} <= set(catalog.exchanges(market='india'))
+    assert 'BINANCE' in catalog.exchanges(instrument_type='crypto')
+    assert 'NSE' not in catalog.exchanges(instrument_type='crypto')
+
+
+def test_build_index(tmp_path, monkeypatch):
+    index = _build_index(
+        {
+            'stocks': [('close', 'Price', 'price'), ('sector', 'Sector', 'text')],
+            'crypto': [('close', 'Price', 'price'), ('base_currency', 'Base Currency', 'text')],
+        },
+        generated='2999-01-01',
+        source='test',
+    )
+    assert index['dtypes'] == ['price', 'text']
+    assert index['fields'][0] == ['close', 'Price', 0, 0b11]  # in both screens
+
+    catalog = FieldCatalog(index)
+    assert catalog['close'].instrument_types[-1] == 'crypto'
+    assert [f.name for f in catalog.search(market='crypto')] == ['close', 'base_currency']
+    assert not catalog.is_seed and catalog.exchanges() == []
+
+    # a refreshed catalog that is newer than the bundled one takes precedence
+    monkeypatch.setenv('TRADINGVIEW_SCREENER_CACHE_DIR', str(tmp_path))
+    (tmp_path / 'fields.json').write_text(json.dumps(index))
+    monkeypatch.setattr(fields, '_catalog', None)
+    assert get_catalog().source == 'test'
+    monkeypatch.setattr(fields, '_catalog', None)  # don't leak it into the other tests
+
+    with pytest.raises(ValueError):
+        FieldCatalog({**index, 'version': 0})
+
+
+def test_parse_docs():
+    # the plain list format of the docs, the types are unknown
+    rows, exchanges = _parse_docs('Fields\n\n- close\n- EMA20\n-\n- \n  - volume\n')
+    assert [name for name, _, _ in rows] == ['close', 'EMA20', 'volume']
+    assert {dtype for _, _, dtype in rows} == {'unknown'}
+    assert exchanges == []
+
+    catalog = FieldCatalog(_build_index({'stocks': rows}, '2999-01-01', 'test'))
+    assert catalog.numeric('close') is None  # the values of the field are sniffed
+
+    pytest.importorskip('bs4')
+    html = (
+        '<table><tr><th>Name</th></tr>'
+        '<tr><td>close</td><td>Price</td><td>price</td><td>NSE, BSE</td></tr>'
+        '<tr><td>sector</td><td>Sector</td><td>text</td><td>NYSE</td></tr></table>'
+    )
+    rows, exchanges = _parse_docs(html)
+    assert rows == [('close', 'Price', 'price'), ('sector', 'Sector', 'text')]
+    assert exchanges == ['BSE', 'NSE', 'NYSE']
+
+
+def test_refresh(tmp_path, monkeypatch):
+    import requests
+
+    def get(url, timeout):
+        return make_response(b'- close\n- brand_new_field\n' if 'stocks' in url else b'')
+
+    monkeypatch.setattr(requests, 'get', get)
+    monkeypatch.setattr(fields, '_catalog', None)  # restored after the test
+    catalog = fields.refresh(tmp_path / 'fields.json')
+    assert not catalog.is_seed and len(catalog) == 2
+    # the display names and the types of the list format are taken from the seed
+    assert catalog['close'].dtype == 'price' and catalog['close'].display_name == 'Price'
+    assert catalog['brand_new_field'].numeric is None
+    assert 'NSE' in catalog.exchanges(market='india')
+
+
+def test_frame_uses_the_catalog_types():
+    # BSE symbols have numeric names, but `name` is a text field so they must stay as they are
+    json_obj = {
+        'totalCount': 2,
+        'data': [
+            {'s': 'BSE:500325', 'd': [500325, 2900]},
+            {'s': 'BSE:532540', 'd': [532540, 3500]},
+        ],
+    }
+    dct = to_numpy_columns(json_obj, ['name', 'close'])
+    assert dct['name'].dtype == object and dct['name'].tolist() == [500325, 532540]
+    assert dct['close'].dtype == np.int64
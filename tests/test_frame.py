@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener.frame import to_dataframe, to_numpy_columns
+
+
+JSON_OBJ = {
+    'totalCount': 3,
+    'data': [
+        {'s': 'NSE:TCS', 'd': [3500.5, 1200, 'Technology Services', True, ['common']]},
+        {'s': 'NSE:INFY', 'd': [1500, 900, 'Technology Services', False, ['common']]},
+        {'s': 'NSE:NIFTYBEES', 'd': [None, 50000, None, None, ['etf']]},
+    ],
+}
+COLUMNS = ['close', 'volume', 'sector', 'is_primary', 'typespecs']
+
+
+def test_to_numpy_columns():
+    dct = to_numpy_columns(JSON_OBJ, COLUMNS)
+
+    assert list(dct) == ['ticker', *COLUMNS]
+    assert dct['ticker'].tolist() == ['NSE:TCS', 'NSE:INFY', 'NSE:NIFTYBEES']
+    assert dct['close'].dtype == np.float64
+    assert np.isnan(dct['close'][2])
+    assert dct['volume'].dtype == np.int64
+    assert dct['sector'].dtype == object
+    assert dct['is_primary'].tolist() == [True, False, None]  # booleans aren't cast to numbers
+    assert dct['typespecs'].tolist() == [['common'], ['common'], ['etf']]  # not a 2D array
+
+
+def test_to_dataframe():
+    df = to_dataframe(JSON_OBJ, COLUMNS)
+    expected = pd.DataFrame(
+        data=([row['s'], *row['d']] for row in JSON_OBJ['data']), columns=['ticker', *COLUMNS]
+    )
+    pd.testing.assert_frame_equal(df, expected)
+
+    df = to_dataframe(JSON_OBJ, COLUMNS, categorical=True)
+    assert isinstance(df['sector'].dtype, pd.CategoricalDtype)
+    assert df['sector'].cat.categories.tolist() == ['Technology Services']
+
+    # empty responses and duplicated columns
+    df = to_dataframe({'totalCount': 0, 'data': []}, ['close', 'close'])
+    assert df.columns.tolist() == ['ticker', 'close', 'close']
+    assert df.empty
+
+
+def test_decode():
+    from json import dumps
+
+    from tradingview_screener.decode import BACKEND, decode, decode_typed, unpack
+
+    content = dumps(JSON_OBJ).encode()
+    assert decode(content) == JSON_OBJ
+    # `orjson` decodes plain dictionaries the fastest
+    if importlib.util.find_spec('orjson') is not None:
+        assert BACKEND == 'orjson'
+
+    # `decode_typed()` returns a struct if msgspec is installed, but it should be interchangeable
+    json_obj = decode_typed(content)
+    assert unpack(json_obj)[0] == 3
+    pd.testing.assert_frame_equal(to_dataframe(json_obj, COLUMNS), to_dataframe(JSON_OBJ, COLUMNS))
+
+    # the scanner sends a `null` data on errors and on empty results
+    for json_obj in (decode(b'{"totalCount":0,"data":null}'), decode_typed(b'{"totalCount":0}')):
+        assert unpack(json_obj) == (0, [])
+        assert to_dataframe(json_obj, COLUMNS).empty
+    assert unpack(decode_typed(b'{"totalCount":0,"data":null}')) == (0, [])
+
+
+def test_compact():
+    from tradingview_screener.frame import compact, memory_usage
+
+    df = pd.DataFrame(
+        {
+            'ticker': [f'NSE:S{i}' for i in range(6)],
+            'sector': ['Finance', 'Finance', 'Energy', None, 'Finance', 'Energy'],
+            'close': [150.2, 3500.5, 10.0, 1.1, 2.0, 3.0],
+            'volume': [1000.0, np.nan, 2e6, 5.0, 6.0, 7.0],
+            'typespecs': [['common']] * 6,
+        }
+    )
+    df.attrs['created'] = 1.0
+    small = compact(df, read_only=True)
+    assert small.attrs == {'created': 1.0}
+    assert isinstance(small['sector'].dtype, pd.CategoricalDtype)
+    assert small['ticker'].dtype == object  # unique values aren't worth encoding
+    assert small['volume'].dtype == np.float32  # exact in `float32`
+    assert small['close'].dtype == np.float64  # 150.2 isn't
+    assert memory_usage(small) < memory_usage(df)
+    assert small['sector'].tolist()[:3] == ['Finance', 'Finance', 'Energy']
+    pd.testing.assert_frame_equal(
+        small.drop(columns='sector'), df.drop(columns='sector'), check_dtype=False
+    )
+
+    # the values can't be modified by mistake (the snapshots are shared between sessions)
+    with pytest.raises(ValueError):
+        small.loc[0, 'close'] = 1
+    assert small['close'].iloc[0] == 150.2
+
+    assert compact(df, rtol=1e-6)['close'].dtype == np.float32
+    assert compact(df, categorical=['ticker'])['sector'].dtype == object
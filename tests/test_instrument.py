@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from json import dumps, loads
+
+import pytest
+import requests
+
+from tradingview_screener import Query, instrument
+from tradingview_screener.cache import ResponseCache
+from tradingview_screener.transport import ThreadedAsyncTransport, Transport
+
+from conftest import FakeTransport
+
+DATA = {
+    'totalCount': 2,
+    'data': [
+        {'s': 'NSE:TCS', 'd': ['TCS', 4120.5]},
+        {'s': 'NSE:INFY', 'd': ['INFY', 1890.0]},
+    ],
+}
+
+
+def fake_transport() -> FakeTransport:
+    return FakeTransport(respond=lambda url, json: DATA, elapsed=0.003)
+
+
+@pytest.fixture
+def timings():
+    collected = []
+    instrument.add_hook(collected.append)
+    yield collected
+    instrument.remove_hook(collected.append)
+
+
+def query(transport=None):
+    return Query().select('name', 'close').set_transport(transport or fake_transport())
+
+
+def test_get_scanner_data(timings):
+    count, _ = query().get_scanner_data()
+    assert count == 2
+    [t] = timings
+    assert t.method == 'get_scanner_data'
+    assert t.url == 'https://scanner.tradingview.com/america/scan'
+    assert t.cache == 'off'
+    assert (t.rows, t.columns) == (2, 3)
+    assert t.bytes == len(dumps(DATA))
+    assert t.ttfb == pytest.approx(0.003)
+    assert t.connect is None and t.error is None
+    assert all(getattr(t, name) >= 0 for name in ('request', 'download', 'decode', 'frame'))
+    assert t.total >= t.request
+
+
+def test_other_methods(timings):
+    q = query()
+    assert q.get_scanner_data_raw() == DATA
+    q.get_scanner_data_numpy()
+    asyncio.run(q.set_transport(ThreadedAsyncTransport(fake_transport())).get_scanner_data_async())
+    asyncio.run(
+        q.set_transport(ThreadedAsyncTransport(fake_transport())).get_scanner_data_raw_async()
+    )
+    assert [t.method for t in timings] == [
+        'get_scanner_data_raw',
+        'get_scanner_data_numpy',
+        'get_scanner_data_async',
+        'get_scanner_data_raw_async',
+    ]
+    assert all(t.rows == 2 and t.bytes and t.decode is not None for t in timings)
+    assert timings[1].columns == 3 and timings[0].columns is None
+
+
+def test_cache_outcome(timings):
+    transport = fake_transport()
+    q = query(transport).cached(ttl=60, cache=ResponseCache(path=None))
+    q.get_scanner_data()
+    q.get_scanner_data()
+    assert [t.cache for t in timings] == ['miss', 'hit']
+    assert len(transport.calls) == 1
+    # no network phases on a hit
+    assert timings[1].request is None and timings[1].bytes is None
+
+
+def test_errors_and_failing_hooks(caplog):
+    class Failing(Transport):
+        def post(self, url, json, **kwargs):
+            raise requests.ConnectionError('down')
+
+    def broken(timings):
+        raise RuntimeError('broken hook')
+
+    collected = []
+    instrument.add_hook(broken)
+    instrument.add_hook(collected.append)
+    try:
+        with pytest.raises(requests.ConnectionError):
+            query(Failing()).get_scanner_data()
+        with caplog.at_level(logging.ERROR, 'tradingview_screener.instrument'):
+            query().get_scanner_data()  # a broken hook doesn't break the scan
+    finally:
+        instrument.remove_hook(broken)
+        instrument.remove_hook(collected.append)
+    assert [t.error for t in collected] == ['ConnectionError', None]
+    assert 'broken hook' in caplog.text
+
+
+def test_no_hooks():
+    query().get_scanner_data()  # nothing is collected
+    with instrument.scan(query(), 'get_scanner_data') as timings:
+        assert timings is None
+
+
+def test_registry():
+    registry = instrument.MetricsRegistry(buckets=(0.1, 1.0))
+    instrument.enable_metrics(registry)
+    instrument.enable_metrics(registry)  # installed only once
+    try:
+        q = query().cached(ttl=60, cache=ResponseCache(path=None))
+        q.get_scanner_data()
+        q.get_scanner_data()
+    finally:
+        instrument.remove_hook(registry.observe)
+    with registry.timer('postprocess', page='heatmap'):
+        pass
+
+    text = registry.to_prometheus()
+    assert (
+        'tradingview_screener_scans_total{cache="hit",method="get_scanner_data",status="ok"} 1'
+    ) in text
+    assert f'tradingview_screener_response_bytes_total {len(dumps(DATA))}' in text
+    assert 'tradingview_screener_rows_total 4' in text
+    assert text.count('# TYPE tradingview_screener_phase_seconds histogram') == 1
+    assert 'tradingview_screener_phase_seconds_count{phase="total"} 2' in text
+    assert 'tradingview_screener_phase_seconds_bucket{phase="total",le="+Inf"} 2' in text
+    assert 'tradingview_screener_phase_seconds_count{page="heatmap",phase="postprocess"} 1' in text
+
+    exported = loads(dumps(registry.to_json()))
+    [request] = [h for h in exported['histograms'] if h['labels'] == {'phase': 'request'}]
+    assert request['count'] == 1 and set(request['buckets']) == {'0.1', '1.0'}
+
+    registry.reset()
+    assert registry.to_json() == {'counters': [], 'histograms': []}
+
+
+def test_json_log_hook(caplog):
+    hook = instrument.json_log_hook()
+    instrument.add_hook(hook)
+    try:
+        with caplog.at_level(logging.INFO, 'tradingview_screener.instrument'):
+            query().get_scanner_data()
+    finally:
+        instrument.remove_hook(hook)
+    [record] = caplog.records
+    assert loads(record.getMessage())['rows'] == 2
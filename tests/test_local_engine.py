@@ -0,0 +1,188 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener import local_engine as engine
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 10_000
+    df = pd.DataFrame(
+        {
+            'close': rng.uniform(1, 1000, n),
+            'volume': rng.integers(0, 10**7, n),
+            'exchange': rng.choice(['NSE', 'BSE'], n),
+        }
+    )
+    df.loc[::7, 'close'] = np.nan
+    return df
+
+
+FILTERS = [
+    engine.col('close') > 100,
+    engine.col('volume') >= 5e6,
+    engine.col('exchange') == 'NSE',
+]
+
+
+def expected(df):
+    return ((df['close'] > 100) & (df['volume'] >= 5e6) & (df['exchange'] == 'NSE')).to_numpy()
+
+
+@pytest.mark.parametrize('use_numexpr', [True, False])
+def test_fused_mask(data, use_numexpr):
+    columns = engine._numpy_columns(data, FILTERS)
+    mask = engine.fused_mask(columns, FILTERS, use_numexpr=use_numexpr)
+    np.testing.assert_array_equal(mask, expected(data))
+    # a slice of the rows
+    mask = engine.fused_mask(columns, FILTERS, 100, 200, use_numexpr=use_numexpr)
+    np.testing.assert_array_equal(mask, expected(data)[100:200])
+
+    with pytest.raises(ValueError, match='unknown operator'):
+        engine.fused_mask(columns, [engine.Filter('close', '!', 1)])
+
+
+def test_parallel_mask(data):
+    shared = engine.SharedColumns(data)
+    assert 'close' in shared and 'exchange' not in shared
+    try:
+        mask = engine.parallel_mask(data, shared, FILTERS, workers=3)
+    finally:
+        shared.close()
+    np.testing.assert_array_equal(mask, expected(data))
+
+
+def test_parallel_mask_spawn(data, monkeypatch):
+    # the workers import the engine by name, so they don't need the memory of a forked parent
+    executor = ProcessPoolExecutor(max_workers=2, mp_context=get_context('spawn'))
+    monkeypatch.setattr(engine, '_executor', executor)
+    shared = engine.SharedColumns(data)
+    try:
+        mask = engine.parallel_mask(data, shared, FILTERS, workers=2)
+    finally:
+        shared.close()
+        executor.shutdown()
+    np.testing.assert_array_equal(mask, expected(data))
+
+
+def test_get_data(data):
+    engine.DATA_CACHE.clear()
+    engine.RESULT_CACHE.clear()
+    q = engine.Query(market='india', columns=['close'])
+    q.add_filter(engine.col('close') > 100).add_filter(engine.col('exchange') == 'NSE')
+    assert q._required_columns() == ('close', 'exchange')
+
+    calls = []
+
+    def fetch(market, instrument_type, columns=()):
+        calls.append((market, columns))
+        return data
+
+    q._fetch_market_data = fetch
+    df = q.get_data()
+    assert len(df) == ((data['close'] > 100) & (data['exchange'] == 'NSE')).sum()
+    assert df.index.tolist() == list(range(len(df)))
+    assert df.columns.tolist() == ['close', 'exchange']
+    assert calls == [('india', ('close', 'exchange'))]
+
+    # the same filters in another order are the same cache entry, returned as a copy
+    q.filters.reverse()
+    cached = q.get_data()
+    assert cached.equals(df) and cached is not df
+    cached.loc[0, 'close'] = -1.0
+    assert q.get_data().equals(df)
+    # the same columns in another order are another result
+    q.columns = ['exchange', 'close']
+    assert q.get_data().columns.tolist() == ['exchange', 'close']
+    q.columns = ['close']
+    # other filters on the same columns reuse the downloaded market
+    q.add_filter(engine.col('close') < 500.0)
+    assert len(q.get_data()) < len(df)
+    assert len(calls) == 1
+
+
+def test_fetch_error(caplog):
+    engine.DATA_CACHE.clear()
+    engine.RESULT_CACHE.clear()
+    q = engine.Query(market='india').add_filter(engine.col('close') > 100)
+
+    def fetch(*args):
+        raise ConnectionError('down')
+
+    q._fetch_market_data = fetch
+    with caplog.at_level(logging.ERROR, 'tradingview_screener.local_engine'):
+        assert q.get_data().empty
+    assert "failed to fetch the data of 'india'" in caplog.text
+
+
+def test_shared_columns_are_shared_by_the_queries(data, monkeypatch):
+    engine.DATA_CACHE.clear()
+    engine.RESULT_CACHE.clear()
+    monkeypatch.setattr(engine.os, 'cpu_count', lambda: 2)
+    created = []
+    shared_columns = engine.SharedColumns
+    monkeypatch.setattr(
+        engine, 'SharedColumns', lambda df: created.append(df) or shared_columns(df)
+    )
+
+    queries = [engine.Query(market='india', columns=['close', 'volume']) for _ in range(2)]
+    queries[0].add_filter(engine.col('close') > 100).add_filter(engine.col('volume') >= 5e6)
+    queries[1].add_filter(engine.col('volume') >= 5e6).add_filter(engine.col('close') < 500.0)
+    for q in queries:
+        q._fetch_market_data = lambda *args: data
+        q._process_min_rows = 1000
+    first, second = (q.get_data() for q in queries)
+
+    assert len(created) == 1  # copied once, when the market was first filtered
+    assert len(first) == ((data['close'] > 100) & (data['volume'] >= 5e6)).sum()
+    assert len(second) == ((data['close'] < 500) & (data['volume'] >= 5e6)).sum()
+    entry = engine.DATA_CACHE.get(queries[0]._data_key())
+    assert isinstance(entry, engine.MarketData) and entry.shared() is entry.shared()
+    engine.DATA_CACHE.clear()
+
+
+def test_filter_key():
+    col = engine.col
+    assert engine.filter_key([col('close') > 100, col('type') == 'stock']) == engine.filter_key(
+        [col('type') == 'stock', col('close') > 100.0, col('close') > 100]
+    )
+    assert engine.filter_key([col('close') > 1]) != engine.filter_key([col('close') > '1'])
+
+
+def test_ttl_cache(monkeypatch):
+    cache = engine.TTLCache(maxsize=2, ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr(engine.time, 'time', lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # `b` is the least recently used
+    assert cache.get('b') is None
+    assert cache.evictions == 1
+
+    # every entry expires on its own
+    now[0] += 6
+    cache.set('a', 4)
+    now[0] += 6
+    assert cache.get('c') is None
+    assert cache.get('a') == 4
+    assert cache.get('a', ttl=5) is None
+    assert cache.stats() == {
+        'hits': 2,
+        'misses': 3,
+        'evictions': 1,
+        'expirations': 2,
+        'entries': 0,
+        'nbytes': 0,
+    }
+
+    cache = engine.TTLCache(max_bytes=1000)
+    cache.set('x', pd.DataFrame({'close': np.zeros(100)}))  # 800 bytes of data
+    cache.set('y', pd.DataFrame({'close': np.zeros(100)}))
+    assert len(cache) == 1 and cache.get('y') is not None
@@ -0,0 +1,186 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from tradingview_screener import And, Or, Query, col
+from tradingview_screener.evaluate import evaluate, query_mask
+from tradingview_screener.optimize import optimize_expressions, optimize_operation
+
+
+def test_merge_ranges():
+    exprs = optimize_expressions(
+        [col('close') > 5, col('close').between(10, 50), col('close') <= 20, col('close') > 5]
+    )
+    assert exprs == [{'left': 'close', 'operation': 'in_range', 'right': [10, 20]}]
+
+    exprs = optimize_expressions([col('close') >= 10, col('close') > 10, col('close') < 20])
+    assert exprs == [
+        {'left': 'close', 'operation': 'greater', 'right': 10},
+        {'left': 'close', 'operation': 'less', 'right': 20},
+    ]
+
+    # a single bound is left as it is
+    assert optimize_expressions([col('close') > 5]) == [col('close') > 5]
+
+
+def test_sets():
+    exprs = optimize_expressions(
+        [col('name').isin(['A', 'B', 'A', 'C']), col('name').isin(['C', 'A', 'D'])]
+    )
+    assert exprs == [{'left': 'name', 'operation': 'in_range', 'right': ['A', 'C']}]
+
+    operation = optimize_operation(
+        Or(col('type') == 'stock', col('type') == 'fund', col('type').isin(['dr']))['operation']
+    )
+    assert operation == {
+        'operator': 'or',
+        'operands': [
+            {
+                'expression': {
+                    'left': 'type',
+                    'operation': 'in_range',
+                    'right': ['stock', 'fund', 'dr'],
+                }
+            }
+        ],
+    }
+
+
+def test_implied():
+    exprs = optimize_expressions(
+        [
+            col('close') > col('EMA20'),
+            col('EMA20') > col('EMA50'),
+            col('close') > col('EMA50'),
+            col('EMA50') > col('EMA200'),
+            col('close') > col('EMA200'),
+            col('close') >= col('EMA200'),
+            col('close').not_empty(),
+            col('EMA20') < col('close'),
+        ]
+    )
+    assert exprs == [
+        col('close') > col('EMA20'),
+        col('EMA20') > col('EMA50'),
+        col('EMA50') > col('EMA200'),
+    ]
+
+    # a non-strict chain doesn't imply a strict comparison
+    exprs = [col('a') >= col('b'), col('b') >= col('c'), col('a') > col('c')]
+    assert optimize_expressions(exprs) == exprs
+
+
+def test_flatten():
+    tree = And(
+        col('exchange') == 'NYSE',
+        And(col('close') > 10, And(col('close') > 10, col('volume') > 1000)),
+        Or(Or(col('type') == 'stock'), col('type') == 'fund'),
+    )
+    assert optimize_operation(tree['operation']) == {
+        'operator': 'and',
+        'operands': [
+            {'expression': col('exchange') == 'NYSE'},
+            {'expression': {'left': 'type', 'operation': 'in_range', 'right': ['stock', 'fund']}},
+            {'expression': col('close') > 10},
+            {'expression': col('volume') > 1000},
+        ],
+    }
+    assert optimize_operation(Or(And(col('a') > 1, col('b') > 2))['operation']) == {
+        'operator': 'and',
+        'operands': [{'expression': col('a') > 1}, {'expression': col('b') > 2}],
+    }
+
+
+def test_same_rows():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame(
+        {
+            'close': rng.normal(100, 30, n),
+            'EMA20': rng.normal(100, 30, n),
+            'EMA50': rng.normal(100, 30, n),
+            'type': rng.choice(['stock', 'fund', 'dr'], n),
+        }
+    )
+    df.loc[::7, 'EMA20'] = np.nan
+
+    expressions = [
+        col('close') > col('EMA20'),
+        col('EMA20') > col('EMA50'),
+        col('close') > col('EMA50'),
+        col('close') >= 80,
+        col('close').between(90, 200),
+        col('close') < 150,
+        col('type').isin(['stock', 'fund']),
+        col('type') != 'fund',
+        col('EMA50').not_empty(),
+    ]
+    for exprs in itertools.combinations(expressions, 4):
+        q = Query().where(*exprs)
+        expected = np.ones(n, dtype=bool)
+        for expr in exprs:
+            expected &= query_mask({'filter': [expr]}, df)
+        assert (query_mask(q, df) == expected).all()
+        assert (query_mask(q.optimize(), df) == expected).all()
+
+    tree = Or(*expressions[:3], And(*expressions[3:]))
+    assert (query_mask(Query().where2(tree), df) == evaluate(tree, df)).all()
+
+
+def test_contradictory_ranges():
+    exprs = [col('close').between(50, 100), col('close') < 10]
+    assert optimize_expressions(exprs) == exprs  # not merged into `between(50, 10)`
+    exprs = [col('close') > 10, col('close') <= 10]
+    assert optimize_expressions(exprs) == exprs
+
+    df = pd.DataFrame({'close': [5.0, 10.0, 60.0]})
+    assert not query_mask(Query().where(*exprs), df).any()
+
+
+def test_disjoint_sets():
+    exprs = [col('type').isin(['stock', 'fund']), col('type').isin(['dr'])]
+    # not merged into an empty `isin([])` (only sorted, the shorter list first)
+    assert optimize_expressions(exprs) == exprs[::-1]
+    exprs = [
+        col('type').isin(['stock', 'fund']),
+        col('type').isin(['fund', 'dr']),
+        col('type') == 'dr',
+    ]
+    assert optimize_expressions(exprs) == [
+        {'left': 'type', 'operation': 'equal', 'right': 'dr'},
+        {'left': 'type', 'operation': 'in_range', 'right': ['fund']},
+    ]
+
+    df = pd.DataFrame({'type': ['stock', 'fund', 'dr']})
+    assert not query_mask(Query().where(*exprs), df).any()
+
+
+def test_column_bounds():
+    # `between()` with two columns is the same operation as `isin()` with two strings
+    exprs = [col('close').between('EMA5', 'EMA20'), col('close').between('EMA10', 'EMA50')]
+    assert optimize_expressions(exprs) == exprs
+    q = Query().where(*exprs).optimize()
+    assert q.query['filter'] == exprs
+
+    tree = Or(col('close').between('EMA5', 'EMA20'), col('close').between('EMA50', 'EMA100'))
+    assert optimize_operation(tree['operation'])['operands'] == tree['operation']['operands']
+
+    # the column names of the query and of the data are never literal values
+    tree = Or(col('close') == 'OtherColumn', col('close') == 'Another')
+    q = Query().select('close', 'OtherColumn', 'Another').where2(tree)
+    assert q.optimize().query['filter2'] == tree['operation']
+    assert optimize_operation(tree['operation'])['operands'][0]['expression']['right'] == [
+        'OtherColumn',
+        'Another',
+    ]
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(100, 30, (500, 5)), columns=['close', 'A', 'B', 'C', 'D'])
+    trees = [
+        Or(col('close').between('A', 'B'), col('close').between('C', 'D')),
+        And(col('close').between('A', 'B'), col('close').between('C', 'D')),
+        Or(col('close') == 'A', col('close') == 'B'),
+    ]
+    for tree in trees:
+        assert (query_mask(Query().where2(tree), df) == evaluate(tree, df)).all()
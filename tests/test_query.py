@@ -1,7 +1,44 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from json import dumps
+
 import pytest
 
-from tradingview_screener.query import Query, And, Or
+from tradingview_screener.query import HEADERS, Query, And, Or, get_scanner_data_many
 from tradingview_screener.column import col
+from tradingview_screener.server import ScannerServer
+from tradingview_screener.transport import (
+    HTTPXAsyncTransport,
+    Transport,
+    RedirectTransport,
+    RequestsTransport,
+    ThreadedAsyncTransport,
+    get_transport,
+    set_transport,
+)
+
+from conftest import FakeTransport
+
+
+@pytest.fixture(scope='module', autouse=True)
+def scanner_api():
+    # the queries without a transport of their own are answered by a local stand-in of the
+    # scanner API, set `SCREENER_LIVE_TESTS=1` to send them to the real one
+    if os.environ.get('SCREENER_LIVE_TESTS') == '1':
+        yield None
+        return
+    previous = get_transport()
+    with ScannerServer(rows=20_000) as server:
+        set_transport(RedirectTransport(server.url))
+        try:
+            yield server
+        finally:
+            set_transport(previous)
 
 
 @pytest.mark.parametrize(
@@ -300,3 +337,264 @@ def test_and_or_chaining():
     assert query.query['filter2'] == dct  # pyright: ignore [reportTypedDictNotRequiredAccess]
     count, _ = query.get_scanner_data()
     assert count > 0
+
+
+def test_transport():
+    assert isinstance(get_transport(), Transport)
+    assert get_transport() is get_transport()  # shared by all the queries
+
+    transport = FakeTransport()
+    count, df = (
+        Query().set_markets('india').select('close').set_transport(transport).get_scanner_data()
+    )
+    assert count == 1
+    assert df.to_dict('records') == [{'ticker': 'NSE:TCS', 'close': 3500.5}]
+    assert transport.calls[0][0] == 'https://scanner.tradingview.com/india/scan'
+
+    with RequestsTransport(pool_maxsize=2) as t:
+        assert t.session.get_adapter('https://scanner.tradingview.com')._pool_maxsize == 2
+
+
+def test_async():
+    nse = FakeTransport([{'s': 'NSE:TCS', 'd': [3500.5]}])
+    bse = FakeTransport([{'s': 'BSE:TCS', 'd': [3501.0]}, {'s': 'BSE:INFY', 'd': [1500.0]}])
+    queries = [
+        Query().select('close').set_transport(ThreadedAsyncTransport(nse)),
+        Query().select('close').set_transport(ThreadedAsyncTransport(bse)),
+    ]
+
+    (count1, df1), (count2, df2) = get_scanner_data_many(*queries)
+    assert (count1, count2) == (1, 2)
+    assert df1['ticker'].tolist() == ['NSE:TCS']
+    assert df2['ticker'].tolist() == ['BSE:TCS', 'BSE:INFY']
+
+    raw = asyncio.run(queries[0].get_scanner_data_raw_async())
+    assert raw == {'totalCount': 1, 'data': [{'s': 'NSE:TCS', 'd': [3500.5]}]}
+
+
+def test_httpx_async_clients(monkeypatch):
+    class Client:
+        # a `httpx.AsyncClient`, the headers take 20 ms and the body 50 ms
+        closed = False
+
+        def build_request(self, method, url, json, **kwargs):
+            return url, json
+
+        async def send(self, request, stream):
+            await asyncio.sleep(0.02)
+            r = FakeTransport().post(*request)
+            return SimpleNamespace(
+                status_code=r.status_code,
+                reason_phrase=r.reason,
+                headers={},
+                url=request[0],
+                encoding='utf-8',
+                content=r.content,
+                aread=lambda: asyncio.sleep(0.05),
+                aclose=lambda: asyncio.sleep(0),
+            )
+
+        async def aclose(self):
+            self.closed = True
+
+    clients = []
+    transport = HTTPXAsyncTransport()
+    monkeypatch.setattr(transport, '_new_client', lambda: clients.append(Client()) or clients[-1])
+    query = Query().select('close').set_transport(transport)
+
+    # one client per event loop, closed when `asyncio.run()` returns
+    for _ in range(2):
+        (count, _), _ = get_scanner_data_many(query, query)
+        assert count == 1
+    assert len(clients) == 2 and all(c.closed for c in clients)
+
+    with pytest.raises(ValueError, match='cannot set `verify`'):
+        asyncio.run(query.get_scanner_data_async(verify=False))
+
+    # the time to the headers, without the download of the body
+    r = asyncio.run(transport.post(query.url, json={'range': [0, 50]}))
+    assert 0.02 <= r.elapsed.total_seconds() < 0.05
+
+
+def test_fetch_all():
+    data = [{'s': f'NSE:S{i}', 'd': [float(i)]} for i in range(2500)]
+    transport = FakeTransport(data)
+    query = Query().select('close').set_transport(transport)
+
+    count, df = query.fetch_all(page_size=1000, max_workers=2)
+    assert count == 2500
+    assert df['close'].tolist() == [float(i) for i in range(2500)]
+    assert sorted(json['range'] for _, json in transport.calls) == [
+        [0, 1000],
+        [1000, 2000],
+        [2000, 2500],
+    ]
+    assert query.query['range'] == [0, 50]  # the query itself isn't modified
+
+    count, df = query.offset(100).fetch_all(page_size=1000, max_rows=1500)
+    assert count == 2500
+    assert df['close'].tolist() == [float(i) for i in range(100, 1600)]
+
+    # the first page isn't bigger than `max_rows`
+    transport.calls.clear()
+    count, df = query.fetch_all(page_size=1000, max_rows=10)
+    assert count == 2500 and len(df) == 10
+    assert [json['range'] for _, json in transport.calls] == [[0, 10]]
+
+    pages = list(query.offset(0).iter_pages(page_size=1000, ordered=False))
+    assert sorted(len(df) for _, df in pages) == [500, 1000, 1000]
+    assert len(pages[0][1]) == 1000  # the first page always comes first
+
+
+def test_cached(tmp_path):
+    from tradingview_screener.cache import ResponseCache, query_key
+
+    transport = FakeTransport()
+    cache = ResponseCache(path=tmp_path / 'cache.sqlite3')
+    query = Query().select('close').set_transport(transport).cached(ttl=60, cache=cache)
+
+    _, df1 = query.get_scanner_data()
+    _, df2 = query.get_scanner_data()
+    assert len(transport.calls) == 1
+    assert df1.equals(df2)
+
+    # a different filter is a different key
+    query.where(col('close') > 10).get_scanner_data()
+    assert len(transport.calls) == 2
+
+    # the key doesn't depend on the order of the keys
+    assert query_key('url', {'a': 1, 'b': [1, 2]}) == query_key('url', {'b': [1, 2], 'a': 1})
+    assert query_key('url', {'a': 1}) != query_key('url2', {'a': 1})
+
+    # expired entries are fetched again
+    query.cached(ttl=0, cache=cache).get_scanner_data()
+    assert len(transport.calls) == 3
+
+    # the disk tier survives a "restart"
+    query.cached(ttl=60, cache=ResponseCache(path=tmp_path / 'cache.sqlite3')).get_scanner_data()
+    assert len(transport.calls) == 3
+
+    # the responses of an authenticated session are only returned to that session
+    query.get_scanner_data(cookies={'sessionid': 'alice'})
+    query.get_scanner_data(cookies={'sessionid': 'alice'})
+    assert len(transport.calls) == 4
+    query.get_scanner_data(cookies={'sessionid': 'bob'})
+    query.get_scanner_data(headers={**HEADERS, 'authorization': 'bob'})
+    assert len(transport.calls) == 6
+    query.get_scanner_data(timeout=5)  # the timeout doesn't change the response
+    assert len(transport.calls) == 6
+
+    # but they're never written to the disk
+    restarted = query.cached(ttl=60, cache=ResponseCache(path=tmp_path / 'cache.sqlite3'))
+    restarted.get_scanner_data()
+    assert len(transport.calls) == 6
+    restarted.get_scanner_data(cookies={'sessionid': 'alice'})
+    assert len(transport.calls) == 7
+
+
+def test_immutable():
+    base = Query().set_markets('india').select('name', 'close')
+    base_query = dict(base.query)
+
+    q1 = base.where(col('close') > 10).limit(100)
+    q2 = base.where(col('close') < 10).offset(5)
+    assert dict(base.query) == base_query  # the base query isn't modified
+    assert q1.query['range'] == [0, 100]
+    assert q2.query['range'] == [5, 50]
+    assert q1._query['columns'] is base._query['columns']  # unchanged values are shared
+
+    # `query` is a copy, changing its lists doesn't change the query (or its key)
+    key = q1.key
+    q1.query['columns'].append('volume')
+    q1.query['filter'][0]['right'] = 20
+    assert q1.query['columns'] == ['name', 'close'] and q1.query['filter'][0]['right'] == 10
+    assert q1.key == key == base.where(col('close') > 10).limit(100).key
+    assert base.query['columns'] == ['name', 'close']
+
+    with pytest.raises(TypeError):
+        q1.query['markets'] = ['america']  # pyright: ignore [reportIndexIssue]
+    with pytest.raises(AttributeError):
+        q1.url = 'https://scanner.tradingview.com/america/scan'
+
+    # equal queries have the same hash, so they can be used as keys
+    assert base.where(col('close') > 10).limit(100) == q1
+    assert hash(base.where(col('close') > 10).limit(100)) == hash(q1)
+    assert len({q1, q2, base.where(col('close') > 10).limit(100)}) == 2
+    assert base.set_tickers('NSE:TCS').url == 'https://scanner.tradingview.com/global/scan'
+    assert base.url == 'https://scanner.tradingview.com/india/scan'
+
+
+def test_single_flight():
+    transport = FakeTransport(delay=0.2)
+    query = Query().select('close').set_transport(transport)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: query.get_scanner_data(), range(8)))
+    assert len(transport.calls) == 1
+    assert all(df.equals(results[0][1]) for _, df in results)
+
+    # every caller gets its own DataFrame
+    results[0][1].loc[0, 'close'] = 0
+    assert results[1][1].loc[0, 'close'] == 3500.5
+
+    # the requests are only coalesced while they're in flight
+    query.get_scanner_data()
+    assert len(transport.calls) == 2
+
+    # never across sessions
+    sessions = [{'sessionid': 'alice'}, {'sessionid': 'bob'}] * 4
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda c: query.get_scanner_data(cookies=c), sessions))
+    assert len(transport.calls) == 4
+
+    transport = FakeTransport(delay=0.2)
+    queries = [Query().select('close').set_transport(ThreadedAsyncTransport(transport))] * 5
+    assert len(get_scanner_data_many(*queries)) == 5
+    assert len(transport.calls) == 1
+
+    async def many_sessions():
+        return await asyncio.gather(
+            *(q.get_scanner_data_async(cookies=c) for q, c in zip(queries, sessions))
+        )
+
+    asyncio.run(many_sessions())
+    assert len(transport.calls) == 3  # one request per session
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_stale_while_revalidate():
+    from tradingview_screener.cache import ResponseCache
+
+    transport = FakeTransport(delay=0.2)
+    cache = ResponseCache()
+    query = Query().select('close').set_transport(transport).cached(60, cache, stale_ttl=600)
+    old = dumps({'totalCount': 1, 'data': [{'s': 'NSE:TCS', 'd': [3000.0]}]}).encode()
+    cache.set(query.key, old, created=time.time() - 120)
+
+    # the stale response is returned right away, and refreshed in the background
+    start = time.monotonic()
+    _, df = query.get_scanner_data()
+    assert time.monotonic() - start < 0.15
+    assert df['close'].tolist() == [3000.0]
+    assert df.attrs['stale'] and time.time() - df.attrs['created'] > 100
+    query.get_scanner_data()  # the refresh isn't started twice
+    wait_for(lambda: query.key not in cache._refreshing)
+    assert len(transport.calls) == 1
+
+    _, df = query.get_scanner_data()
+    assert df['close'].tolist() == [3500.5]
+    assert not df.attrs['stale'] and time.time() - df.attrs['created'] < 5
+    assert len(transport.calls) == 1
+    assert cache.stale_hits == 2
+
+    # too old to be used at all
+    cache.set(query.key, old, created=time.time() - 1200)
+    _, df = query.get_scanner_data()
+    assert df['close'].tolist() == [3500.5]
+    assert len(transport.calls) == 2
@@ -0,0 +1,146 @@
+import time
+
+import pytest
+import requests
+
+from tradingview_screener import And, Or, Query, col
+from tradingview_screener.server import ScannerServer, load_universe, synthetic_universe
+from tradingview_screener.transport import RedirectTransport
+
+
+@pytest.fixture(scope='module')
+def server():
+    with ScannerServer(rows=5000) as server:
+        yield server
+
+
+@pytest.fixture(scope='module')
+def transport(server):
+    with RedirectTransport(server.url) as transport:
+        yield transport
+
+
+def test_synthetic_universe():
+    df = synthetic_universe('india', rows=1000, seed=1)
+    assert df.equals(synthetic_universe('india', rows=1000, seed=1))
+    assert df['ticker'].is_unique
+    assert set(df['exchange']) == {'NSE', 'BSE'}
+    assert (df['high'] >= df[['open', 'close']].max(axis=1)).all()
+    assert df['market_cap_basic'].isna().any() and df['dividends_yield_current'].isna().any()
+    assert {'common', 'etf'} <= {t for specs in df['typespecs'] for t in specs}
+
+
+def test_scan_matches_pandas(server, transport):
+    df = synthetic_universe('america', rows=5000)
+    q = (
+        Query()
+        .select('name', 'close', 'change')
+        .where(col('close').between(10, 100), col('exchange').isin(['NYSE', 'NASDAQ']))
+        .order_by('change', ascending=False)
+        .offset(5)
+        .limit(25)
+        .set_transport(transport)
+    )
+    count, result = q.get_scanner_data()
+    expected = df[df['close'].between(10, 100) & df['exchange'].isin(['NYSE', 'NASDAQ'])]
+    assert count == len(expected)
+    expected = expected.sort_values('change', ascending=False, kind='stable').iloc[5:25]
+    assert result['ticker'].tolist() == expected['ticker'].tolist()
+    assert result['close'].tolist() == expected['close'].tolist()
+
+    # `filter2` trees, with the `has` operations on `typespecs`
+    q = Query().where2(
+        Or(
+            And(col('type') == 'stock', col('typespecs').has(['common'])),
+            And(col('type') == 'fund', col('typespecs').has_none_of(['etf'])),
+        )
+    )
+    count, _ = q.set_transport(transport).get_scanner_data()
+    common = df['typespecs'].map(lambda specs: 'common' in specs)
+    etf = df['typespecs'].map(lambda specs: 'etf' in specs)
+    assert count == (((df['type'] == 'stock') & common) | ((df['type'] == 'fund') & ~etf)).sum()
+
+
+def test_generated_fields(server, transport):
+    q = Query().select('close', 'EMA20', 'RSI|1W').where(col('close') > col('EMA20'))
+    count, df = q.limit(5000).set_transport(transport).get_scanner_data()
+    assert 0 < count < 5000 and (df['close'] > df['EMA20']).all()
+    # the same values on every request
+    _, again = q.limit(5000).set_transport(transport).get_scanner_data()
+    assert again['EMA20'].equals(df['EMA20'])
+
+    with pytest.raises(requests.HTTPError, match='Unknown field'):
+        Query().select('not_a_field').set_transport(transport).get_scanner_data()
+    with pytest.raises(requests.HTTPError, match='invalid range'):
+        Query().limit(-5).set_transport(transport).get_scanner_data()
+
+
+def test_tickers_and_markets(server, transport):
+    india = synthetic_universe('india', rows=5000)
+    tickers = india['ticker'].iloc[[3, 1]].tolist()
+    count, df = Query().set_tickers(*tickers).set_transport(transport).get_scanner_data()
+    assert count == 2 and sorted(df['ticker']) == sorted(tickers)
+
+    q = Query().set_markets('india', 'uk').select('close').limit(10_000)
+    count, df = q.set_transport(transport).get_scanner_data()
+    assert count == 10_000 and df['ticker'].str.startswith(('NSE:', 'BSE:', 'LSE:')).all()
+
+
+def test_http(server):
+    payload = {'columns': ['close'], 'range': [0, 1000]}
+    r = requests.post(f'{server.url}/america/scan?label-product=screener', json=payload)
+    assert r.headers['content-encoding'] == 'gzip' and r.json()['totalCount'] == 5000
+
+    r = requests.post(f'{server.url}/america/scan', json=payload, headers={'accept-encoding': ''})
+    assert 'content-encoding' not in r.headers and len(r.json()['data']) == 1000
+    assert requests.get(f'{server.url}/america/scan').status_code == 405
+    assert requests.get(f'{server.url}/nothing').status_code == 404
+    assert requests.get(f'{server.url}/health').json()['status'] == 'ok'
+    r = requests.post(f'{server.url}/america/scan', data=b'{not json')
+    assert r.status_code == 400
+
+
+def test_latency_and_errors():
+    with (
+        ScannerServer(rows=100, latency=0.05, error_rate=0.5, error_status=429, seed=3) as server,
+        RedirectTransport(server.url) as transport,
+    ):
+        statuses = []
+        start = time.perf_counter()
+        for _ in range(20):
+            statuses.append(transport.post(f'{server.url}/america/scan', json={}).status_code)
+        assert time.perf_counter() - start >= 20 * 0.05
+    assert set(statuses) == {200, 429}
+    assert server.injected_errors == statuses.count(429)
+    assert server.requests == statuses.count(200)
+
+
+def test_port_in_use(server):
+    # the errors of the listening socket are raised by `start()`
+    with pytest.raises(OSError):
+        ScannerServer(rows=10, port=server.port).start()
+
+
+def test_recorded_universe(tmp_path):
+    df = synthetic_universe('india', rows=50).drop(columns='typespecs')
+    df.loc[0, 'sector'] = None
+    df.to_pickle(tmp_path / 'india.pkl')
+    with ScannerServer({'india': load_universe(tmp_path / 'india.pkl')}) as server:
+        q = Query().set_markets('india').select('sector', 'close').order_by('close')
+        count, result = q.set_transport(RedirectTransport(server.url)).limit(100).get_scanner_data()
+    assert count == 50
+    assert result['close'].tolist() == sorted(df['close'])
+
+    with pytest.raises(ValueError, match='unsupported file type'):
+        load_universe(tmp_path / 'india.txt')
+
+
+def test_scanner_url(server, monkeypatch):
+    from tradingview_screener import transport
+
+    monkeypatch.setattr(transport, '_default_transport', None)
+    monkeypatch.setenv('SCREENER_SCANNER_URL', server.url)
+    default = transport.get_transport()
+    assert isinstance(default, RedirectTransport) and default.base_url == server.url
+    count, _ = Query().get_scanner_data()  # served by the stand-in
+    assert count == 5000
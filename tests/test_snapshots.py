@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener import Query, col
+from tradingview_screener.frame import compact
+from tradingview_screener.snapshots import SnapshotStore
+from tradingview_screener.universe import Snapshot, UniverseService
+
+from test_universe import market_transport
+
+pytest.importorskip('pyarrow')
+
+
+def make_snapshot(created: float) -> Snapshot:
+    df = compact(
+        pd.DataFrame(
+            {
+                'ticker': ['NSE:TCS', 'NSE:INFY', 'BSE:TCS', 'NSE:IRFC'],
+                'exchange': ['NSE', 'NSE', 'BSE', 'NSE'],
+                'close': [3500.5, 1500.0, 3501.0, 150.2],
+                'volume': [1000.0, np.nan, 3000.0, 4000.0],
+            }
+        )
+    )
+    return Snapshot('india', frozenset(df.columns), 4, df, created)
+
+
+def test_write_and_read(tmp_path):
+    store = SnapshotStore(tmp_path, keep=2)
+    assert store.read('india') is None
+
+    snapshot = make_snapshot(created=1000.0)
+    store.write(snapshot)
+    result = store.read('india')
+    assert result.created == 1000.0 and result.count == 4 and result.columns == snapshot.columns
+    pd.testing.assert_frame_equal(result.df, snapshot.df)
+    # memory-mapped, the numeric columns are read-only views of the file
+    assert not result.df['close'].to_numpy().flags.writeable
+    # NaN stays NaN instead of becoming an Arrow null, so the column isn't copied either
+    volume = result.df['volume'].to_numpy()
+    assert np.isnan(volume[1]) and not volume.flags.writeable
+    assert store.read('india') is result  # not opened again until there's a new version
+
+    # a new version is picked up, and only the last `keep` versions stay on disk
+    for created in (1001.0, 1002.0):
+        store.write(make_snapshot(created))
+    assert store.read('india').created == 1002.0
+    assert len(store.versions('india')) == 2
+    assert not list(tmp_path.glob('india/*.tmp'))
+
+
+def test_shared_between_services(tmp_path):
+    # two services with the same store behave like two worker processes on the same host
+    transports = market_transport(), market_transport()
+    services = [
+        UniverseService(base_query=Query().set_transport(t), store=SnapshotStore(tmp_path))
+        for t in transports
+    ]
+    q = Query().set_markets('india').select('name', 'close').where(col('exchange') == 'NSE')
+
+    count, df = services[0].scan(q)
+    assert count == 3
+    assert len(transports[0].calls) == 1
+
+    count, df2 = services[1].scan(q)  # answered from the snapshot of the first one
+    assert not transports[1].calls
+    pd.testing.assert_frame_equal(df, df2)
+    assert services[1].snapshot('india').created == services[0].snapshot('india').created
+
+    # a snapshot that the second one needs to fetch (a new column) is picked up by the first one
+    time.sleep(0.01)
+    services[1].scan(q.select('name', 'change'))
+    assert len(transports[1].calls) == 1
+    services[0].scan(q.select('name', 'change'))
+    assert len(transports[0].calls) == 1
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingview_screener.sort import sort_data, sort_indices
+
+
+@pytest.fixture(scope='module')
+def df():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame(
+        {
+            'change': rng.integers(-20, 20, n).astype(float),
+            'sector': rng.choice(['Finance', 'Energy', None, 'Utilities'], n),
+            'close': rng.normal(100, 10, n),
+        }
+    )
+    df.loc[rng.choice(n, 300), 'change'] = np.nan
+    df['exchange'] = pd.Categorical(rng.choice(['NSE', 'BSE'], n), categories=['NSE', 'BSE'])
+    return df
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('nulls_first', [True, False])
+@pytest.mark.parametrize(
+    'keys', [['change'], ['change', 'sector'], ['sector', 'change', 'close'], ['exchange']]
+)
+@pytest.mark.parametrize('start, end', [(0, 50), (20, 400), (0, None), (4990, 6000)])
+def test_same_order_as_a_stable_sort(df, ascending, nulls_first, keys, start, end):
+    sort = [
+        {'sortBy': k, 'sortOrder': 'asc' if ascending else 'desc', 'nullsFirst': nulls_first}
+        for k in keys
+    ]
+    expected = df.sort_values(
+        keys, ascending=ascending, na_position='first' if nulls_first else 'last', kind='stable'
+    ).iloc[start:end]
+    assert sort_data(df, sort, start, end).index.tolist() == expected.index.tolist()
+
+
+def test_sort_indices():
+    data = {'close': np.array([3.0, np.nan, 1.0, 2.0, 5.0]), 'name': np.array(list('abcde'))}
+    sort = {'sortBy': 'close', 'sortOrder': 'desc'}
+    assert sort_indices(data, sort, end=2).tolist() == [4, 0]
+    assert sort_indices(data, {**sort, 'nullsFirst': True}, end=2).tolist() == [1, 4]
+    # only some of the rows, the positions are the ones of the data
+    assert sort_indices(data, sort, rows=np.array([1, 2, 3])).tolist() == [3, 2, 1]
+    assert sort_data(data, {'sortBy': 'name', 'sortOrder': 'desc'}, end=2)['name'].tolist() == [
+        'e',
+        'd',
+    ]
+    with pytest.raises(KeyError, match='missing'):
+        sort_indices(data, {'sortBy': 'RSI', 'sortOrder': 'asc'})
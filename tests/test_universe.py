@@ -0,0 +1,201 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from tradingview_screener import Or, Query, col
+from tradingview_screener.universe import UniverseService
+
+from conftest import FakeTransport
+
+
+ROWS = {
+    'NSE:TCS': {
+        'name': 'TCS',
+        'close': 3500.5,
+        'open': 3500.5,
+        'exchange': 'NSE',
+        'Value.Traded': 9e9,
+        'change': 1.5,
+    },
+    'NSE:INFY': {
+        'name': 'INFY',
+        'close': 1500.0,
+        'open': 1490.0,
+        'exchange': 'NSE',
+        'Value.Traded': 8e9,
+        'change': -0.5,
+    },
+    'BSE:TCS': {
+        'name': 'TCS',
+        'close': 3501.0,
+        'open': 3480.0,
+        'exchange': 'BSE',
+        'Value.Traded': 1e8,
+        'change': 1.6,
+    },
+    'NSE:IRFC': {
+        'name': 'IRFC',
+        'close': 150.2,
+        'open': 150.2,
+        'exchange': 'NSE',
+        'Value.Traded': 5e9,
+        'change': 4.0,
+    },
+}
+
+
+def market_transport() -> FakeTransport:
+    """Returns the whole market (sorted by `Value.Traded`) with the requested columns."""
+
+    def respond(url, json):
+        start, end = json['range']
+        data = [
+            {'s': ticker, 'd': [values[c] for c in json['columns']]}
+            for ticker, values in ROWS.items()
+        ][start:end]
+        return {'totalCount': len(ROWS), 'data': data}
+
+    return FakeTransport(respond=respond)
+
+
+def test_scan():
+    transport = market_transport()
+    service = UniverseService(base_query=Query().set_transport(transport))
+
+    q = Query().set_markets('india').select('name', 'close').where(col('exchange') == 'NSE')
+    count, df = service.scan(q)
+    assert count == 3
+    assert df.to_dict('records') == [
+        {'ticker': 'NSE:TCS', 'name': 'TCS', 'close': 3500.5},
+        {'ticker': 'NSE:INFY', 'name': 'INFY', 'close': 1500.0},
+        {'ticker': 'NSE:IRFC', 'name': 'IRFC', 'close': 150.2},
+    ]
+    assert len(transport.calls) == 1
+    assert set(transport.calls[0][1]['columns']) == {'name', 'close', 'exchange', 'Value.Traded'}
+
+    # different filters, sort and range are answered from the same snapshot
+    count, df = service.scan(
+        q.where(col('close') < 2000).order_by('close', ascending=True).limit(1)
+    )
+    assert count == 2
+    assert df['ticker'].tolist() == ['NSE:IRFC']
+    assert len(transport.calls) == 1
+
+    # a new column grows the snapshot
+    count, df = service.scan(q.select('name', 'change').order_by('change', ascending=False))
+    assert df['name'].tolist() == ['IRFC', 'TCS', 'INFY']
+    assert len(transport.calls) == 2
+    assert 'change' in transport.calls[1][1]['columns']
+    assert service.fetches == 2
+
+    # a field on the right side is a column, even if it's not in the snapshot yet
+    count, df = service.scan(q.where(col('close') == col('open')))
+    assert count == 2 and df['name'].tolist() == ['TCS', 'IRFC']
+    assert 'open' in transport.calls[2][1]['columns']
+
+
+def test_fallback(monkeypatch):
+    from tradingview_screener import transport as default
+
+    transport = market_transport()
+    service = UniverseService(base_query=Query().set_transport(transport))
+
+    q = Query().set_markets('india', 'america').select('name').set_transport(transport)
+    assert not service.can_answer(q)
+    assert service.can_answer(Query().set_markets('india'))
+    assert not service.can_answer(Query().set_markets('india').set_tickers('NSE:TCS'))
+    # the transport and the cache of the query are used instead of the snapshot
+    assert not service.can_answer(Query().set_markets('india').set_transport(transport))
+    assert not service.can_answer(Query().set_markets('india').cached(ttl=60))
+
+    count, _ = service.scan(q)
+    assert count == 4
+    assert service.fetches == 0  # sent directly to the API
+    assert transport.calls[0][1]['markets'] == ['india', 'america']
+
+    # so are the queries with the cookies of a session
+    monkeypatch.setattr(default, '_default_transport', transport)
+    single = Query().set_markets('india').select('name')
+    assert service.can_answer(single)
+    service.scan(single, cookies={'sessionid': 'abc'})
+    assert service.fetches == 0 and len(transport.calls) == 2
+
+
+def test_stale_snapshot():
+    transport = market_transport()
+    service = UniverseService(
+        refresh_interval=0.1, max_age=60, base_query=Query().set_transport(transport)
+    )
+    q = Query().set_markets('india').select('name')
+    _, df = service.scan(q)
+    assert not df.attrs['stale']
+
+    time.sleep(0.15)
+    _, df = service.scan(q)  # returned right away, and refreshed in the background
+    assert df.attrs['stale']
+    deadline = time.monotonic() + 5
+    while service.fetches < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert len(transport.calls) == 2
+
+
+def test_compact_snapshots():
+    transport = market_transport()
+    service = UniverseService(base_query=Query().set_transport(transport), max_bytes=1)
+
+    q = Query().set_markets('india').select('name', 'exchange')
+    _, df = service.scan(q.where(col('exchange') == 'BSE'))
+    # the unused categories of the snapshot are dropped from the result
+    assert df['exchange'].cat.categories.tolist() == ['BSE']
+
+    snapshot = service.snapshot('india')
+    assert isinstance(snapshot.df['exchange'].dtype, pd.CategoricalDtype)
+    assert service.memory_usage() == {'india': snapshot.nbytes}
+
+    # over the budget, the least recently used market is dropped (but never the new one)
+    service.scan(q.set_markets('america'))
+    assert list(service.memory_usage()) == ['america']
+    assert service.evictions == 1
+
+
+# two symbols per name, like the same company on NSE and BSE
+LIVE_NAMES = {f'{ex}:S{i}': f'S{i:03d}' for i in range(500) for ex in ('NSE', 'BSE')}
+
+
+def live_transport() -> FakeTransport:
+    """A market of 1000 symbols where the order of every sort changes between the requests."""
+    rng = np.random.default_rng(0)
+    names = LIVE_NAMES
+
+    def respond(url, json):
+        tickers = json.get('symbols', {}).get('tickers') or list(names)
+        keys = rng.random(len(tickers))  # the live `Value.Traded`, or the ties of `name`
+        if json['sort']['sortBy'] == 'name':
+            order = sorted(range(len(tickers)), key=lambda i: (names[tickers[i]], keys[i]))
+        else:
+            order = np.argsort(keys).tolist()
+        start, end = json['range']
+        columns = json['columns']
+        data = [
+            {'s': tickers[i], 'd': [names[tickers[i]]] * len(columns)} for i in order[start:end]
+        ]
+        return {'totalCount': len(tickers), 'data': data}
+
+    return FakeTransport(respond=respond)
+
+
+def test_snapshot_of_a_live_market():
+    transport = live_transport()
+    base = Query().set_transport(transport).where2(Or(col('close') > 1, col('volume') > 1))
+    service = UniverseService(base_query=base, page_size=7)
+
+    snapshot = service.snapshot('india', ['name'])
+    assert snapshot.df['ticker'].is_unique
+    assert set(snapshot.df['ticker']) == set(LIVE_NAMES)
+    # the whole market, sorted by a stable key
+    assert all('filter2' not in call and not call['filter'] for _, call in transport.calls)
+    assert {call['sort']['sortBy'] for _, call in transport.calls} == {'name'}
+    # the pages, the list of the tickers, and the missing tickers
+    assert len(transport.calls) == -(-1000 // 7) + 2
@@ -0,0 +1,35 @@
+import streamlit as st
+from tradingview_screener.delta import diff
+
+
+def show_changes_since_last_refresh(state_key, df, key, tolerances=None):
+    """
+    Compare a scan result with the one shown on the previous run of the page, and show only what
+    changed (new/dropped symbols and the updated values) instead of making the user re-read the
+    whole table. The result is kept in the session state for the next run.
+    """
+    current = df.reset_index(drop=True)
+    previous = st.session_state.get(state_key)
+    st.session_state[state_key] = current
+    if previous is None or set(previous.columns) != set(current.columns):
+        return None
+
+    try:
+        changes = diff(previous, current, key=key, tolerances=tolerances)
+    except ValueError:  # duplicated symbols, e.g. the same stock on NSE and BSE
+        return None
+    if changes:
+        st.caption(
+            f"Since the last refresh: {len(changes.added)} new, {len(changes.removed)} dropped, "
+            f"{len(changes.changed)} updated"
+        )
+        with st.expander("Changes since the last refresh"):
+            if not changes.added.empty:
+                st.markdown("**New**")
+                st.dataframe(changes.added, use_container_width=True, hide_index=True)
+            if not changes.removed.empty:
+                st.markdown("**Dropped:** " + ", ".join(map(str, changes.removed[key])))
+            if not changes.cells.empty:
+                st.markdown("**Updated values**")
+                st.dataframe(changes.cells, use_container_width=True, hide_index=True)
+    return changes
@@ -0,0 +1,76 @@
+import os
+import time
+
+import streamlit as st
+from tradingview_screener.frame import compact, memory_usage
+from tradingview_screener.universe import UniverseService
+
+# How often the shared market snapshots are refreshed (in seconds)
+UNIVERSE_REFRESH_SECONDS = float(os.environ.get("UNIVERSE_REFRESH_SECONDS", "300"))
+# Memory budgets (in MB) of the shared snapshots, and of the results kept by each session
+UNIVERSE_MEMORY_MB = float(os.environ.get("UNIVERSE_MEMORY_MB", "512"))
+SESSION_MEMORY_MB = float(os.environ.get("SESSION_MEMORY_MB", "64"))
+# Directory shared by the Streamlit workers of the host (e.g. /dev/shm/screener), the snapshots are
+# published there as memory-mapped Arrow files so that each market is fetched and held once per host
+UNIVERSE_SNAPSHOT_DIR = os.environ.get("UNIVERSE_SNAPSHOT_DIR")
+
+
+@st.cache_resource(show_spinner=False)
+def get_universe_service():
+    """
+    One snapshot service for the whole Streamlit process, shared by every session and page.
+    Pages answer their scans with `get_universe_service().scan(query)`, so the whole market is
+    fetched once per refresh interval instead of once per page and per session.
+    """
+    store = None
+    if UNIVERSE_SNAPSHOT_DIR:
+        from tradingview_screener.snapshots import SnapshotStore
+
+        store = SnapshotStore(UNIVERSE_SNAPSHOT_DIR)
+    service = UniverseService(
+        refresh_interval=UNIVERSE_REFRESH_SECONDS,
+        max_bytes=int(UNIVERSE_MEMORY_MB * 2**20),
+        store=store,
+    )
+    service.start()
+    return service
+
+
+def show_as_of(df):
+    """Show an "As of HH:MM:SS" badge with the time the scan data was fetched."""
+    created = df.attrs.get("created")
+    if created is None:
+        return
+    badge = f"As of {time.strftime('%H:%M:%S', time.localtime(created))}"
+    if df.attrs.get("stale"):
+        badge += " (refreshing in the background)"
+    st.caption(badge)
+
+
+def store_result(key, df):
+    """
+    Keep a scan result in the session state in its compact form (see `frame.compact()`), without
+    the extra copies.
+
+    The results stored with this function count towards the `SESSION_MEMORY_MB` budget of the
+    session, when it's exceeded the oldest of the other stored results are dropped (the pages
+    already handle a missing result by asking for a new scan).
+    """
+    df = compact(df)
+    sizes = st.session_state.setdefault("_result_sizes", {})
+    sizes.pop(key, None)
+    sizes[key] = memory_usage(df)  # the most recent result is the last one
+    st.session_state[key] = df
+
+    budget = SESSION_MEMORY_MB * 2**20
+    for old_key in list(sizes):
+        if sum(sizes.values()) <= budget or old_key == key:
+            break
+        st.session_state.pop(old_key, None)
+        del sizes[old_key]
+    return df
+
+
+def session_memory_usage():
+    """Return the memory (in bytes) used by the results that this session stored with `store_result()`."""
+    return sum(st.session_state.get("_result_sizes", {}).values())